@@ -0,0 +1,303 @@
+#PYTHON MODULES
+
+import logging
+import time
+
+#MY MODULES
+
+from Event_Driven_Backtester.events import (Event, MarketEvent, SignalEvent, OrderEvent, FillEvent)
+from Event_Driven_Backtester.performance import create_summary_values
+
+logger = logging.getLogger(__name__)
+
+#Clock modes
+REPLAY = 'replay'    #feed bars as fast as the handlers can process them
+PACED = 'paced'      #feed one bar every `interval` seconds, mimicking a live feed
+
+class BacktestBase():
+    
+    #The run counters and throughput reporting shared by Backtest and MultiBacktest
+    
+    def reset_counters(self):
+        
+        self.bars = 0       #number of bars processed
+        self.events = 0     #number of events dispatched
+        self.elapsed = 0.0  #wall time of the last run in seconds
+    
+    def throughput(self):
+        
+        #Returns (bars/sec, events/sec) of the last run
+        
+        if self.elapsed <= 0:
+            return 0.0, 0.0
+        
+        return self.bars/self.elapsed, self.events/self.elapsed
+    
+    def throughput_report(self):
+        
+        bars_per_sec, events_per_sec = self.throughput()
+        return('{b} bars, {e} events in {t:.3f}s: {bps:.1f} bars/sec, {eps:.1f} events/sec'.format(
+            b = self.bars, e = self.events, t = self.elapsed, bps = bars_per_sec, eps = events_per_sec))
+
+class Backtest(BacktestBase):
+    
+    #Wires a data handler, strategy, portfolio and execution handler together and runs the event loop.
+    #The components are constructed by the caller on a shared EventBus, exactly as in loop.py.
+    #Logging is configured by the caller: at DEBUG this module logs every event, at INFO every bar and the throughput.
+    #The level is read when each run starts, so changing it takes effect from the next run.
+    
+    def __init__(self, event_queue, data, strategy, portfolio, broker, clock = REPLAY, interval = 1.0, pools = (), profiler = None, checkpoint = None, results = None):
+        
+        #event_queue - the EventBus shared by all of the components
+        #clock - REPLAY or PACED
+        #interval - seconds between bars in PACED mode
+        #pools - EventPools whose events are released back to them once all handlers have run
+        #profiler - an optional profiling.Profiler that times every handler; None adds no overhead
+        #checkpoint - an optional checkpoint.Checkpointer that saves the state of every component periodically
+        #results - an optional results.ResultsWriter that streams equity, positions and fills to disk during the run;
+        #          it cannot be combined with run(resume = True)
+        
+        if clock not in (REPLAY, PACED):
+            raise ValueError('clock must be {} or {}, not {}'.format(REPLAY, PACED, clock))
+        
+        self.event_queue = event_queue
+        self.data = data
+        self.strategy = strategy
+        self.portfolio = portfolio
+        self.broker = broker
+        self.pools = pools
+        self.profiler = profiler
+        self.checkpoint = checkpoint
+        self.results = results
+        if profiler is not None:
+            profiler.attach(event_queue)
+        
+        self.clock = clock
+        self.interval = interval
+        
+        self.reset_counters()
+        
+        self.subscribe_components()
+        
+    def subscribe_components(self):
+        
+        bus = self.event_queue
+        handler = self.handler
+        bus.subscribe(MarketEvent, handler('portfolio', self.portfolio.update_timeindex))
+        bus.subscribe(MarketEvent, handler('strategy', self.strategy.calculate_signals))   #strategy generates signals from market data
+        if hasattr(self.broker, 'on_market'):
+            bus.subscribe(MarketEvent, handler('broker', self.broker.on_market))           #brokers with resting orders match them against the new bar
+        bus.subscribe(SignalEvent, handler('portfolio', self.portfolio.update_signal))     #portfolio takes signals as advice on how to trade and generates orders
+        bus.subscribe(OrderEvent, handler('broker', self.broker.execute_order))            #executes orders
+        bus.subscribe(FillEvent, handler('portfolio', self.portfolio.update_fill))         #broker tells the portfolio how much of the order was filled
+        bus.subscribe(FillEvent, handler('portfolio', self.portfolio.update_timeindex))
+        if self.results is not None:
+            bus.subscribe(FillEvent, self.results.record_fill)
+        
+        #subscribed last so that every component has finished with an event before it is recycled
+        for pool in self.pools:
+            bus.subscribe(pool.event_class, pool.release)
+        
+    def handler(self, component, method):
+        
+        #the bare method unless profiling is enabled
+        
+        if self.profiler is None:
+            return method
+        
+        return self.profiler.wrap(component, method)
+        
+    def log_event(self, event):
+        logger.debug('%s', event.__class__.__name__)
+        
+    def update_event_log(self):
+        
+        #Subscribes the per-event logger if DEBUG is enabled at the start of a run and removes it if not,
+        #so it costs nothing per event otherwise
+        
+        bus = self.event_queue
+        subscribed = self.log_event in bus.subscribers.get(Event, ())
+        enabled = logger.isEnabledFor(logging.DEBUG)
+        
+        if enabled and not subscribed:
+            bus.subscribe(Event, self.log_event)
+        elif subscribed and not enabled:
+            bus.unsubscribe(Event, self.log_event)
+        
+    def get_state(self):
+        
+        return {'bars': self.bars,
+                'events': self.events,
+                'data': self.data.get_state(),
+                'strategy': self.strategy.get_state(),
+                'portfolio': self.portfolio.get_state(),
+                'broker': self.broker.get_state()}
+    
+    def set_state(self, state):
+        
+        self.bars = state['bars']
+        self.events = state['events']
+        self.data.set_state(state['data'])
+        self.strategy.set_state(state['strategy'])
+        self.portfolio.set_state(state['portfolio'])
+        self.broker.set_state(state['broker'])
+        
+    def resume(self):
+        
+        #Restores every component from the checkpoint file. Returns False if there is none
+        
+        state = self.checkpoint.load() if self.checkpoint is not None else None
+        if state is None:
+            return False
+        
+        self.set_state(state)
+        logger.info('resumed from %s at bar %d', self.checkpoint.path, self.bars)
+        return True
+        
+    def run(self, resume = False):
+        
+        #Runs until the data handler is exhausted and returns the portfolio's summary stats
+        #resume - carry on from the last checkpoint if there is one, rather than from the first bar
+        
+        #the level checks are hoisted out of the loop so that disabled logging costs nothing per bar
+        self.update_event_log()
+        log_bars = logger.isEnabledFor(logging.INFO)
+        paced = self.clock == PACED
+        profiler = self.profiler
+        update_data = self.handler('data', self.data.update_data)
+        
+        checkpoint = self.checkpoint
+        results = self.results
+        
+        #the rows a results file held up to the checkpoint are lost with the crashed run: an unclosed zip cannot be reopened
+        if resume and results is not None:
+            raise ValueError('cannot resume while recording results; run the resumed backtest without a ResultsWriter')
+        
+        if not (resume and self.resume()):
+            self.bars = 0
+            self.events = 0
+        start = time.perf_counter()
+        next_tick = start
+        
+        #outer loop: drip-feed of market data
+        while self.data.continue_backtest:
+            update_data()
+            if self.event_queue.empty():
+                continue    #the data handler had no bar left: there is no MarketEvent to count or record
+            self.bars += 1
+            
+            #handles events in the queue until it is empty, then gets new data
+            events = self.event_queue.dispatch()
+            self.events += events
+            if profiler is not None:
+                profiler.end_bar(events)
+            
+            if results is not None:
+                results.record_bar(*self.portfolio.latest_state())
+            
+            if checkpoint is not None and self.bars % checkpoint.every == 0:
+                checkpoint.save(self.get_state())
+            
+            if log_bars: logger.info('bar %d processed', self.bars)
+            
+            if paced:
+                #sleep until the next tick rather than for a fixed time so handler time is not added to the interval
+                next_tick += self.interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        
+        self.elapsed = time.perf_counter() - start
+        
+        stats = self.portfolio.output_summary_stats()
+        if results is not None:
+            results.close(create_summary_values(self.portfolio.equity_curve))
+        logger.info(self.throughput_report())
+        
+        return stats
+
+class MultiBacktest(BacktestBase):
+    
+    #Runs several (strategy, portfolio, broker) pipelines over a single pass of one data handler.
+    #The data handler puts its MarketEvents on a feed EventBus of its own; every MarketEvent is handed
+    #to each pipeline's EventBus and the pipelines are dispatched one after another, so each bar is
+    #read once while the signals, orders and fills of different pipelines never share a queue.
+    #The MarketEvent itself, and its BarSnapshot, are shared: handlers must not modify them.
+    #events counts the events the pipelines handle, each MarketEvent once per pipeline; handing it
+    #out on the feed is not counted, so events/sec compares with the same pipelines run one by one.
+    #
+    #Each pipeline's components are constructed on their own EventBus, e.g.
+    #    feed = EventBus()
+    #    data = HistoricArrayDataHandler(feed, CSV_dir, symbol_list)
+    #    bus = EventBus()
+    #    pipelines = [(BuyAndHoldStrategy(data, bus), NaivePortfolio(bus, data, start_date), SimulatedExecutionHandler(bus)), ...]
+    #    stats = MultiBacktest(feed, data, pipelines).run()
+    
+    def __init__(self, event_queue, data, pipelines):
+        
+        #event_queue - the EventBus the data handler puts MarketEvents on
+        #pipelines - a list of (strategy, portfolio, broker) triples, each built on its own EventBus
+        
+        self.event_queue = event_queue
+        self.data = data
+        self.backtests = []
+        
+        seen = {id(event_queue)}
+        for strategy, portfolio, broker in pipelines:
+            bus = portfolio.event_queue
+            if strategy.event_queue is not bus or broker.event_queue is not bus:
+                raise ValueError('the strategy, portfolio and broker of a pipeline must share one event queue')
+            if id(bus) in seen:
+                raise ValueError('every pipeline needs its own event queue, separate from the data feed')
+            seen.add(id(bus))
+            
+            self.backtests.append(Backtest(bus, data, strategy, portfolio, broker))
+        
+        self.reset_counters()
+        
+        #bound once: the fan-out runs for every MarketEvent
+        self.pipeline_puts = [backtest.event_queue.put for backtest in self.backtests]
+        event_queue.subscribe(MarketEvent, self.fan_out)
+        
+    def fan_out(self, event):
+        for put in self.pipeline_puts:
+            put(event)
+            
+    def run(self):
+        
+        #Runs until the data handler is exhausted and returns a list of summary stats, one per pipeline
+        
+        log_bars = logger.isEnabledFor(logging.INFO)
+        feed = self.event_queue
+        backtests = self.backtests
+        
+        for backtest in backtests:
+            backtest.update_event_log()
+            backtest.reset_counters()
+        self.reset_counters()
+        start = time.perf_counter()
+        
+        while self.data.continue_backtest:
+            self.data.update_data()
+            if feed.empty():
+                continue    #no bar left
+            self.bars += 1
+            feed.dispatch()    #hands the MarketEvent to every pipeline's queue
+            
+            for backtest in backtests:
+                events = backtest.event_queue.dispatch()
+                backtest.events += events
+                self.events += events
+                
+            if log_bars: logger.info('bar %d processed', self.bars)
+        
+        self.elapsed = time.perf_counter() - start
+        
+        stats = []
+        for backtest in backtests:
+            backtest.bars = self.bars
+            backtest.elapsed = self.elapsed
+            stats.append(backtest.portfolio.output_summary_stats())
+        logger.info(self.throughput_report())
+        
+        return stats
@@ -0,0 +1,90 @@
+#Micro-benchmark: events/sec through the original loop.py inner loop (queue.Queue, get_nowait,
+#exception on empty and an isinstance chain) against EventBus.dispatch.
+#Handlers are no-ops that reproduce the loop's event cascade (market -> signal -> order -> fill),
+#so only the queueing and dispatch overhead is measured.
+#
+#Run with: python -m Event_Driven_Backtester.benchmarks.event_dispatch [bars]
+
+#PYTHON MODULES
+
+import sys
+import time
+from queue import Queue
+
+#MY MODULES
+
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.events import (MarketEvent, SignalEvent, OrderEvent, FillEvent, Direction, SignalType)
+
+SIGNAL = SignalEvent('AAPL', None, SignalType.LONG)
+ORDER = OrderEvent('AAPL', 'MARKET', 100, Direction.BUY)
+FILL = FillEvent('AAPL', None, 'ARCA', 100, Direction.BUY, None)
+MARKET = MarketEvent()
+
+def run_legacy(bars):
+    
+    event_queue = Queue()
+    events = 0
+    
+    for _ in range(bars):
+        event_queue.put(MARKET)
+        
+        while True:
+            try:
+                event = event_queue.get_nowait()
+            except:
+                break
+            
+            events += 1
+            if event is not None:
+                if isinstance(event, MarketEvent):
+                    event_queue.put(SIGNAL)
+                elif isinstance(event, SignalEvent):
+                    event_queue.put(ORDER)
+                elif isinstance(event, OrderEvent):
+                    event_queue.put(FILL)
+                elif isinstance(event, FillEvent):
+                    pass
+                
+    return events
+
+def run_bus(bars):
+    
+    bus = EventBus()
+    put = bus.put
+    bus.subscribe(MarketEvent, lambda event: put(SIGNAL))
+    bus.subscribe(SignalEvent, lambda event: put(ORDER))
+    bus.subscribe(OrderEvent, lambda event: put(FILL))
+    bus.subscribe(FillEvent, lambda event: None)
+    
+    events = 0
+    for _ in range(bars):
+        put(MARKET)
+        events += bus.dispatch()
+        
+    return events
+
+def measure(run, bars, repeats = 3):
+    
+    #Returns the best events/sec over several repeats
+    
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        events = run(bars)
+        best = max(best, events/(time.perf_counter() - start))
+    return best
+
+def main(bars = 100000):
+    
+    legacy = measure(run_legacy, bars)
+    bus = measure(run_bus, bars)
+    
+    print('queue.Queue + isinstance: {:>12,.0f} events/sec'.format(legacy))
+    print('EventBus:                 {:>12,.0f} events/sec'.format(bus))
+    print('speedup:                  {:>12.2f}x'.format(bus/legacy))
+    
+    return legacy, bus
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
@@ -0,0 +1,91 @@
+#Benchmark: memory and creation throughput of the slotted event classes against the original
+#__dict__-based classes, with and without an EventPool.
+#
+#Run with: python -m Event_Driven_Backtester.benchmarks.events [count]
+
+#PYTHON MODULES
+
+import sys
+import time
+import tracemalloc
+
+#MY MODULES
+
+from Event_Driven_Backtester.events import (FillEvent, Direction, EventPool)
+
+class LegacyFillEvent():
+    #The original FillEvent: a plain class with a per-instance __dict__ and a string direction
+    
+    def __init__(self, symbol, datestamp, exchange, quantity, direction, fill_cost, commission = 0):
+        self.symbol = symbol
+        self.datestamp = datestamp
+        self.exchange = exchange
+        self.quantity = quantity
+        self.direction = direction
+        self.fill_cost = fill_cost
+        self.commission = commission
+
+def legacy_fill_dir(event):
+    #The original string comparison from NaivePortfolio.update_positions_from_fill
+    if event.direction == 'BUY':
+        return 1
+    else:
+        return -1
+
+def bytes_per_event(make, count):
+    
+    #Peak traced memory per event while count events are alive
+    
+    tracemalloc.start()
+    events = [make() for _ in range(count)]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del events
+    
+    return peak/count
+
+def events_per_sec(run, count, repeats = 3):
+    
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run(count)
+        best = max(best, count/(time.perf_counter() - start))
+    return best
+
+def main(count = 200000):
+    
+    def legacy(n):
+        for _ in range(n):
+            event = LegacyFillEvent('AAPL', None, 'ARCA', 100, 'BUY', None)
+            legacy_fill_dir(event)*event.quantity
+    
+    def slotted(n):
+        for _ in range(n):
+            event = FillEvent('AAPL', None, 'ARCA', 100, Direction.BUY, None)
+            event.direction*event.quantity
+            
+    pool = EventPool(FillEvent)
+    
+    def pooled(n):
+        for _ in range(n):
+            event = pool.acquire('AAPL', None, 'ARCA', 100, Direction.BUY, None)
+            event.direction*event.quantity
+            pool.release(event)
+    
+    memory = [('legacy', bytes_per_event(lambda: LegacyFillEvent('AAPL', None, 'ARCA', 100, 'BUY', None), count)),
+              ('slotted', bytes_per_event(lambda: FillEvent('AAPL', None, 'ARCA', 100, Direction.BUY, None), count))]
+    
+    throughput = [('legacy', events_per_sec(legacy, count)),
+                  ('slotted', events_per_sec(slotted, count)),
+                  ('pooled', events_per_sec(pooled, count))]
+    
+    for name, size in memory:
+        print('{:<8} {:>8.1f} bytes/event'.format(name, size))
+    for name, rate in throughput:
+        print('{:<8} {:>12,.0f} fills/sec'.format(name, rate))
+        
+    return dict(memory), dict(throughput)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:2]])
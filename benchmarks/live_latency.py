@@ -0,0 +1,59 @@
+#End-to-end latency of the asyncio LiveRuntime against the local MockFeedServer and MockBrokerServer.
+#Bars are synthetic (see synthetic.py) and are streamed as fast as the runtime accepts them unless an
+#interval is given, so the bar latencies include time spent queued behind earlier bars.
+#
+#Run with: python -m Event_Driven_Backtester.benchmarks.live_latency [symbols] [bars] [broker delay] [interval]
+
+#PYTHON MODULES
+
+import asyncio
+import datetime
+import json
+import os
+import sys
+import tempfile
+
+#MY MODULES
+
+from Event_Driven_Backtester.benchmarks.synthetic import generate
+from Event_Driven_Backtester.data import load_symbol_arrays
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.live import (LiveRuntime, MockFeedServer, MockBrokerServer, SocketDataHandler, SocketExecutionHandler)
+from Event_Driven_Backtester.portfolio import NaivePortfolio
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+async def run(symbols, bars, delay, interval):
+    
+    csv_dir = os.path.join(tempfile.gettempdir(), 'backtester_synthetic', '{}x{}_0'.format(symbols, bars))
+    symbol_list = generate(csv_dir, symbols, bars)
+    dates, values = load_symbol_arrays(csv_dir, symbol_list)
+    
+    feed = MockFeedServer(dates, values, symbol_list, interval = interval)
+    exchange = MockBrokerServer(delay = delay)
+    await feed.start()
+    await exchange.start()
+    
+    event_queue = EventBus()
+    data = SocketDataHandler(feed.host, feed.port, symbol_list)
+    strategy = BuyAndHoldStrategy(data, event_queue)
+    portfolio = NaivePortfolio(event_queue, data, datetime.date(2000, 1, 1))
+    broker = SocketExecutionHandler(exchange.host, exchange.port)
+    runtime = LiveRuntime(event_queue, data, strategy, portfolio, broker, bar_timeout = 5.0)
+    
+    try:
+        stats = await runtime.run_async()
+    finally:
+        await feed.close()
+        await exchange.close()
+    
+    return stats, runtime.latency_report()
+
+def main(symbols = 10, bars = 1000, delay = 0.001, interval = 0.0):
+    
+    stats, report = asyncio.run(run(symbols, bars, delay, interval))
+    print(json.dumps(report, indent = 2))
+    
+    return stats, report
+
+if __name__ == '__main__':
+    main(*[t(a) for t, a in zip((int, int, float, float), sys.argv[1:5])])
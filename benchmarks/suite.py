@@ -0,0 +1,200 @@
+#Regression benchmarks on synthetic data (see synthetic.py): data loading, events/sec through the
+#Backtest loop, portfolio mark-to-market and summary stats. Each benchmark reports the best time over
+#several repeats; --save stores the results in baseline.json next to this file and --compare checks a
+#run against it, exiting with status 1 if any benchmark is slower than the baseline by more than --tolerance.
+#
+#Run with: python -m Event_Driven_Backtester.benchmarks.suite [--preset small|medium|large]
+#          [--symbols N --bars N] [--data-dir DIR] [--save | --compare] [--tolerance 0.25]
+
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from os.path import (dirname, join)
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.benchmarks.synthetic import generate
+from Event_Driven_Backtester.cache import SymbolDataCache
+from Event_Driven_Backtester.data import (HistoricCSVDataHandler, HistoricArrayDataHandler, load_symbol_arrays)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import LedgerPortfolio
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+PRESETS = {'small': (10, 1000),
+           'medium': (100, 10000),
+           'large': (500, 50000)}
+
+BASELINE = join(dirname(__file__), 'baseline.json')
+START_DATE = datetime.date(2000, 1, 3)
+
+def best_time(run, repeats):
+    
+    #Returns the fastest of several calls to run() in seconds, and the result of the last call
+    
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def build_backtest(arrays, symbol_list):
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, symbol_list, arrays = arrays)
+    strategy = BuyAndHoldStrategy(data, event_queue)
+    portfolio = LedgerPortfolio(event_queue, data, START_DATE)
+    broker = SimulatedExecutionHandler(event_queue)
+    return Backtest(event_queue, data, strategy, portfolio, broker)
+
+def mark_to_market(arrays, symbol_list):
+    
+    #Only the portfolio's update_timeindex, once per bar
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, symbol_list, arrays = arrays)
+    portfolio = LedgerPortfolio(event_queue, data, START_DATE)
+    
+    elapsed = 0.0
+    while data.continue_backtest:
+        data.update_data()
+        event = event_queue.queue.popleft()
+        start = time.perf_counter()
+        portfolio.update_timeindex(event)
+        elapsed += time.perf_counter() - start
+    
+    return elapsed, portfolio
+
+def run_suite(csv_dir, symbol_list, repeats = 3):
+    
+    #Returns {benchmark: {'seconds': ..., 'rate': ..., 'unit': ...}}
+    
+    results = {}
+    
+    def record(name, seconds, count, unit):
+        results[name] = {'seconds': seconds, 'rate': count/seconds if seconds > 0 else 0.0, 'unit': unit}
+    
+    seconds, arrays = best_time(lambda: load_symbol_arrays(csv_dir, symbol_list), repeats)
+    n_bars = len(arrays[0])
+    values = n_bars*len(symbol_list)
+    record('load_arrays', seconds, values, 'symbol-bars/sec')
+    
+    seconds, _ = best_time(lambda: HistoricCSVDataHandler(EventBus(), csv_dir, symbol_list), repeats)
+    record('load_csv_frames', seconds, values, 'symbol-bars/sec')
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SymbolDataCache(cache_dir)
+        cache.load(csv_dir, symbol_list, load_symbol_arrays)    #cold load populates the cache
+        seconds, _ = best_time(lambda: cache.load(csv_dir, symbol_list, load_symbol_arrays), repeats)
+        record('load_cache_warm', seconds, values, 'symbol-bars/sec')
+    
+    backtest = None
+    events = best = 0
+    for _ in range(repeats):
+        backtest = build_backtest(arrays, symbol_list)
+        backtest.run()
+        if best == 0 or backtest.elapsed < best:
+            best, events = backtest.elapsed, backtest.events
+    record('loop', best, events, 'events/sec')
+    
+    seconds = min(mark_to_market(arrays, symbol_list)[0] for _ in range(repeats))
+    record('mark_to_market', seconds, n_bars, 'bars/sec')
+    
+    seconds, _ = best_time(backtest.portfolio.output_summary_stats, repeats)
+    record('summary_stats', seconds, n_bars, 'bars/sec')
+    
+    return results
+
+def read_baseline(path = BASELINE):
+    
+    if not os.path.exists(path):
+        return {}
+    
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(key, results, path = BASELINE):
+    
+    baseline = read_baseline(path)
+    baseline[key] = {'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'machine': platform.machine(),
+                     'results': results}
+    
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent = 2, sort_keys = True)
+
+def compare(results, baseline, tolerance = 0.25):
+    
+    #Returns a list of (benchmark, baseline seconds, seconds, ratio, regressed)
+    
+    rows = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['seconds']/baseline[name]['seconds']
+        rows.append((name, baseline[name]['seconds'], result['seconds'], ratio, ratio > 1.0 + tolerance))
+    return rows
+
+def main(argv = None):
+    
+    parser = argparse.ArgumentParser(description = 'Backtester benchmark suite on synthetic data')
+    parser.add_argument('--preset', choices = sorted(PRESETS), default = 'small')
+    parser.add_argument('--symbols', type = int, help = 'overrides the preset, 1 to 5000')
+    parser.add_argument('--bars', type = int, help = 'overrides the preset, 1e3 to 1e7')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--data-dir', help = 'where the synthetic CSVs are written and reused')
+    parser.add_argument('--repeats', type = int, default = 3)
+    parser.add_argument('--save', action = 'store_true', help = 'store the results as the baseline')
+    parser.add_argument('--compare', action = 'store_true', help = 'compare the results against the baseline')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'allowed slowdown before a regression')
+    args = parser.parse_args(argv)
+    
+    n_symbols, n_bars = PRESETS[args.preset]
+    n_symbols = args.symbols or n_symbols
+    n_bars = int(args.bars or n_bars)
+    key = '{}x{}'.format(n_symbols, n_bars)
+    
+    data_dir = args.data_dir or join(tempfile.gettempdir(), 'backtester_synthetic', '{}_{}'.format(key, args.seed))
+    symbol_list = generate(data_dir, n_symbols, n_bars, args.seed)
+    
+    results = run_suite(data_dir, symbol_list, args.repeats)
+    
+    print('{} symbols x {} bars'.format(n_symbols, n_bars))
+    for name, result in results.items():
+        print('{:<16} {:>10.4f}s {:>16,.0f} {}'.format(name, result['seconds'], result['rate'], result['unit']))
+    
+    if args.save:
+        save_baseline(key, results)
+        print('baseline saved for {}'.format(key))
+    
+    if args.compare:
+        baseline = read_baseline().get(key)
+        if baseline is None:
+            print('no baseline for {}'.format(key))
+            return 1
+        
+        regressed = False
+        for name, old, new, ratio, slower in compare(results, baseline['results'], args.tolerance):
+            print('{:<16} {:>10.4f}s -> {:>10.4f}s {:>6.2f}x {}'.format(name, old, new, ratio, 'REGRESSION' if slower else ''))
+            regressed = regressed or slower
+        return 1 if regressed else 0
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#Deterministic synthetic OHLCV data in the date,open,high,low,close,volume,adj_close layout
+#read by HistoricCSVDataHandler and the other data handlers.
+#Each symbol is a geometric random walk seeded from (seed, symbol number), so a symbol's bars do not
+#depend on how many other symbols are generated, and the same arguments always write the same files.
+#Bars are generated and written in blocks, so 1e7 bars per symbol never sit in memory at once.
+#
+#Run with: python -m Event_Driven_Backtester.benchmarks.synthetic csv_dir [symbols] [bars] [seed]
+
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+#PYTHON MODULES
+
+import os
+import sys
+from os.path import join
+
+DAILY_LIMIT = 100000    #more bars than this are generated as minute bars, daily dates would run past the year 2262
+BLOCK = 1000000         #bars generated and written per block
+
+def symbol_names(n_symbols):
+    return ['SYM{:04d}'.format(i) for i in range(n_symbols)]
+
+def bar_dates(n_bars, start = '2000-01-03'):
+    
+    #Business days for daily data, otherwise consecutive minutes.
+    #Returns (dates, unit, bars per day): unit is the numpy datetime unit used to write the dates
+    
+    if n_bars <= DAILY_LIMIT:
+        return pd.bdate_range(start, periods = n_bars).values, 'D', 1
+    
+    return pd.date_range(start, periods = n_bars, freq = 'min').values, 'm', 390
+
+def generate_bars(rng, n_bars, last_close, drift = 0.0002, volatility = 0.02):
+    
+    #One block of bars continuing from last_close.
+    #Returns a float array of shape (n_bars, 6) with columns open, high, low, close, volume, adj_close
+    
+    returns = rng.normal(drift - 0.5*volatility**2, volatility, n_bars)
+    close = last_close*np.exp(np.cumsum(returns))
+    opening = np.empty(n_bars)
+    opening[0] = last_close
+    opening[1:] = close[:-1]
+    opening *= np.exp(rng.normal(0.0, 0.25*volatility, n_bars))    #overnight gaps
+    
+    spread = np.abs(rng.normal(0.0, 0.5*volatility, (2, n_bars)))
+    high = np.maximum(opening, close)*(1.0 + spread[0])
+    low = np.minimum(opening, close)*(1.0 - spread[1])
+    volume = rng.lognormal(14.0, 0.5, n_bars).round()
+    
+    return np.column_stack([opening, high, low, close, volume, close]).round(4)
+
+def write_symbol(path, n_bars, seed, number, start_price = 100.0):
+    
+    rng = np.random.default_rng([seed, number])
+    dates, unit, per_day = bar_dates(n_bars)
+    last_close = start_price*np.exp(rng.normal(0.0, 0.5))
+    
+    with open(path, 'w') as f:
+        f.write('date,open,high,low,close,volume,adj_close\n')
+        
+        for start in range(0, n_bars, BLOCK):
+            stop = min(start + BLOCK, n_bars)
+            bars = generate_bars(rng, stop - start, last_close, 0.0002/per_day, 0.02/np.sqrt(per_day))
+            last_close = bars[-1, 3]
+            
+            #the values are already rounded, so their shortest repr is written without a slow float_format
+            frame = pd.DataFrame(bars, index = np.datetime_as_string(dates[start:stop], unit = unit),
+                                 columns = ['open', 'high', 'low', 'close', 'volume', 'adj_close'])
+            frame['volume'] = frame['volume'].astype(np.int64)
+            frame.to_csv(f, header = False)
+
+def generate(csv_dir, n_symbols = 10, n_bars = 1000, seed = 0):
+    
+    #Writes n_symbols CSV files of n_bars each into csv_dir and returns the symbol list.
+    #Files that already exist with the same symbols, bars and seed are reused (see the marker file).
+    
+    if n_symbols < 1 or n_bars < 1:
+        raise ValueError('n_symbols and n_bars must be positive')
+    
+    os.makedirs(csv_dir, exist_ok = True)
+    symbols = symbol_names(n_symbols)
+    
+    marker = join(csv_dir, '.synthetic')
+    spec = '{} {} {}'.format(n_symbols, n_bars, seed)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if f.read() == spec:
+                return symbols
+    
+    for i, s in enumerate(symbols):
+        write_symbol(join(csv_dir, '{}.csv'.format(s)), n_bars, seed, i)
+    
+    with open(marker, 'w') as f:
+        f.write(spec)
+    
+    return symbols
+
+if __name__ == '__main__':
+    generate(sys.argv[1], *[int(a) for a in sys.argv[2:5]])
@@ -0,0 +1,163 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from os.path import (abspath, exists, join)
+
+#Bump whenever the on-disk layout changes so that old entries are rebuilt
+CACHE_VERSION = 1
+
+def file_signature(path, with_hash = True):
+    
+    #Returns a dictionary describing a source file: its mtime, size and optionally a sha1 of the contents
+    
+    stat = os.stat(path)
+    signature = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    
+    if with_hash:
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        signature['sha1'] = sha1.hexdigest()
+    
+    return signature
+
+class SymbolDataCache():
+    
+    #Stores the aligned (dates, bars) arrays built from a set of CSV files as .npy files,
+    #one directory per (csv_dir, symbol_list) combination, alongside a manifest.json that
+    #records the mtime, size and sha1 of every source CSV.
+    #Later loads memory-map the .npy files instead of re-parsing the CSVs.
+    #An entry is rebuilt automatically when any source CSV changes.
+    
+    def __init__(self, cache_dir):
+        
+        #cache_dir - directory in which cache entries are kept, created if missing
+        
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok = True)
+        
+    def entry_dir(self, csv_dir, symbol_list):
+        
+        #Each entry is keyed by the absolute csv directory and the ordered symbol list
+        
+        key = json.dumps([abspath(csv_dir), list(symbol_list)])
+        return join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+        
+    def source_paths(self, csv_dir, symbol_list):
+        return {s: join(csv_dir, '{}.csv'.format(s)) for s in symbol_list}
+        
+    def is_valid(self, entry, csv_dir, symbol_list):
+        
+        #Compares the manifest against the current source files.
+        #mtime and size are checked first; if only those differ the sha1 decides,
+        #so touching a file without changing it does not force a rebuild.
+        
+        manifest_path = join(entry, 'manifest.json')
+        if not exists(manifest_path):
+            return False
+        
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+            
+        if manifest.get('version') != CACHE_VERSION or manifest.get('symbol_list') != list(symbol_list):
+            return False
+        
+        touched = False
+        for s, path in self.source_paths(csv_dir, symbol_list).items():
+            recorded = manifest['sources'].get(s)
+            if recorded is None or not exists(path):
+                return False
+            
+            current = file_signature(path, with_hash = False)
+            if current['size'] != recorded['size']:
+                return False
+            
+            if current['mtime_ns'] != recorded['mtime_ns']:
+                if file_signature(path)['sha1'] != recorded['sha1']:
+                    return False
+                recorded['mtime_ns'] = current['mtime_ns']
+                touched = True
+        
+        if touched:
+            self.write_manifest(entry, manifest)
+            
+        return True
+    
+    def write_manifest(self, entry, manifest):
+        
+        #The manifest is written last and atomically, so a half-written entry is never treated as valid
+        
+        fd, tmp_path = tempfile.mkstemp(dir = entry, suffix = '.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f, indent = 1)
+        os.replace(tmp_path, join(entry, 'manifest.json'))
+        
+    def store(self, csv_dir, symbol_list, dates, bars):
+        
+        #Writes a new entry, replacing any existing one for this csv_dir and symbol_list.
+        #The entry is built in a temporary directory and renamed into place, and an old entry is renamed
+        #out of the way before it is removed, so files another process has memory-mapped are never rewritten
+        #and a reader sees either the old entry, no entry or the complete new one.
+        
+        entry = self.entry_dir(csv_dir, symbol_list)
+        tmp_entry = tempfile.mkdtemp(dir = self.cache_dir, suffix = '.tmp')
+        
+        try:
+            np.save(join(tmp_entry, 'dates.npy'), dates)
+            np.save(join(tmp_entry, 'bars.npy'), bars)
+            
+            manifest = {'version': CACHE_VERSION,
+                        'symbol_list': list(symbol_list),
+                        'shape': list(bars.shape),
+                        'sources': {s: file_signature(path) for s, path in self.source_paths(csv_dir, symbol_list).items()}}
+            self.write_manifest(tmp_entry, manifest)
+            
+            if exists(entry):
+                stale = tempfile.mkdtemp(dir = self.cache_dir, suffix = '.stale')
+                try:
+                    os.replace(entry, join(stale, 'entry'))
+                except FileNotFoundError:
+                    pass    #another process replaced it already
+                shutil.rmtree(stale)    #open memory maps keep the removed files' contents
+            
+            try:
+                os.rename(tmp_entry, entry)
+            except OSError:
+                #another process stored the same entry first; it was built from the same files
+                if not exists(entry):
+                    raise
+        finally:
+            if exists(tmp_entry):
+                shutil.rmtree(tmp_entry)
+        
+    def load(self, csv_dir, symbol_list, build):
+        
+        #Returns memory-mapped (dates, bars) arrays for the symbols.
+        #build - a function (csv_dir, symbol_list) -> (dates, bars), called on a cache miss
+        
+        entry = self.entry_dir(csv_dir, symbol_list)
+        
+        if not self.is_valid(entry, csv_dir, symbol_list):
+            dates, bars = build(csv_dir, symbol_list)
+            self.store(csv_dir, symbol_list, dates, bars)
+        
+        dates = np.load(join(entry, 'dates.npy'), mmap_mode = 'r')
+        bars = np.load(join(entry, 'bars.npy'), mmap_mode = 'r')
+        
+        return dates, bars
+    
+    def clear(self):
+        
+        #Removes every entry from the cache directory
+        
+        shutil.rmtree(self.cache_dir)
+        os.makedirs(self.cache_dir)
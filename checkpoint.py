@@ -0,0 +1,68 @@
+#PYTHON MODULES
+
+import os
+import pickle
+import zlib
+
+#The first bytes of every checkpoint file, followed by a zlib-compressed pickle
+MAGIC = b'EDBCKPT1'
+
+class Checkpointer():
+    
+    #Saves the state of a Backtest to a single binary file every `every` bars so an interrupted
+    #run can resume at the bar after the last checkpoint: Backtest(..., checkpoint = Checkpointer(path)),
+    #then backtest.run(resume = True) in the restarted process with the components constructed as before.
+    #Each component supplies its own get_state/set_state. Data handlers store a cursor rather than
+    #the bars, which are read again from the CSV files or the cache on restore.
+    #Checkpoints are written at the end of a bar, when the event queue is empty, so no events are in flight.
+    
+    def __init__(self, path, every = 1000, level = 1):
+        
+        #path - the checkpoint file, replaced atomically on every save
+        #every - the number of bars between checkpoints
+        #level - zlib compression level, 0 to 9
+        
+        if every < 1:
+            raise ValueError('every must be at least 1, not {}'.format(every))
+        
+        self.path = path
+        self.every = every
+        self.level = level
+    
+    def exists(self):
+        return os.path.exists(self.path)
+    
+    def save(self, state):
+        
+        #Writes to a temporary file first so that a crash mid-write leaves the previous checkpoint intact
+        
+        payload = zlib.compress(pickle.dumps(state, protocol = pickle.HIGHEST_PROTOCOL), self.level)
+        
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+    
+    def load(self):
+        
+        #Returns the saved state, or None if there is no checkpoint
+        #Only load checkpoints you wrote yourself: they are pickles
+        
+        if not self.exists():
+            return None
+        
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        
+        if not data.startswith(MAGIC):
+            raise ValueError('{} is not a backtest checkpoint'.format(self.path))
+        
+        return pickle.loads(zlib.decompress(data[len(MAGIC):]))
+    
+    def clear(self):
+        
+        if self.exists():
+            os.remove(self.path)
@@ -1,16 +1,23 @@
 #PYTHON PACKAGES
 
+import numpy as np
 import pandas as pd
 
 #PYTHON MODULES
 
+import heapq
+import io
+import re
 from abc import (ABCMeta, abstractmethod)
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from os.path import (dirname, join, realpath)
 
 #MY MODULES
 
-from Event_Driven_Backtester.events import MarketEvent
+from Event_Driven_Backtester.events import (MarketEvent, BarSnapshot)
+from Event_Driven_Backtester.cache import SymbolDataCache
 
 #This is an abstract base class and so cannot be instantiated.
 #Creates an common interface so that live data feeds can be inputted later
@@ -50,6 +57,7 @@ class HistoricCSVDataHandler(DataAbstractClass):
         self.latest_symbol_data = {s:[] for s in symbol_list}   #a dictionary containing a list of tuples for each symbol
         
         self.continue_backtest = True
+        self.indicators = None    #an IndicatorService updated on every bar, see indicators.py
         
         self.initial_symbol_data()     #Load in the CSV file
         
@@ -69,12 +77,17 @@ class HistoricCSVDataHandler(DataAbstractClass):
             if combined_index is None:
                 combined_index = self.symbol_data[s].index
             else:
-                combined_index.union(self.symbol_data[s].index)
+                combined_index = combined_index.union(self.symbol_data[s].index)
         
-        #reindexes each dataframe and forward fills if there are gaps. Sorts to have the oldest data at the top
+        combined_index = combined_index.sort_values()
+        
+        #sorts to have the oldest data at the top, then reindexes each dataframe and forward fills if there are gaps
         #Creates a generator that iterates through rows
         for s in self.symbol_list:
-            self.symbol_data[s] = self.symbol_data[s].reindex(index = combined_index, method = 'ffill').sort_index().iterrows()
+            self.symbol_data[s] = self.symbol_data[s].sort_index().reindex(index = combined_index, method = 'ffill').iterrows()
+        
+        #one generator per symbol, created once and advanced by update_data
+        self.bar_generators = {s: self.new_data_generator(s) for s in self.symbol_list}
             
     def new_data_generator(self, symbol):
         #a generator that yields the latest row from the data as a tuple:
@@ -98,9 +111,498 @@ class HistoricCSVDataHandler(DataAbstractClass):
         
         for s in self.symbol_list:
             try:
-                data = next(self.new_data_generator(s))
+                data = next(self.bar_generators[s])
                 self.latest_symbol_data[s].append(data)
-            except:
+            except StopIteration:
                 self.continue_backtest = False   #if there is no data left
+        
+        if not self.continue_backtest:
+            return    #no new bar, so no MarketEvent
+        
+        if self.indicators is not None:
+            self.indicators.update()
             
         self.event_queue.put(MarketEvent())
+        
+    def get_state(self):
+        
+        #The cursor for a checkpoint: the number of bars released. The rows themselves are read again from the CSV files
+        
+        return {'symbol_list': list(self.symbol_list),
+                'bars': len(self.latest_symbol_data[self.symbol_list[0]]),
+                'continue_backtest': self.continue_backtest,
+                'indicators': self.indicators.get_state() if self.indicators is not None else None}
+    
+    def set_state(self, state):
+        
+        #Reopens the CSV files and advances the generators to the checkpointed bar without emitting MarketEvents
+        
+        check_symbols(self, state)
+        
+        self.latest_symbol_data = {s: [] for s in self.symbol_list}
+        self.initial_symbol_data()
+        
+        for s in self.symbol_list:
+            self.latest_symbol_data[s].extend(islice(self.bar_generators[s], state['bars']))
+        self.continue_backtest = state['continue_backtest']
+        
+        restore_indicators(self, state)
+
+def check_symbols(data, state):
+    
+    if list(data.symbol_list) != state['symbol_list']:
+        raise ValueError('the checkpoint is for symbols {}, not {}'.format(state['symbol_list'], list(data.symbol_list)))
+    
+def restore_indicators(data, state):
+    
+    if state['indicators'] is not None:
+        if data.indicators is None:
+            raise ValueError('the checkpoint has indicators but the data handler has no IndicatorService')
+        data.indicators.set_state(state['indicators'])
+
+#The per-bar fields held by HistoricArrayDataHandler, in the order of the last axis of its bars array
+FIELDS = ('open', 'high', 'low', 'close', 'volume', 'adj_close')
+FIELD_INDEX = {f: i for i, f in enumerate(FIELDS)}
+
+def load_symbol_arrays(csv_dir, symbol_list):
+    
+    #Opens each CSV file, aligns every symbol onto the sorted union of all dates and
+    #forward fills gaps. Dates before a symbol's first bar are left as NaN.
+    #Returns (dates, bars): a numpy datetime64 array and a float array of shape (bars, symbols, fields)
+    
+    frames = {}
+    combined_index = None
+    
+    for s in symbol_list:
+        path = join(csv_dir, '{}.csv'.format(s))
+        frames[s] = pd.read_csv(path, index_col = 'date', parse_dates = True)
+        
+        if combined_index is None:
+            combined_index = frames[s].index
+        else:
+            combined_index = combined_index.union(frames[s].index)
+    
+    combined_index = combined_index.sort_values()
+    
+    dates = combined_index.values
+    bars = np.empty((len(combined_index), len(symbol_list), len(FIELDS)))
+    
+    for i, s in enumerate(symbol_list):
+        frame = frames[s].sort_index()
+        frame = frame[~frame.index.duplicated(keep = 'last')]
+        bars[:, i, :] = frame.reindex(combined_index).ffill()[list(FIELDS)].values
+        
+    return dates, bars
+
+class BarWindow():
+    
+    #A view over the latest N bars of a single symbol held by HistoricArrayDataHandler; nothing is copied.
+    #The handler's array is bar-major, so the view strides over the other symbols' rows rather than being contiguous.
+    #Indexing a row returns the same tuple as HistoricCSVDataHandler:
+    #(symbol, datetime, open, high, low, volume, adjusted close)
+    #so portfolios and strategies written against the list of tuples work unchanged.
+    #Whole columns can be read without building any tuples through column(field) or values (strided views too).
+    
+    __slots__ = ('symbol', 'dates', 'values')
+    
+    def __init__(self, symbol, dates, values):
+        
+        #symbol - the ticker symbol e.g. 'GOOG'
+        #dates - a numpy datetime64 array view, one element per bar
+        #values - a numpy array view of shape (bars, len(FIELDS))
+        
+        self.symbol = symbol
+        self.dates = dates
+        self.values = values
+        
+    def __len__(self):
+        return len(self.values)
+    
+    def __getitem__(self, i):
+        
+        if isinstance(i, slice):
+            return BarWindow(self.symbol, self.dates[i], self.values[i])
+        
+        row = self.values[i]
+        return (self.symbol, pd.Timestamp(self.dates[i]),
+                row[0], row[1], row[2], row[4], row[5])
+    
+    def __iter__(self):
+        for i in range(len(self.values)):
+            yield self[i]
+            
+    def __repr__(self):
+        return('{cls}({s}, {n} bars)'.format(cls = self.__class__.__name__, s = self.symbol, n = len(self)))
+            
+    def column(self, field):
+        #Returns a view of a single field (e.g. 'adj_close') over the window
+        
+        return self.values[:, FIELD_INDEX[field]]
+
+class HistoricArrayDataHandler(DataAbstractClass):
+    
+    #Reads CSV files for each requested symbol from disk once, aligns them onto a single
+    #sorted date axis and holds them in one contiguous array of shape (bars, symbols, fields).
+    #Drip feeding is done by advancing a single integer cursor, so no rows are built per bar.
+    #The bar-major layout keeps each bar of every symbol contiguous, which is what the per-bar
+    #path reads (get_latest_bars and the BarSnapshot on every MarketEvent). get_latest_data also returns
+    #views rather than copies, but a single symbol's window strides over the other symbols.
+    
+    def __init__(self, event_queue, csv_dir, symbol_list, cache_dir = None, arrays = None):
+        
+        #event_queue - the queue on which it pushes MarketEvents
+        #csv_dir - Absolute directory path to CSV files.
+        #symbol_list - a list of symbol strings
+        #cache_dir - optional directory for the memory-mapped binary cache (see cache.py)
+        #arrays - optional (dates, bars) that are already aligned, e.g. in shared memory; no files are read
+        
+        #It is assumed that all files are of the form 'symbol.csv', where symbol
+        #is the string in the list.
+        
+        self.event_queue = event_queue
+        self.csv_dir = csv_dir
+        self.symbol_list = symbol_list
+        self.cache_dir = cache_dir
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        
+        self.dates = None     #numpy datetime64 array, the aligned date axis
+        self.bars = None      #numpy float64 array of shape (bars, symbols, fields)
+        self.bar_index = 0    #the cursor: the number of bars released so far
+        
+        self.continue_backtest = True
+        self.indicators = None    #an IndicatorService updated on every bar, see indicators.py
+        
+        if arrays is None:
+            self.initial_symbol_data()     #Load in the CSV files
+        else:
+            self.dates, self.bars = arrays
+            self.continue_backtest = len(self.dates) > 0
+        
+    def initial_symbol_data(self):
+        
+        #Loads the aligned arrays, from the binary cache when one is configured and still valid
+        
+        if self.cache_dir is None:
+            self.dates, self.bars = load_symbol_arrays(self.csv_dir, self.symbol_list)
+        else:
+            cache = SymbolDataCache(self.cache_dir)
+            self.dates, self.bars = cache.load(self.csv_dir, self.symbol_list, load_symbol_arrays)
+            
+        if len(self.dates) == 0:
+            self.continue_backtest = False
+            
+    def get_latest_data(self, symbol, N=1):
+        #Returns a BarWindow over the last N bars - or as many as are available
+        
+        try:
+            i = self.symbol_index[symbol]
+        except KeyError:
+            print('{} is not a valid symbol'.format(symbol))
+            return None
+        
+        end = self.bar_index
+        start = max(end - N, 0)
+        
+        return BarWindow(symbol, self.dates[start:end], self.bars[start:end, i])
+    
+    def get_latest_bars(self):
+        #Returns a view of shape (symbols, fields) of the newest bar for all symbols
+        
+        return self.bars[self.bar_index - 1]
+    
+    def latest_snapshot(self):
+        #Returns a BarSnapshot over a read-only view of the newest bar; nothing is copied
+        
+        i = self.bar_index - 1
+        return BarSnapshot(pd.Timestamp(self.dates[i]), self.symbol_list, FIELDS, self.bars[i],
+                           self.symbol_index, FIELD_INDEX)
+        
+    def update_data(self):
+        #Advances the cursor by one bar for all symbols
+        #Adds a MarketEvent to the event_queue to signal this
+        
+        if self.bar_index >= len(self.dates):
+            self.continue_backtest = False   #if there is no data left
+            return
+        
+        self.bar_index += 1
+        
+        if self.bar_index >= len(self.dates):
+            self.continue_backtest = False   #the final bar has been released
+        
+        snapshot = self.latest_snapshot()
+        
+        if self.indicators is not None:
+            self.indicators.update(snapshot)
+            
+        self.event_queue.put(MarketEvent(snapshot))
+        
+    def get_state(self):
+        
+        #The cursor for a checkpoint; the arrays are reloaded from the CSV files or the cache
+        
+        return {'symbol_list': list(self.symbol_list),
+                'bar_index': self.bar_index,
+                'continue_backtest': self.continue_backtest,
+                'indicators': self.indicators.get_state() if self.indicators is not None else None}
+    
+    def set_state(self, state):
+        
+        check_symbols(self, state)
+        
+        if state['bar_index'] > len(self.dates):
+            raise ValueError('the checkpoint is at bar {} but there are only {} bars'.format(state['bar_index'], len(self.dates)))
+        
+        self.bar_index = state['bar_index']
+        self.continue_backtest = state['continue_backtest']
+        
+        restore_indicators(self, state)
+
+#Line breaks in the CSV files: the bundled files use a bare carriage return
+LINE_BREAK = re.compile(b'\r\n|\r|\n')
+
+def read_lines_reversed(f, start, block_size = 1 << 16):
+    
+    #Yields the non-empty lines of a binary file from its end back to byte offset start,
+    #reading one block at a time
+    
+    f.seek(0, 2)
+    position = f.tell()
+    tail = b''
+    
+    while position > start:
+        step = min(block_size, position - start)
+        position -= step
+        f.seek(position)
+        lines = LINE_BREAK.split(f.read(step) + tail)
+        tail = lines[0]    #may be the end of a line that starts in the previous block
+        for line in reversed(lines[1:]):
+            if line:
+                yield line
+    
+    if tail:
+        yield tail
+
+def read_csv_chunks(path, chunksize = 10000, date_format = None):
+    
+    #Yields DataFrames of at most chunksize rows, indexed by 'date' in ascending order,
+    #holding only one chunk in memory at a time.
+    #Files already in ascending order are read forwards; files in descending order
+    #(such as the bundled CSVs) are read backwards from the end.
+    
+    with open(path, 'rb') as f:
+        head = f.read(1 << 16)
+        match = LINE_BREAK.search(head)
+        header = head[:match.start()] if match else head
+        start = match.end() if match else len(head)
+        
+        first = pd.read_csv(path, nrows = 2, parse_dates = ['date'], date_format = date_format)
+        descending = len(first) == 2 and first['date'].iloc[0] > first['date'].iloc[1]
+        
+        if not descending:
+            for chunk in pd.read_csv(path, chunksize = chunksize, index_col = 'date', parse_dates = True, date_format = date_format):
+                yield chunk
+            return
+        
+        lines = read_lines_reversed(f, start)
+        while True:
+            block = list(islice(lines, chunksize))
+            if not block:
+                return
+            yield pd.read_csv(io.BytesIO(b'\n'.join([header] + block)), index_col = 'date',
+                              parse_dates = True, date_format = date_format)
+
+def iter_symbol_bars(path, chunksize = 10000, date_format = None):
+    
+    #Yields (timestamp, values) for every row of a CSV file in ascending order,
+    #where values is a numpy row in FIELDS order
+    
+    for chunk in read_csv_chunks(path, chunksize, date_format):
+        dates = chunk.index
+        values = chunk[list(FIELDS)].values
+        for i in range(len(values)):
+            yield dates[i], values[i]
+
+class TimestampMerge():
+    
+    #A k-way merge of per-symbol bar streams into timestamp order.
+    #The heap holds only the next pending bar of each stream, so memory is O(number of streams)
+    #and no union of all timestamps is ever built. Symbols may trade on different calendars.
+    
+    def __init__(self, streams):
+        
+        #streams - a list of iterators, each yielding (timestamp, values) in ascending timestamp order
+        
+        self.streams = [iter(stream) for stream in streams]
+        self.heap = []
+        
+        for i, stream in enumerate(self.streams):
+            bar = next(stream, None)
+            if bar is not None:
+                self.heap.append((bar[0], i, bar[1]))    #i breaks ties, so values are never compared
+        heapq.heapify(self.heap)
+        
+    def __bool__(self):
+        return bool(self.heap)
+    
+    def next_group(self):
+        
+        #Returns (timestamp, [(stream index, values), ...]) for every stream with a bar at the next timestamp
+        
+        heap = self.heap
+        timestamp = heap[0][0]
+        group = []
+        
+        while heap and heap[0][0] == timestamp:
+            _, i, values = heap[0]
+            group.append((i, values))
+            
+            bar = next(self.streams[i], None)
+            if bar is None:
+                heapq.heappop(heap)
+            elif bar[0] < timestamp:
+                raise ValueError('stream {} is not in ascending timestamp order at {}'.format(i, bar[0]))
+            else:
+                heapq.heapreplace(heap, (bar[0], i, bar[1]))
+                
+        return timestamp, group
+
+class StreamingCSVDataHandler(DataAbstractClass):
+    
+    #Streams CSV files in chunks rather than loading them up front, merging the symbols by timestamp
+    #as it goes with a TimestampMerge, and keeps only the last `history` bars of each symbol for get_latest_data.
+    #Peak memory depends on chunksize, history and the number of symbols, not on the length of the data.
+    #One MarketEvent is emitted per distinct timestamp across all symbols. A symbol without a bar at
+    #that timestamp keeps its previous latest bar, or with ffill = True gets a copy of it stamped
+    #with the new timestamp, as a dense reindex with forward fill would give.
+    
+    def __init__(self, event_queue, csv_dir, symbol_list, history = 100, chunksize = 10000, date_format = None, ffill = False):
+        
+        #event_queue - the queue on which it pushes MarketEvents
+        #csv_dir - Absolute directory path to CSV files.
+        #symbol_list - a list of symbol strings
+        #history - the number of bars kept per symbol, the largest useful N for get_latest_data
+        #chunksize - the number of rows read from a file at a time
+        #date_format - optional strftime format of the date column, e.g. '%m/%d/%y', which avoids slow inference
+        #ffill - forward fill symbols that have no bar at a timestamp, once they have started trading
+        
+        self.event_queue = event_queue
+        self.csv_dir = csv_dir
+        self.symbol_list = symbol_list
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        self.history = history
+        self.chunksize = chunksize
+        self.date_format = date_format
+        self.ffill = ffill
+        
+        #a ring buffer of (symbol, datetime, open, high, low, volume, adjusted close) tuples per symbol
+        self.latest_symbol_data = {s: deque(maxlen = history) for s in symbol_list}
+        
+        self.continue_backtest = True
+        self.indicators = None    #an IndicatorService updated on every bar, see indicators.py
+        
+        self.initial_symbol_data()
+        
+    def initial_symbol_data(self):
+        
+        #Opens a lazy row iterator per symbol and merges them in timestamp order; nothing is read yet
+        
+        self.merge = TimestampMerge([iter_symbol_bars(join(self.csv_dir, '{}.csv'.format(s)), self.chunksize, self.date_format)
+                                     for s in self.symbol_list])
+        
+        self.latest_values = np.full((len(self.symbol_list), len(FIELDS)), np.nan)   #newest bar of every symbol
+        self.started = []                               #positions of the symbols that have had a bar, for ffill
+        self.last_update = [-1]*len(self.symbol_list)   #the bar count at which each symbol last had a bar
+        self.updated = set()                            #the symbols with a bar at the latest timestamp
+        self.bar_count = 0
+        
+        if not self.merge:
+            self.continue_backtest = False
+            
+    def get_latest_data(self, symbol, N=1):
+        #Returns the last N rows from latest_symbol_data - or as many as are available
+        
+        try:
+            buffer = self.latest_symbol_data[symbol]
+        except KeyError:
+            print('{} is not a valid symbol'.format(symbol))
+            return None
+        
+        if N >= len(buffer):
+            return list(buffer)
+        
+        return list(islice(reversed(buffer), N))[::-1]
+    
+    def update_data(self):
+        #Pushes every bar that shares the next timestamp into latest_symbol_data
+        #Adds a MarketEvent to the event_queue to signal this
+        
+        if not self.merge:
+            self.continue_backtest = False   #if there is no data left
+            return
+        
+        date = self.next_bar()
+            
+        if not self.merge:
+            self.continue_backtest = False   #the final bar has been released
+        
+        #the snapshot owns a copy, as latest_values changes on the next bar
+        snapshot = BarSnapshot(date, self.symbol_list, FIELDS, self.latest_values.copy(), self.symbol_index, FIELD_INDEX)
+            
+        #without ffill only the symbols with a bar at this timestamp have a new value for their indicators
+        if self.indicators is not None:
+            self.indicators.update(snapshot, None if self.ffill else self.updated)
+            
+        self.event_queue.put(MarketEvent(snapshot))
+        
+    def next_bar(self):
+        
+        #Merges the bars at the next timestamp into the buffers and returns the timestamp
+        
+        date, group = self.merge.next_group()
+        self.updated = {self.symbol_list[i] for i, _ in group}
+        
+        for i, values in group:
+            s = self.symbol_list[i]
+            self.latest_symbol_data[s].append((s, date, values[0], values[1], values[2], values[4], values[5]))
+            self.latest_values[i] = values
+            if self.last_update[i] < 0:
+                self.started.append(i)
+            self.last_update[i] = self.bar_count
+            
+        if self.ffill:
+            for i in self.started:
+                if self.last_update[i] != self.bar_count:
+                    s = self.symbol_list[i]
+                    self.latest_symbol_data[s].append((s, date) + self.latest_symbol_data[s][-1][2:])
+                    
+        self.bar_count += 1
+        
+        return date
+    
+    def get_state(self):
+        
+        #The cursor for a checkpoint: the number of merged timestamps released
+        
+        return {'symbol_list': list(self.symbol_list),
+                'bar_count': self.bar_count,
+                'continue_backtest': self.continue_backtest,
+                'indicators': self.indicators.get_state() if self.indicators is not None else None}
+    
+    def set_state(self, state):
+        
+        #Reopens the files and streams forward to the checkpointed timestamp without emitting MarketEvents.
+        #Only the last `history` bars are kept on the way, so memory stays bounded.
+        
+        check_symbols(self, state)
+        
+        self.latest_symbol_data = {s: deque(maxlen = self.history) for s in self.symbol_list}
+        self.initial_symbol_data()
+        
+        for _ in range(state['bar_count']):
+            if not self.merge:
+                raise ValueError('the checkpoint is at bar {} but the files end at bar {}'.format(state['bar_count'], self.bar_count))
+            self.next_bar()
+        self.continue_backtest = state['continue_backtest']
+        
+        restore_indicators(self, state)
@@ -0,0 +1,74 @@
+#PYTHON MODULES
+
+from collections import deque
+
+class EventBus():
+    
+    #A single-threaded replacement for queue.Queue as the shared event queue.
+    #Components put events onto it exactly as before (event_queue.put(event)), but events are held
+    #in a collections.deque with no locking, and dispatch() routes each one through a table of
+    #handlers keyed by event type instead of a chain of isinstance checks.
+    
+    def __init__(self):
+        
+        self.queue = deque()
+        self.subscribers = {}      #event type: list of handlers, in subscription order
+        self.dispatch_table = {}   #concrete event class: tuple of handlers, built lazily from subscribers
+        
+        self.put = self.queue.append   #bound once so put() costs a single call
+        
+    def __len__(self):
+        return len(self.queue)
+    
+    def empty(self):
+        return not self.queue
+    
+    def subscribe(self, event_type, handler):
+        
+        #Registers handler(event) to be called for every event of event_type, including subclasses.
+        #Handlers for the same event are called in the order: most specific type first, then subscription order.
+        
+        self.subscribers.setdefault(event_type, []).append(handler)
+        self.dispatch_table.clear()
+        
+    def unsubscribe(self, event_type, handler):
+        
+        self.subscribers[event_type].remove(handler)
+        self.dispatch_table.clear()
+        
+    def handlers_for(self, event_class):
+        
+        #Resolves the handlers for a concrete class through its MRO and caches the result
+        
+        try:
+            return self.dispatch_table[event_class]
+        except KeyError:
+            handlers = []
+            for cls in event_class.__mro__:
+                handlers.extend(self.subscribers.get(cls, ()))
+            handlers = tuple(handlers)
+            self.dispatch_table[event_class] = handlers
+            return handlers
+        
+    def dispatch(self):
+        
+        #Handles events until the queue is empty, including any events the handlers put on the queue.
+        #Returns the number of events handled.
+        
+        queue = self.queue
+        popleft = queue.popleft
+        table = self.dispatch_table
+        handled = 0
+        
+        while queue:
+            event = popleft()
+            handled += 1
+            
+            handlers = table.get(event.__class__)
+            if handlers is None:
+                handlers = self.handlers_for(event.__class__)
+            
+            for handler in handlers:
+                handler(event)
+                
+        return handled
@@ -1,20 +1,91 @@
+#PYTHON MODULES
+
+from enum import IntEnum
+
+class Direction(IntEnum):
+    #Direction of an order or fill. The value is the sign applied to the quantity
+    BUY = 1
+    SELL = -1
+
+class SignalType(IntEnum):
+    #Type of a signal sent from a strategy to a portfolio
+    LONG = 1
+    SHORT = -1
+    EXIT = 0
+
+def to_enum(enum_class, value):
+    #Accepts an enum member, its name (e.g. 'BUY') or its value and returns the member.
+    #The event constructors take enum members only, so strings and numbers are converted with this
+    #where they enter the system, e.g. from a broker's messages or a user's configuration.
+    
+    if value.__class__ is enum_class:
+        return value
+    if isinstance(value, str):
+        return enum_class[value]
+    return enum_class(value)
+
 class Event():
     #Abstract base class providing an interface for all inherited events.
     #Allows more events to be added later
-    pass
+    #Events are slotted: they have no per-instance __dict__, which keeps them small and quick to create
+    __slots__ = ()
+    
+    def __repr__(self):     #returns a string representation of the object
+        return('{cls}({d})'.format(cls = self.__class__, d = {k: getattr(self, k) for k in self.__slots__}))
+
+class BarSnapshot():
+    #An immutable view of one bar across all symbols, built once per bar by the data handler
+    #and carried by the MarketEvent so that consumers do not call get_latest_data per symbol.
+    __slots__ = ('timestamp', 'symbols', 'fields', 'values', 'symbol_index', 'field_index')
+    
+    def __init__(self, timestamp, symbols, fields, values, symbol_index = None, field_index = None):
+        
+        #timestamp - the time of the bar
+        #symbols - the symbols in row order of values
+        #fields - the field names in column order of values, e.g. ('open', ..., 'adj_close')
+        #values - a float array of shape (symbols, fields); it is made read-only. NaN where a symbol has no data yet
+        #symbol_index, field_index - optional prebuilt name: position dictionaries, shared between snapshots
+        
+        values.flags.writeable = False
+        
+        set_attribute = object.__setattr__
+        set_attribute(self, 'timestamp', timestamp)
+        set_attribute(self, 'symbols', symbols)
+        set_attribute(self, 'fields', fields)
+        set_attribute(self, 'values', values)
+        set_attribute(self, 'symbol_index', symbol_index if symbol_index is not None else {s: i for i, s in enumerate(symbols)})
+        set_attribute(self, 'field_index', field_index if field_index is not None else {f: i for i, f in enumerate(fields)})
+        
+    def __setattr__(self, name, value):
+        raise AttributeError('BarSnapshot is immutable')
+    
+    def __repr__(self):
+        return('{cls}({t}, {n} symbols)'.format(cls = self.__class__.__name__, t = self.timestamp, n = len(self.symbols)))
+    
+    def column(self, field):
+        #Returns a read-only array of one field for every symbol
+        return self.values[:, self.field_index[field]]
+    
+    def price(self, symbol, field = 'adj_close'):
+        return self.values[self.symbol_index[symbol], self.field_index[field]]
 
 class MarketEvent(Event):
     #New market data
-    pass
+    #snapshot - an optional BarSnapshot of the new bar
+    __slots__ = ('snapshot',)
+    
+    def __init__(self, snapshot = None):
+        self.snapshot = snapshot
     
 class SignalEvent(Event):
     #Handles the event of sending a signal from the strategy to the portfolio
+    __slots__ = ('symbol', 'datestamp', 'signal_type')
     
     def __init__(self, symbol, datestamp, signal_type):
         
         #symbol - the ticker symbol e.g. 'GOOG'
         #datetime - the timestamp at which the signal was generated
-        #signal_type - 'LONG' or 'SHORT'
+        #signal_type - SignalType.LONG, SHORT or EXIT
         
         self.symbol = symbol
         self.datestamp = datestamp
@@ -22,24 +93,29 @@ class SignalEvent(Event):
 
 class OrderEvent(Event):
     #Handles the event of sending an order from the portfolio to execution
+    __slots__ = ('symbol', 'order_type', 'quantity', 'direction', 'limit_price', 'stop_price', 'order_id')
     
-    def __init__(self, symbol, order_type, quantity, direction):
+    def __init__(self, symbol, order_type, quantity, direction, limit_price = None, stop_price = None, order_id = None):
         
         #symbol - the ticker symbol e.g. 'GOOG'
         #order_type - 'MARKET', 'LIMIT', 'STOP', 'STOPLIMIT'
         #quantity - non-negative integer
-        #direction - 'BUY' or 'SELL'
+        #direction - Direction.BUY or SELL
+        #limit_price - the limit of a LIMIT or STOPLIMIT order
+        #stop_price - the trigger of a STOP or STOPLIMIT order
+        #order_id - an identifier for cancelling or replacing the order; the execution handler assigns one if None
         
         self.symbol = symbol
         self.order_type = order_type
         self.quantity = quantity
         self.direction = direction
-    
-    def __repr__(self):     #returns a string representation of the object
-        return('{cls}({d})'.format(cls = self.__class__, d = self.__dict__))
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.order_id = order_id
 
 class FillEvent(Event):
     #Handles the event of an order actually getting filled, as returned from a broker.
+    __slots__ = ('symbol', 'datestamp', 'exchange', 'quantity', 'direction', 'fill_cost', 'commission')
     
     def __init__(self, symbol, datestamp, exchange, quantity, direction, fill_cost, commission = 0):
         
@@ -47,7 +123,7 @@ class FillEvent(Event):
         #datestamp - the time at which the order was filled
         #exchange - the exchange where the order was filled
         #quantity - the quantity that was actually filled
-        #direction - 'BUY' or 'SELL'
+        #direction - Direction.BUY or SELL
         #fill_cost - the cost of the trade
         #commission - an optional commission sent from the broker
         
@@ -58,3 +134,36 @@ class FillEvent(Event):
         self.direction = direction
         self.fill_cost = fill_cost
         self.commission = commission
+
+class EventPool():
+    #A free list of events of a single class so that orders and fills can be recycled instead of allocated.
+    #acquire() takes the same arguments as the event's constructor.
+    #release(event) returns an event to the pool; it must only be called once no handler needs the event,
+    #e.g. by subscribing pool.release as the last handler for the event type on the EventBus.
+    
+    def __init__(self, event_class, maxsize = 10000):
+        
+        #event_class - e.g. FillEvent
+        #maxsize - the largest number of free events kept; further releases are left to the garbage collector
+        
+        self.event_class = event_class
+        self.maxsize = maxsize
+        self.free = []
+        self.init = event_class.__init__
+        
+    def __len__(self):
+        return len(self.free)
+        
+    def acquire(self, *args, **kwargs):
+        
+        if self.free:
+            event = self.free.pop()
+            self.init(event, *args, **kwargs)
+            return event
+        
+        return self.event_class(*args, **kwargs)
+    
+    def release(self, event):
+        
+        if len(self.free) < self.maxsize:
+            self.free.append(event)
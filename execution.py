@@ -1,3 +1,7 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
 #PYTHON MODULES
 
 from abc import (ABCMeta, abstractmethod)
@@ -6,7 +10,9 @@ from queue import Queue
 
 #MY MODULES
 
-from Event_Driven_Backtester.events import FillEvent, OrderEvent
+from Event_Driven_Backtester.events import FillEvent, OrderEvent, Direction
+from Event_Driven_Backtester.data import (FIELDS, FIELD_INDEX)
+from Event_Driven_Backtester.orderbook import ConditionalOrderBook
 
 class ExecutionAbstractClass(metaclass = ABCMeta):
     #Abstract class providing an interface for all inherited strategy objects
@@ -14,13 +20,24 @@ class ExecutionAbstractClass(metaclass = ABCMeta):
     @abstractmethod
     def execute_order(self, event):
         pass
+    
+    #Checkpoints (see checkpoint.py) store what get_state returns; handlers with resting orders override both
+    def get_state(self):
+        return {}
+    
+    def set_state(self, state):
+        pass
 
 class SimulatedExecutionHandler(ExecutionAbstractClass):
     
     #Simply converts all OrderEvents to FillEvents with no latency or slippage
     
-    def __init__(self, event_queue):
+    def __init__(self, event_queue, fill_pool = None):
+        
+        #fill_pool - an optional EventPool of FillEvents to recycle fills from
+        
         self.event_queue = event_queue
+        self.fill_pool = fill_pool
         
     def execute_order(self, event):
         
@@ -28,7 +45,351 @@ class SimulatedExecutionHandler(ExecutionAbstractClass):
         #the fill_cost is set to None as this is accounted for in the NaivePortfolio
         
         if isinstance(event, OrderEvent):
-            fill_event = FillEvent(event.symbol, datetime.now(), 'ARCA',
-                                  event.quantity, event.direction, None)
+            if self.fill_pool is not None:
+                fill_event = self.fill_pool.acquire(event.symbol, datetime.now(), 'ARCA',
+                                                    event.quantity, event.direction, None)
+            else:
+                fill_event = FillEvent(event.symbol, datetime.now(), 'ARCA',
+                                      event.quantity, event.direction, None)
             
             self.event_queue.put(fill_event)
+
+class PerShareCommission():
+    
+    #Commission schedule charging a rate per share with a minimum per fill and an optional cap
+    #as a fraction of the traded value, e.g. PerShareCommission(0.005, 1.0, 0.01)
+    #Called with arrays of fill quantities and prices; returns an array of commissions
+    
+    def __init__(self, rate, minimum = 0.0, maximum_pct = None):
+        self.rate = rate
+        self.minimum = minimum
+        self.maximum_pct = maximum_pct
+        
+    def __call__(self, quantity, price):
+        
+        commission = np.maximum(quantity*self.rate, self.minimum)
+        if self.maximum_pct is not None:
+            commission = np.minimum(commission, quantity*price*self.maximum_pct)
+        return commission
+
+class PercentCommission():
+    
+    #Commission schedule charging a fraction of the traded value, with a minimum per fill
+    
+    def __init__(self, rate, minimum = 0.0):
+        self.rate = rate
+        self.minimum = minimum
+        
+    def __call__(self, quantity, price):
+        return np.maximum(quantity*price*self.rate, self.minimum)
+
+class PendingOrders():
+    
+    #Resting orders held as parallel arrays so that a whole bar can be matched at once.
+    #Orders are kept in arrival order; filled orders are removed by compact().
+    
+    COLUMNS = (('seq', np.int64), ('symbol', np.int64), ('direction', np.int8),
+               ('remaining', np.float64), ('eligible_bar', np.int64))
+    
+    def __init__(self, capacity = 1024):
+        
+        self.count = 0
+        self.arrays = {name: np.zeros(capacity, dtype = dtype) for name, dtype in self.COLUMNS}
+        
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, name):
+        #the live part of a column
+        return self.arrays[name][:self.count]
+        
+    def append(self, **values):
+        
+        if self.count == len(self.arrays['seq']):
+            for name in self.arrays:
+                self.arrays[name] = np.concatenate((self.arrays[name], np.zeros_like(self.arrays[name])))
+        
+        for name, value in values.items():
+            self.arrays[name][self.count] = value
+        self.count += 1
+        
+    def compact(self, keep):
+        
+        #keep - boolean mask over the live orders
+        
+        kept = int(keep.sum())
+        for name in self.arrays:
+            self.arrays[name][:kept] = self.arrays[name][:self.count][keep]
+        self.count = kept
+
+class OrderBookExecutionHandler(ExecutionAbstractClass):
+    
+    #Simulates execution against bar data instead of filling every order instantly:
+    #- latency: an order is only matched against bars that arrive `latency` bars after it (at least 1)
+    #- volume participation: the total quantity filled per symbol per bar is capped at
+    #  participation*volume, shared between that symbol's orders in arrival order; the rest stays resting
+    #- slippage and impact: fills are priced at the bar's price_field moved against the order by
+    #  slippage_bps plus impact*sqrt(fill quantity/bar volume) (a square-root impact model)
+    #- commission: an optional schedule such as PerShareCommission, applied to every fill
+    #Orders wait in a PendingOrders book and are matched in one vectorised pass per MarketEvent,
+    #so the cost per bar does not grow with a Python call per resting order.
+    #LIMIT, STOP and STOPLIMIT orders rest in a ConditionalOrderBook indexed by trigger price, so a bar
+    #only touches the orders triggered inside its high/low range. They fill in full when triggered, at their
+    #trigger price or the open on a gap (see orderbook.py); stop fills also pay slippage and impact.
+    #Resting orders can be cancelled or replaced by order id.
+    #FillEvents carry the simulated price per share as fill_cost and the bar's timestamp.
+    
+    def __init__(self, event_queue, data, latency = 1, participation = 0.1, slippage_bps = 0.0,
+                 impact = 0.0, commission = None, price_field = 'adj_close', exchange = 'ARCA'):
+        
+        #data - the data handler, for the symbol list and, without bar snapshots, the latest bars
+        #participation - the largest fraction of a bar's volume that can be filled; None for no limit
+        #commission - a function (quantity array, price array) -> commission array, or None
+        
+        if latency < 1:
+            raise ValueError('latency must be at least one bar, not {}'.format(latency))
+        
+        self.event_queue = event_queue
+        self.data = data
+        self.symbol_list = data.symbol_list
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+        
+        self.latency = latency
+        self.participation = participation
+        self.slippage = slippage_bps/10000.0
+        self.impact = impact
+        self.commission = commission
+        self.price_col = FIELD_INDEX[price_field]
+        self.volume_col = FIELD_INDEX['volume']
+        self.exchange = exchange
+        
+        self.book = PendingOrders()
+        self.conditional = ConditionalOrderBook()
+        self.market_ids = {}        #order_id: seq of the MARKET orders in book
+        self.market_seq_ids = {}    #seq: order_id of the MARKET orders in book
+        self.bar = 0        #the number of MarketEvents seen
+        self.seq = 0        #arrival counter for orders
+        
+        self.high_col = FIELD_INDEX['high']
+        self.low_col = FIELD_INDEX['low']
+        self.open_col = FIELD_INDEX['open']
+        
+    def execute_order(self, event):
+        
+        #Queues the order; it is filled by on_market once it is eligible.
+        #An order without an order_id is given one, written back to event.order_id: ('auto', n), which
+        #cannot collide with the ids callers choose for their own orders.
+        
+        if isinstance(event, OrderEvent):
+            if event.order_id is None:
+                event.order_id = ('auto', self.seq)
+            order_id = event.order_id
+            if order_id in self.market_ids or order_id in self.conditional:
+                raise ValueError('order {} is already resting'.format(order_id))
+            
+            eligible_bar = self.bar + self.latency
+            
+            if event.order_type == 'MARKET':
+                self.book.append(seq = self.seq, symbol = self.symbol_index[event.symbol], direction = event.direction,
+                                 remaining = event.quantity, eligible_bar = eligible_bar)
+                self.market_ids[order_id] = self.seq
+                self.market_seq_ids[self.seq] = order_id
+            else:
+                self.conditional.add(order_id, self.symbol_index[event.symbol], event.order_type, event.direction,
+                                     event.quantity, event.limit_price, event.stop_price, eligible_bar)
+            self.seq += 1
+            
+    def market_position(self, order_id):
+        #the row of a resting MARKET order in book
+        return int(np.nonzero(self.book['seq'] == self.market_ids[order_id])[0][0])
+            
+    def cancel_order(self, order_id):
+        
+        #Cancels a resting order, or the unfilled part of a partially filled one.
+        #Returns True if an order was cancelled
+        
+        if self.conditional.cancel(order_id) is not None:
+            return True
+        
+        if order_id in self.market_ids:
+            keep = np.ones(len(self.book), dtype = bool)
+            keep[self.market_position(order_id)] = False
+            self.book.compact(keep)
+            del self.market_seq_ids[self.market_ids.pop(order_id)]
+            return True
+        
+        return False
+    
+    def replace_order(self, order_id, quantity = None, limit_price = None, stop_price = None):
+        
+        #Changes the remaining quantity, limit or stop of a resting order.
+        #Returns True if the order was found
+        
+        if order_id in self.conditional:
+            self.conditional.replace(order_id, quantity, limit_price, stop_price)
+            return True
+        
+        if order_id in self.market_ids:
+            if quantity is not None:
+                self.book['remaining'][self.market_position(order_id)] = quantity
+            return True
+        
+        return False
+            
+    def bar_values(self, event):
+        
+        #Returns (timestamp, values) for the new bar, values being a (symbols, fields) array
+        
+        snapshot = getattr(event, 'snapshot', None)
+        if snapshot is not None:
+            return snapshot.timestamp, snapshot.values
+        
+        if hasattr(self.data, 'get_latest_bars'):
+            return self.data.get_latest_data(self.symbol_list[0])[0][1], self.data.get_latest_bars()
+        
+        #rows are (symbol, datetime, open, high, low, volume, adjusted close); there is no close
+        values = np.full((len(self.symbol_list), len(FIELDS)), np.nan)
+        timestamp = None
+        for i, s in enumerate(self.symbol_list):
+            rows = self.data.get_latest_data(s)
+            if rows:
+                timestamp = rows[-1][1]
+                values[i, [FIELD_INDEX[f] for f in ('open', 'high', 'low', 'volume', 'adj_close')]] = rows[-1][2:]
+        return timestamp, values
+    
+    def match(self, values):
+        
+        #Returns (positions in the book, fill quantities, fill prices) for the orders filled on this bar
+        
+        book = self.book
+        eligible = np.nonzero(book['eligible_bar'] <= self.bar)[0]
+        if len(eligible) == 0:
+            return eligible, None, None
+        
+        symbol = book['symbol'][eligible]
+        remaining = book['remaining'][eligible]
+        price = values[symbol, self.price_col]
+        volume = values[symbol, self.volume_col]
+        
+        #orders grouped by symbol, in arrival order within each symbol
+        order = np.argsort(symbol, kind = 'stable')
+        symbol, remaining, price, volume, eligible = symbol[order], remaining[order], price[order], volume[order], eligible[order]
+        
+        if self.participation is None:
+            capacity = np.full(len(eligible), np.inf)
+        else:
+            capacity = np.floor(self.participation*np.nan_to_num(volume))
+        capacity[np.isnan(price)] = 0.0
+        
+        #the quantity of earlier orders for the same symbol
+        cumulative = np.cumsum(remaining)
+        starts = np.ones(len(symbol), dtype = bool)
+        starts[1:] = symbol[1:] != symbol[:-1]
+        base = np.maximum.accumulate(np.where(starts, cumulative - remaining, 0.0))
+        ahead = cumulative - remaining - base
+        
+        quantity = np.clip(capacity - ahead, 0.0, remaining)
+        
+        filled = quantity > 0
+        eligible, quantity, price, volume = eligible[filled], quantity[filled], price[filled], volume[filled]
+        
+        direction = book['direction'][eligible]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            impact = self.impact*np.sqrt(np.where(volume > 0, quantity/volume, 0.0))
+        price = price*(1.0 + direction*(self.slippage + impact))
+        
+        return eligible, quantity, price
+    
+    def get_state(self):
+        
+        #The live part of the market book, the conditional book (a plain object, stored whole) and the counters
+        
+        return {'book': {name: self.book[name].copy() for name in self.book.arrays},
+                'conditional': self.conditional,
+                'market_ids': dict(self.market_ids),
+                'bar': self.bar,
+                'seq': self.seq}
+    
+    def set_state(self, state):
+        
+        self.book = PendingOrders(max(1024, len(state['book']['seq'])))
+        for name, values in state['book'].items():
+            self.book.arrays[name][:len(values)] = values
+        self.book.count = len(state['book']['seq'])
+        
+        self.conditional = state['conditional']
+        self.market_ids = dict(state['market_ids'])
+        self.market_seq_ids = {seq: order_id for order_id, seq in self.market_ids.items()}
+        self.bar = state['bar']
+        self.seq = state['seq']
+        
+    def commissions(self, quantity, price):
+        
+        if self.commission is not None:
+            return self.commission(quantity, price)
+        
+        return np.zeros(len(quantity))
+    
+    def put_fills(self, timestamp, symbols, directions, quantity, price, commission):
+        
+        #directions come out of the order arrays as plain integers
+        for s, d, q, p, c in zip(symbols, directions, quantity.tolist(), price.tolist(), commission.tolist()):
+            self.event_queue.put(FillEvent(self.symbol_list[s], timestamp, self.exchange, int(q), Direction(d), p, c))
+    
+    def on_market(self, event):
+        
+        #Triggers conditional orders, then matches every eligible MARKET order against the new bar,
+        #putting a FillEvent per filled order
+        
+        self.bar += 1
+        if len(self.book) == 0 and len(self.conditional) == 0:
+            return
+        
+        timestamp, values = self.bar_values(event)
+        
+        if len(self.conditional) > 0:
+            self.fill_conditional(timestamp, values)
+        
+        if len(self.book) > 0:
+            self.fill_market(timestamp, values)
+    
+    def fill_conditional(self, timestamp, values):
+        
+        fills = []
+        for s in self.conditional.active_symbols():
+            bar = values[s]
+            fills.extend(self.conditional.trigger(s, self.bar, bar[self.open_col], bar[self.high_col], bar[self.low_col]))
+        
+        if not fills:
+            return
+        
+        symbols = [order.symbol for order, _ in fills]
+        directions = np.array([order.direction for order, _ in fills])
+        quantity = np.array([order.quantity for order, _ in fills], dtype = float)
+        price = np.array([p for _, p in fills])
+        
+        #stops are executed as market orders once triggered
+        is_stop = np.array([order.order_type == 'STOP' for order, _ in fills])
+        volume = values[symbols, self.volume_col]
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            impact = self.impact*np.sqrt(np.where(volume > 0, quantity/volume, 0.0))
+        price = np.where(is_stop, price*(1.0 + directions*(self.slippage + impact)), price)
+        
+        self.put_fills(timestamp, symbols, directions.tolist(), quantity, price, self.commissions(quantity, price))
+        
+    def fill_market(self, timestamp, values):
+        
+        positions, quantity, price = self.match(values)
+        if len(positions) == 0:
+            return
+        
+        book = self.book
+        book['remaining'][positions] -= quantity
+        
+        self.put_fills(timestamp, book['symbol'][positions].tolist(), book['direction'][positions].tolist(),
+                       quantity, price, self.commissions(quantity, price))
+        
+        done = book['remaining'] <= 0
+        for seq in book['seq'][done].tolist():
+            del self.market_ids[self.market_seq_ids.pop(seq)]
+        book.compact(~done)
@@ -0,0 +1,245 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+from abc import (ABCMeta, abstractmethod)
+from collections import deque
+from copy import deepcopy
+from math import sqrt
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import (FIELDS, FIELD_INDEX)
+
+#Position of each field in the tuples returned by get_latest_data:
+#(symbol, datetime, open, high, low, volume, adjusted close)
+#The rows have no close, so 'close' can only be followed on data handlers that build BarSnapshots or bar arrays
+ROW_INDEX = {'open': 2, 'high': 3, 'low': 4, 'volume': 5, 'adj_close': 6}
+
+#This is an abstract base class and so cannot be instantiated.
+class Indicator(metaclass = ABCMeta):
+    #Base class for indicators that are updated with one value per bar in O(1).
+    #value is NaN until the indicator has seen `window` values.
+    
+    def __init__(self, window):
+        self.window = window
+        self.value = np.nan
+        self.count = 0
+        
+    @property
+    def ready(self):
+        return self.count >= self.window
+    
+    #Must be redefined in any subclass to avoid an error
+    @abstractmethod
+    def update(self, x):
+        pass
+    
+class SMA(Indicator):
+    #Simple moving average from a running sum over a ring buffer
+    
+    def __init__(self, window):
+        super().__init__(window)
+        self.buffer = deque()
+        self.total = 0.0
+        
+    def update(self, x):
+        self.buffer.append(x)
+        self.total += x
+        if len(self.buffer) > self.window:
+            self.total -= self.buffer.popleft()
+        self.count += 1
+        if self.count >= self.window:
+            self.value = self.total/self.window
+
+class EMA(Indicator):
+    #Exponential moving average with alpha = 2/(window + 1), seeded with the SMA of the first window values
+    
+    def __init__(self, window):
+        super().__init__(window)
+        self.alpha = 2.0/(window + 1)
+        self.seed = 0.0
+        
+    def update(self, x):
+        self.count += 1
+        if self.count < self.window:
+            self.seed += x
+        elif self.count == self.window:
+            self.value = (self.seed + x)/self.window
+        else:
+            self.value += self.alpha*(x - self.value)
+
+class RollingStd(Indicator):
+    #Sample standard deviation (ddof = 1, as pandas' rolling std) using a sliding-window Welford update
+    
+    def __init__(self, window):
+        super().__init__(window)
+        self.buffer = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        
+    def update(self, x):
+        self.buffer.append(x)
+        n = len(self.buffer)
+        delta = x - self.mean
+        self.mean += delta/n
+        self.m2 += delta*(x - self.mean)
+        
+        if n > self.window:
+            old = self.buffer.popleft()
+            n -= 1
+            mean = self.mean + (self.mean - old)/n
+            self.m2 = max(self.m2 - (old - self.mean)*(old - mean), 0.0)
+            self.mean = mean
+            
+        self.count += 1
+        if self.count >= self.window and self.window > 1:
+            self.value = sqrt(self.m2/(self.window - 1))
+
+class RollingMax(Indicator):
+    #Rolling maximum from a monotonic deque of (index, value) pairs; O(1) amortised
+    
+    def __init__(self, window):
+        super().__init__(window)
+        self.candidates = deque()
+        
+    def keep(self, old, new):
+        return old > new
+        
+    def update(self, x):
+        candidates = self.candidates
+        while candidates and not self.keep(candidates[-1][1], x):
+            candidates.pop()
+        candidates.append((self.count, x))
+        if candidates[0][0] <= self.count - self.window:
+            candidates.popleft()
+        
+        self.count += 1
+        if self.count >= self.window:
+            self.value = candidates[0][1]
+    
+class RollingMin(RollingMax):
+    #Rolling minimum, the mirror image of RollingMax
+    
+    def keep(self, old, new):
+        return old < new
+
+#The indicator kinds that can be registered by name
+KINDS = {'sma': SMA, 'ema': EMA, 'std': RollingStd, 'max': RollingMax, 'min': RollingMin}
+
+class IndicatorService():
+    
+    #Keeps indicators for a data handler up to date, one O(1) update per indicator per bar,
+    #called from the data handler's update_data. Strategies register the indicators they need
+    #instead of recomputing them from get_latest_data(symbol, N) on every MarketEvent.
+    #Identical registrations (same kind, symbol, window and field) return the same indicator,
+    #so strategies sharing a data handler share the work. Use IndicatorService.for_data(data)
+    #to get the service already attached to a data handler.
+    
+    def __init__(self, data):
+        
+        #data - a data handler; the service attaches itself as data.indicators
+        
+        self.data = data
+        self.indicators = {}    #(kind, symbol, window, field): Indicator
+        self.by_symbol = []     #(symbol, field, indicator) in registration order, the update list
+        
+        data.indicators = self
+        
+    @classmethod
+    def for_data(cls, data):
+        
+        if getattr(data, 'indicators', None) is not None:
+            return data.indicators
+        return cls(data)
+        
+    def register(self, kind, symbol, window, field = 'adj_close'):
+        
+        #Returns the indicator for (kind, symbol, window, field), creating it if necessary.
+        #A new indicator is warmed up from the bars the data handler has already released.
+        
+        key = (kind, symbol, window, field)
+        
+        try:
+            return self.indicators[key]
+        except KeyError:
+            pass
+        
+        if kind not in KINDS:
+            raise ValueError('unknown indicator {}, expected one of {}'.format(kind, sorted(KINDS)))
+        if field not in FIELD_INDEX:
+            raise ValueError('unknown field {}, expected one of {}'.format(field, list(FIELDS)))
+        #handlers that build snapshots or bar arrays have a symbol_index; the others only have the rows
+        if field not in ROW_INDEX and not hasattr(self.data, 'symbol_index'):
+            raise ValueError('{} has no {} field'.format(self.data.__class__.__name__, field))
+        
+        indicator = KINDS[kind](window)
+        
+        history = self.data.get_latest_data(symbol, window)
+        if history is not None:
+            for x in self.history_values(history, field):
+                self.feed(indicator, x)
+        
+        self.indicators[key] = indicator
+        self.by_symbol.append((symbol, field, indicator))
+        
+        return indicator
+    
+    def value(self, kind, symbol, window, field = 'adj_close'):
+        return self.indicators[(kind, symbol, window, field)].value
+    
+    def history_values(self, history, field):
+        
+        #The values of field over the bars of get_latest_data, for warming up a new indicator
+        
+        if hasattr(history, 'column'):
+            return history.column(field)    #a BarWindow holds every field
+        if field not in ROW_INDEX and len(history) > 0:
+            raise ValueError('the rows have no {} field; register the indicator before the first bar'.format(field))
+        return [row[ROW_INDEX[field]] for row in history]
+    
+    def get_state(self):
+        #A copy of the running state of every indicator, for checkpoints (see checkpoint.py).
+        #The buffers are copied too, so the state does not change as the indicators are updated.
+        return {key: deepcopy(vars(indicator)) for key, indicator in self.indicators.items()}
+    
+    def set_state(self, state):
+        
+        #Restores the indicators in place, so the references strategies hold stay valid.
+        #Indicators missing from this service are registered first.
+        
+        for key, values in state.items():
+            indicator = self.indicators.get(key)
+            if indicator is None:
+                indicator = self.register(*key)
+            vars(indicator).update(deepcopy(values))
+    
+    def feed(self, indicator, x):
+        #bars before a symbol's first trade are NaN and are skipped
+        if x == x:
+            indicator.update(x)
+    
+    def update(self, snapshot = None, symbols = None):
+        
+        #Feeds the newest bar to every registered indicator
+        #snapshot - the BarSnapshot of the bar, if the data handler builds one
+        #symbols - the set of symbols with a new bar at this timestamp, or None for all of them; the others
+        #          keep their previous values in the snapshot, which must not be fed to their indicators again
+        
+        if snapshot is not None:
+            for symbol, field, indicator in self.by_symbol:
+                if symbols is None or symbol in symbols:
+                    self.feed(indicator, snapshot.price(symbol, field))
+        elif hasattr(self.data, 'get_latest_bars'):
+            bars = self.data.get_latest_bars()
+            symbol_index = self.data.symbol_index
+            for symbol, field, indicator in self.by_symbol:
+                self.feed(indicator, bars[symbol_index[symbol], FIELD_INDEX[field]])
+        else:
+            latest = {}
+            for symbol, field, indicator in self.by_symbol:
+                if symbol not in latest:
+                    latest[symbol] = self.data.get_latest_data(symbol)[0]
+                self.feed(indicator, latest[symbol][ROW_INDEX[field]])
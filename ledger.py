@@ -0,0 +1,130 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+class PositionLedger():
+    
+    #Records positions and holdings for every bar in preallocated arrays rather than a list of dictionaries.
+    #positions has shape (rows, symbols). holdings has shape (rows, symbols + 3): the market value of
+    #each symbol followed by the cash, commission and total columns, so that the equity curve
+    #can be built as a DataFrame directly on top of it without copying.
+    #The arrays start with chunk_size rows and at least double in size whenever they fill up.
+    
+    EXTRA_COLUMNS = ('cash', 'commission', 'total')
+    
+    def __init__(self, symbol_list, start_date, initial_capital, chunk_size = 4096):
+        
+        #start_date - the datestamp of the first row, which holds the initial capital
+        #chunk_size - the initial number of rows, and the least number added every time the arrays run out of space
+        
+        self.symbol_list = symbol_list
+        self.columns = list(symbol_list) + list(self.EXTRA_COLUMNS)
+        self.chunk_size = chunk_size
+        
+        n = len(symbol_list)
+        self.cash_col = n
+        self.commission_col = n + 1
+        self.total_col = n + 2
+        
+        self.positions = np.zeros((chunk_size, n))
+        self.holdings = np.zeros((chunk_size, n + 3))
+        self.datestamps = np.empty(chunk_size, dtype = object)
+        self.last_prices = np.zeros(n)   #the last valid price of each symbol, 0 until its first bar
+        
+        #the first row: no positions and all of the capital in cash
+        self.datestamps[0] = start_date
+        self.holdings[0, self.cash_col] = initial_capital
+        self.holdings[0, self.total_col] = initial_capital
+        self.length = 1
+        
+    def __len__(self):
+        return self.length
+    
+    def open(self, positions, prices, cash):
+        
+        #Replaces the first row, before any others are recorded, with positions held from the start
+        #positions, prices - float arrays in symbol_list order; prices also become the last valid prices
+        
+        self.last_prices[:] = prices
+        self.positions[0] = positions
+        np.multiply(positions, prices, out = self.holdings[0, :self.cash_col])
+        self.holdings[0, self.cash_col] = cash
+        self.holdings[0, self.total_col] = cash + positions.dot(prices)
+        
+    def grow(self):
+        
+        #geometric growth keeps the total copying linear in the number of rows
+        capacity = max(2*len(self.datestamps), len(self.datestamps) + self.chunk_size)
+        
+        positions = np.zeros((capacity, self.positions.shape[1]))
+        positions[:self.length] = self.positions[:self.length]
+        holdings = np.zeros((capacity, self.holdings.shape[1]))
+        holdings[:self.length] = self.holdings[:self.length]
+        datestamps = np.empty(capacity, dtype = object)
+        datestamps[:self.length] = self.datestamps[:self.length]
+        
+        self.positions, self.holdings, self.datestamps = positions, holdings, datestamps
+        
+    def record(self, datestamp, positions, prices, cash, commission, new_row = True):
+        
+        #Marks the positions to market at prices and writes a row.
+        #positions, prices - float arrays in symbol_list order
+        #A symbol whose price is NaN (before its first bar or on a bar it misses) is valued at its last valid price,
+        #or at 0 before its first bar, when its position can only be flat
+        #new_row - False overwrites the latest row instead, e.g. when a fill arrives within the same bar
+        
+        if new_row or self.length == 1:
+            if self.length == len(self.datestamps):
+                self.grow()
+            self.length += 1
+        
+        np.copyto(self.last_prices, prices, where = prices == prices)
+        prices = self.last_prices
+        
+        i = self.length - 1
+        row = self.holdings[i]
+        
+        self.datestamps[i] = datestamp
+        self.positions[i] = positions
+        np.multiply(positions, prices, out = row[:self.cash_col])
+        row[self.cash_col] = cash
+        row[self.commission_col] = commission
+        row[self.total_col] = cash + positions.dot(prices)   #the only reduction per bar; see VectorizedBacktest before changing it
+        
+    def get_state(self):
+        
+        #the recorded rows only, not the spare capacity
+        
+        n = self.length
+        return {'positions': self.positions[:n].copy(), 'holdings': self.holdings[:n].copy(),
+                'datestamps': self.datestamps[:n].copy(), 'last_prices': self.last_prices.copy()}
+    
+    def set_state(self, state):
+        
+        n = len(state['datestamps'])
+        while len(self.datestamps) < n:
+            self.grow()
+        
+        self.positions[:n] = state['positions']
+        self.holdings[:n] = state['holdings']
+        self.datestamps[:n] = state['datestamps']
+        self.last_prices[:] = state['last_prices']
+        self.length = n
+        
+    def latest_total(self):
+        return self.holdings[self.length - 1, self.total_col]
+    
+    def positions_frame(self):
+        
+        #Returns a DataFrame view over the recorded positions
+        
+        return pd.DataFrame(self.positions[:self.length], columns = list(self.symbol_list),
+                            index = pd.Index(self.datestamps[:self.length], name = 'datestamp'), copy = False)
+        
+    def holdings_frame(self):
+        
+        #Returns a DataFrame view over the recorded holdings, laid out like NaivePortfolio.all_holdings
+        
+        return pd.DataFrame(self.holdings[:self.length], columns = self.columns,
+                            index = pd.Index(self.datestamps[:self.length], name = 'datestamp'), copy = False)
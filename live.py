@@ -0,0 +1,543 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+#PYTHON MODULES
+
+import asyncio
+import json
+import logging
+import time
+from abc import (ABCMeta, abstractmethod)
+from array import array
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import (FIELDS, FIELD_INDEX, load_symbol_arrays)
+from Event_Driven_Backtester.events import (MarketEvent, SignalEvent, OrderEvent, FillEvent, BarSnapshot, Direction, to_enum)
+
+logger = logging.getLogger(__name__)
+
+#This is an abstract base class and so cannot be instantiated.
+#The asynchronous counterpart of DataAbstractClass for live and paper trading feeds
+class AsyncDataAbstractClass(metaclass = ABCMeta):
+    
+    sent = None     #the feed's send time (unix seconds) of the latest bar, for feeds that supply one
+    
+    @abstractmethod
+    def get_latest_data(self, symbol, N=1):
+        pass
+    
+    @abstractmethod
+    async def next_bar(self):
+        #Waits for the next bar and returns its MarketEvent, or None once the feed has ended
+        pass
+    
+    async def connect(self):
+        pass
+    
+    async def close(self):
+        pass
+
+#The asynchronous counterpart of ExecutionAbstractClass for live and paper trading brokers
+class AsyncExecutionAbstractClass(metaclass = ABCMeta):
+    
+    @abstractmethod
+    async def execute_order(self, event):
+        #Sends the order, waits for the broker and returns a FillEvent, or None if nothing was filled
+        pass
+    
+    async def connect(self):
+        pass
+    
+    async def close(self):
+        pass
+
+def read_message(line):
+    return json.loads(line)
+
+def write_message(writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+
+class SocketDataHandler(AsyncDataAbstractClass):
+    
+    #Reads bars from a TCP feed of JSON lines, such as MockFeedServer.
+    #The first line is a header {"symbols": [...], "fields": [...]}; every following line is one bar
+    #{"date": ..., "sent": unix time, "bars": [[field values] per symbol]}.
+    #Keeps the last `history` bars of each symbol like StreamingCSVDataHandler and puts a BarSnapshot
+    #on every MarketEvent, so the strategies and portfolios written for the backtest run unchanged.
+    
+    def __init__(self, host, port, symbol_list, history = 100):
+        
+        #host, port - the address of the feed
+        #symbol_list - the symbols to follow, a subset of the symbols the feed sends
+        #history - the number of bars kept per symbol, the largest useful N for get_latest_data
+        
+        self.host = host
+        self.port = port
+        self.symbol_list = symbol_list
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        self.history = history
+        
+        self.latest_symbol_data = {s: deque(maxlen = history) for s in symbol_list}
+        self.latest_values = np.full((len(symbol_list), len(FIELDS)), np.nan)
+        
+        self.continue_backtest = True
+        self.indicators = None    #an IndicatorService updated on every bar, see indicators.py
+        self.sent = None          #the feed's send time of the latest bar, for latency measurements
+        
+        self.reader = None
+        self.writer = None
+        self.rows = None          #positions of symbol_list in the feed's symbols
+        self.columns = None       #positions of FIELDS in the feed's fields
+    
+    async def connect(self):
+        
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        header = read_message(await self.reader.readline())
+        
+        missing = [s for s in self.symbol_list if s not in header['symbols']]
+        if missing:
+            raise ValueError('the feed does not send {}'.format(missing))
+        
+        self.rows = [header['symbols'].index(s) for s in self.symbol_list]
+        self.columns = [header['fields'].index(f) for f in FIELDS]
+    
+    async def close(self):
+        
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+    
+    def get_latest_data(self, symbol, N=1):
+        #Returns the last N rows from latest_symbol_data - or as many as are available
+        
+        try:
+            buffer = self.latest_symbol_data[symbol]
+        except KeyError:
+            logger.warning('%s is not a valid symbol', symbol)
+            return None
+        
+        if N >= len(buffer):
+            return list(buffer)
+        
+        return list(islice(reversed(buffer), N))[::-1]
+    
+    async def next_bar(self):
+        
+        line = await self.reader.readline()
+        if not line:
+            self.continue_backtest = False   #the feed has closed
+            return None
+        
+        message = read_message(line)
+        date = pd.Timestamp(message['date'])
+        values = np.array(message['bars'], dtype = float)[self.rows][:, self.columns]
+        self.sent = message.get('sent')
+        
+        updated = set()
+        for i, s in enumerate(self.symbol_list):
+            row = values[i]
+            if row[5] == row[5]:    #the symbol has a bar at this timestamp
+                self.latest_symbol_data[s].append((s, date, row[0], row[1], row[2], row[4], row[5]))
+                self.latest_values[i] = row
+                updated.add(s)
+        
+        snapshot = BarSnapshot(date, self.symbol_list, FIELDS, self.latest_values.copy(), self.symbol_index, FIELD_INDEX)
+        
+        if self.indicators is not None:
+            self.indicators.update(snapshot, updated)
+        
+        return MarketEvent(snapshot)
+
+class SocketExecutionHandler(AsyncExecutionAbstractClass):
+    
+    #Sends orders to a TCP broker of JSON lines, such as MockBrokerServer, and matches its fills to the
+    #orders by id, so any number of orders can be waiting for the broker at once.
+    #Orders: {"id", "symbol", "order_type", "quantity", "direction"}
+    #Fills:  {"id", "quantity", "direction", "price", "commission"}; a null price means the portfolio's own price
+    
+    def __init__(self, host, port, exchange = 'ARCA'):
+        
+        self.host = host
+        self.port = port
+        self.exchange = exchange
+        
+        self.pending = {}     #order id: future resolved with the broker's fill message
+        self.next_id = 0
+        self.reader = None
+        self.writer = None
+        self.listener = None
+    
+    async def connect(self):
+        
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.listener = asyncio.ensure_future(self.listen())
+    
+    async def close(self):
+        
+        if self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+    
+    async def listen(self):
+        
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            fill = read_message(line)
+            future = self.pending.pop(fill['id'], None)
+            if future is None:
+                logger.warning('fill for unknown order id %s: %s', fill['id'], fill)
+            elif not future.done():
+                future.set_result(fill)
+        
+        #the broker went away: nothing pending will be filled
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError('the broker closed the connection'))
+        self.pending.clear()
+    
+    async def execute_order(self, event):
+        
+        order_id = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[order_id] = future
+        
+        try:
+            write_message(self.writer, {'id': order_id, 'symbol': event.symbol, 'order_type': event.order_type,
+                                        'quantity': event.quantity, 'direction': int(event.direction)})
+            await self.writer.drain()
+            fill = await future
+        finally:
+            self.pending.pop(order_id, None)    #e.g. cancelled by the runtime's timeout
+        
+        if fill['quantity'] == 0:
+            return None
+        
+        return FillEvent(event.symbol, datetime.now(), self.exchange, fill['quantity'],
+                         to_enum(Direction, fill['direction']), fill['price'], fill.get('commission', 0))
+
+class MockFeedServer():
+    
+    #A local TCP feed for end-to-end tests without an external service: sends the header and then
+    #one JSON line per bar of (dates, bars) to every client, with `interval` seconds between bars (0 is as fast as possible).
+    #Use port 0 to pick a free port, then read self.port once start() has returned.
+    
+    def __init__(self, dates, bars, symbol_list, interval = 0.0, host = '127.0.0.1', port = 0):
+        
+        #dates, bars - aligned arrays as returned by load_symbol_arrays
+        
+        self.dates = dates
+        self.bars = bars
+        self.symbol_list = symbol_list
+        self.interval = interval
+        self.host = host
+        self.port = port
+        self.server = None
+    
+    @classmethod
+    def from_csv(cls, csv_dir, symbol_list, **kwargs):
+        dates, bars = load_symbol_arrays(csv_dir, symbol_list)
+        return cls(dates, bars, symbol_list, **kwargs)
+    
+    async def start(self):
+        
+        self.server = await asyncio.start_server(self.serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+    
+    async def close(self):
+        
+        self.server.close()
+        await self.server.wait_closed()
+    
+    async def serve(self, reader, writer):
+        
+        try:
+            write_message(writer, {'symbols': list(self.symbol_list), 'fields': list(FIELDS)})
+            dates = np.datetime_as_string(self.dates)
+            
+            for i in range(len(dates)):
+                write_message(writer, {'date': str(dates[i]), 'sent': time.time(), 'bars': self.bars[i].tolist()})
+                await writer.drain()    #waits while the client is not keeping up
+                if self.interval:
+                    await asyncio.sleep(self.interval)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+class MockBrokerServer():
+    
+    #A local TCP broker for end-to-end tests: fills every order in full after `delay` seconds,
+    #charging `commission` per order. The price is left to the portfolio.
+    
+    def __init__(self, delay = 0.0, commission = 0.0, host = '127.0.0.1', port = 0):
+        
+        self.delay = delay
+        self.commission = commission
+        self.host = host
+        self.port = port
+        self.server = None
+        self.orders = 0
+    
+    async def start(self):
+        
+        self.server = await asyncio.start_server(self.serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+    
+    async def close(self):
+        
+        self.server.close()
+        await self.server.wait_closed()
+    
+    async def serve(self, reader, writer):
+        
+        replies = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            self.orders += 1
+            order = read_message(line)
+            reply = asyncio.ensure_future(self.fill(writer, order))    #orders are filled concurrently
+            replies.add(reply)
+            reply.add_done_callback(replies.discard)
+        
+        for reply in list(replies):
+            reply.cancel()
+        writer.close()
+    
+    async def fill(self, writer, order):
+        
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        write_message(writer, {'id': order['id'], 'quantity': order['quantity'], 'direction': order['direction'],
+                               'price': None, 'commission': self.commission})
+        await writer.drain()
+
+def percentiles(values):
+    
+    #(count, p50, p99) of an array of seconds
+    
+    if not len(values):
+        return {'count': 0, 'p50': None, 'p99': None}
+    
+    p50, p99 = np.percentile(np.frombuffer(values, dtype = float), [50, 99])
+    return {'count': len(values), 'p50': float(p50), 'p99': float(p99)}
+
+class LiveRuntime():
+    
+    #Runs a strategy and portfolio against an asynchronous data feed and broker on an asyncio event loop.
+    #Bars and fills arrive on a bounded asyncio.Queue and are dispatched one at a time through the
+    #same EventBus subscriptions as Backtest, so the synchronous strategies and portfolios are reused.
+    #Orders are sent as tasks, so waiting on the broker never stalls the feed.
+    #Backpressure: the feed waits when max_queue events are queued, and at most max_in_flight orders are
+    #waiting on the broker at once. Timeouts: a feed silent for bar_timeout seconds ends the run; an order
+    #without a fill after order_timeout seconds gives up its slot but is still waited on, and its fill is
+    #applied whenever it arrives (counted in self.late_fills). Both are counted in self.timeouts.
+    #Orders still unfilled once the feed has ended and the broker has been silent for late_fill_timeout
+    #seconds are cancelled and logged as errors, with their outcome at the broker unknown.
+    
+    def __init__(self, event_queue, data, strategy, portfolio, broker, max_queue = 1000, max_in_flight = 100,
+                 bar_timeout = None, order_timeout = 5.0, late_fill_timeout = 60.0):
+        
+        #event_queue - the EventBus shared by the strategy and portfolio
+        #data - an AsyncDataAbstractClass, broker - an AsyncExecutionAbstractClass
+        #bar_timeout, order_timeout - seconds, or None to wait forever
+        #late_fill_timeout - seconds to wait for the broker at the end of the run, or None to wait forever
+        
+        self.event_queue = event_queue
+        self.data = data
+        self.strategy = strategy
+        self.portfolio = portfolio
+        self.broker = broker
+        
+        self.max_queue = max_queue
+        self.max_in_flight = max_in_flight
+        self.bar_timeout = bar_timeout
+        self.order_timeout = order_timeout
+        self.late_fill_timeout = late_fill_timeout
+        
+        self.bars = 0
+        self.events = 0
+        self.elapsed = 0.0
+        self.max_depth = 0                        #the deepest the inbound queue got
+        self.timeouts = {'feed': 0, 'order': 0}
+        self.late_fills = 0                       #fills that arrived after their order timed out
+        self.abandoned = 0                        #orders given up on at the end of the run
+        self.errors = 0                           #orders whose broker call raised, e.g. a lost connection
+        self.bar_latency = array('d')             #bar received -> all handlers done
+        self.feed_latency = array('d')            #bar sent by the feed -> received
+        self.order_latency = array('d')           #order sent -> fill received
+        
+        self.subscribe_components()
+    
+    def subscribe_components(self):
+        
+        bus = self.event_queue
+        bus.subscribe(MarketEvent, self.portfolio.update_timeindex)
+        bus.subscribe(MarketEvent, self.strategy.calculate_signals)
+        bus.subscribe(SignalEvent, self.portfolio.update_signal)
+        bus.subscribe(OrderEvent, self.submit_order)              #sent to the broker asynchronously
+        bus.subscribe(FillEvent, self.portfolio.update_fill)
+        bus.subscribe(FillEvent, self.portfolio.update_timeindex)
+    
+    def submit_order(self, event):
+        
+        task = asyncio.ensure_future(self.send_order(event))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+    
+    async def send_order(self, event):
+        
+        order = None
+        try:
+            async with self.order_slots:
+                sent = time.perf_counter()
+                order = asyncio.ensure_future(self.broker.execute_order(event))
+                done, _ = await asyncio.wait((order,), timeout = self.order_timeout)
+            
+            if not done:
+                #the broker may still fill the order, so it is not dropped: keep waiting outside the order slots
+                self.timeouts['order'] += 1
+                logger.warning('no fill for %s %s within %ss, waiting for a late fill', event.symbol, event.quantity, self.order_timeout)
+                await asyncio.wait((order,))
+        finally:
+            if order is not None:
+                order.cancel()    #a no-op once it is done; otherwise this task was cancelled, e.g. by abandon_orders
+        
+        try:
+            fill = order.result()
+        except Exception:
+            #any failure of the broker is counted and logged here, so none is left unretrieved on the task
+            self.errors += 1
+            logger.exception('order for %s %s failed', event.symbol, event.quantity)
+            return
+        self.order_latency.append(time.perf_counter() - sent)
+        if not done:
+            self.late_fills += 1
+        
+        if fill is not None:
+            await self.put(fill)
+    
+    async def put(self, event):
+        
+        await self.inbound.put((event, time.perf_counter()))
+        depth = self.inbound.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+    
+    async def feed(self):
+        
+        try:
+            while self.data.continue_backtest:
+                try:
+                    event = await asyncio.wait_for(self.data.next_bar(), self.bar_timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts['feed'] += 1
+                    logger.warning('no bar within %ss, stopping', self.bar_timeout)
+                    break
+                
+                if event is None:
+                    break
+                if self.data.sent is not None:    #declared on AsyncDataAbstractClass
+                    self.feed_latency.append(max(time.time() - self.data.sent, 0.0))
+                await self.put(event)
+        finally:
+            await self.inbound.put(None)    #tells consume() the feed has ended
+    
+    def handle(self, event, received):
+        
+        bus = self.event_queue
+        bus.put(event)
+        self.events += bus.dispatch()
+        
+        if event.__class__ is MarketEvent:
+            self.bars += 1
+            self.bar_latency.append(time.perf_counter() - received)
+    
+    async def consume(self):
+        
+        inbound = self.inbound
+        
+        while True:
+            item = await inbound.get()
+            if item is None:
+                break
+            self.handle(*item)
+        
+        #the feed has ended: finish the orders still waiting on the broker
+        while self.in_flight or not inbound.empty():
+            if inbound.empty():
+                done, _ = await asyncio.wait(set(self.in_flight), timeout = self.late_fill_timeout,
+                                             return_when = asyncio.FIRST_COMPLETED)
+                if not done:
+                    await self.abandon_orders()
+            else:
+                self.handle(*inbound.get_nowait())
+    
+    async def abandon_orders(self):
+        
+        #Gives up on the orders in flight when the broker has stopped answering after the feed ended.
+        #Their fills can no longer be applied, so they are logged as errors rather than dropped silently.
+        
+        tasks = set(self.in_flight)
+        self.abandoned += len(tasks)
+        logger.error('%d orders still have no fill after %ss; their outcome at the broker is unknown',
+                     len(tasks), self.late_fill_timeout)
+        
+        for task in tasks:
+            task.cancel()
+        await asyncio.wait(tasks)
+    
+    async def run_async(self):
+        
+        self.inbound = asyncio.Queue(maxsize = self.max_queue)
+        self.order_slots = asyncio.Semaphore(self.max_in_flight)
+        self.in_flight = set()
+        
+        await self.data.connect()
+        await self.broker.connect()
+        
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(self.feed(), self.consume())
+        finally:
+            self.elapsed = time.perf_counter() - start
+            await self.broker.close()
+            await self.data.close()
+        
+        return self.portfolio.output_summary_stats()
+    
+    def run(self):
+        
+        #Runs until the feed ends and returns the portfolio's summary stats
+        
+        return asyncio.run(self.run_async())
+    
+    def latency_report(self):
+        
+        return {'bars': self.bars,
+                'events': self.events,
+                'elapsed': self.elapsed,
+                'bars_per_sec': self.bars/self.elapsed if self.elapsed > 0 else 0.0,
+                'max_queue_depth': self.max_depth,
+                'timeouts': dict(self.timeouts),
+                'late_fills': self.late_fills,
+                'abandoned': self.abandoned,
+                'errors': self.errors,
+                'bar': percentiles(self.bar_latency),
+                'feed': percentiles(self.feed_latency),
+                'order': percentiles(self.order_latency)}
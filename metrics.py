@@ -0,0 +1,212 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+from collections import deque
+
+#Streaming counterparts of performance.py: every update is O(1) and no history is kept
+#beyond a rolling window, so they can report risk numbers bar by bar during a run.
+#Values are total account equity; drawdowns are in units of the first value seen,
+#like the 'equity_curve' column used by create_drawdowns.
+#update(value, new_period = False) replaces the latest value instead of adding one,
+#e.g. when a fill changes the total within the same bar.
+
+class StreamingMetrics():
+    
+    #Running total return, Sharpe ratio (Welford mean/variance of period returns),
+    #maximum peak-to-trough drawdown and the longest drawdown duration in periods
+    
+    def __init__(self, periods = 252):
+        
+        #periods - daily (252), hourly (252*6.5), minutely (252*6.5*60)
+        
+        self.periods = periods
+        
+        self.first = None        #first value, used to normalise equity
+        self.last = None         #latest value
+        self.previous = None     #value of the period before the latest one
+        self.count = 0           #number of returns seen
+        self.mean = 0.0          #running mean of returns
+        self.m2 = 0.0            #running sum of squared deviations of returns
+        
+        self.peak = None         #high-water mark of normalised equity
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.duration = 0        #periods since the high-water mark
+        self.max_duration = 0
+        
+        self.saved = None        #the state before the latest period, restored when it is replaced
+        
+    def state(self):
+        return (self.first, self.last, self.previous, self.count, self.mean, self.m2,
+                self.peak, self.drawdown, self.max_drawdown, self.duration, self.max_duration)
+    
+    def restore(self, state):
+        (self.first, self.last, self.previous, self.count, self.mean, self.m2,
+         self.peak, self.drawdown, self.max_drawdown, self.duration, self.max_duration) = state
+        
+    def update(self, value, new_period = True):
+        
+        if new_period or self.saved is None:
+            self.saved = self.state()
+        else:
+            self.restore(self.saved)
+        
+        if self.first is None:
+            self.first = value
+        else:
+            #Welford's update of the mean and variance of returns
+            r = value/self.last - 1.0
+            self.count += 1
+            delta = r - self.mean
+            self.mean += delta/self.count
+            self.m2 += delta*(r - self.mean)
+            
+        self.previous = self.last
+        self.last = value
+        
+        equity = value/self.first
+        if self.peak is None or equity >= self.peak:
+            self.peak = equity
+            self.drawdown = 0.0
+            self.duration = 0
+        else:
+            self.drawdown = self.peak - equity
+            self.duration += 1
+            self.max_drawdown = max(self.max_drawdown, self.drawdown)
+            self.max_duration = max(self.max_duration, self.duration)
+    
+    def total_return(self):
+        return self.last/self.first - 1.0
+    
+    def volatility(self):
+        #population standard deviation of returns, as np.std in create_sharpe_ratio
+        return np.sqrt(self.m2/self.count) if self.count > 0 else np.nan
+    
+    def sharpe_ratio(self):
+        return np.sqrt(self.periods)*self.mean/self.volatility() if self.count > 0 else np.nan
+    
+    def summary(self):
+        
+        #Returns the current metrics as a dictionary of numbers
+        
+        return {'Total Return': self.total_return()*100,
+                'Sharpe Ratio': self.sharpe_ratio(),
+                'Max Drawdown': self.max_drawdown,
+                'Drawdown Duration': self.max_duration}
+    
+class RollingMetrics():
+    
+    #Return, volatility, Sharpe ratio and drawdown from the rolling peak over the last `window` periods.
+    #The returns are kept with a sliding-window Welford update and the rolling peak with a monotonic deque,
+    #so each update is O(1) amortised.
+    
+    def __init__(self, window, periods = 252):
+        
+        #window - number of periods (returns) in the window
+        
+        self.window = window
+        self.periods = periods
+        
+        self.first = None
+        self.values = deque()     #the last window + 1 values
+        self.returns = deque()    #the last window returns
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.peaks = deque()      #(index, value) pairs with decreasing values: the head is the rolling peak
+        self.index = 0
+        
+        self.undo = None          #what the latest update changed, so that it can be replaced
+        
+    def add_return(self, r):
+        n = len(self.returns)
+        delta = r - self.mean
+        self.mean += delta/n
+        self.m2 += delta*(r - self.mean)
+        
+    def remove_return(self, r):
+        n = len(self.returns)    #the count after removal
+        if n == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        mean = (self.mean*(n + 1) - r)/n
+        self.m2 = max(self.m2 - (r - self.mean)*(r - mean), 0.0)
+        self.mean = mean
+        
+    def push(self, value):
+        
+        undo = {'mean': self.mean, 'm2': self.m2, 'value': None, 'returned': False, 'return': None,
+                'popped': [], 'peak': None}
+        
+        if self.values:
+            self.returns.append(value/self.values[-1] - 1.0)
+            self.add_return(self.returns[-1])
+            undo['returned'] = True
+            if len(self.returns) > self.window:
+                undo['return'] = self.returns.popleft()
+                self.remove_return(undo['return'])
+        
+        self.values.append(value)
+        if len(self.values) > self.window + 1:
+            undo['value'] = self.values.popleft()
+        
+        while self.peaks and self.peaks[-1][1] <= value:
+            undo['popped'].append(self.peaks.pop())
+        self.peaks.append((self.index, value))
+        if self.peaks[0][0] < self.index - self.window:
+            undo['peak'] = self.peaks.popleft()
+            
+        self.index += 1
+        return undo
+    
+    def revert(self, undo):
+        
+        self.index -= 1
+        
+        if undo['peak'] is not None:
+            self.peaks.appendleft(undo['peak'])
+        self.peaks.pop()
+        self.peaks.extend(reversed(undo['popped']))
+        
+        self.values.pop()
+        if undo['value'] is not None:
+            self.values.appendleft(undo['value'])
+            
+        if undo['returned']:
+            self.returns.pop()
+        if undo['return'] is not None:
+            self.returns.appendleft(undo['return'])
+            
+        self.mean, self.m2 = undo['mean'], undo['m2']
+        
+    def update(self, value, new_period = True):
+        
+        if not new_period and self.undo is not None:
+            self.revert(self.undo)
+        
+        #the first value, including when it is the one being replaced
+        if not self.values:
+            self.first = value
+            
+        self.undo = self.push(value)
+        
+    def window_return(self):
+        return self.values[-1]/self.values[0] - 1.0
+    
+    def volatility(self):
+        return np.sqrt(self.m2/len(self.returns)) if self.returns else np.nan
+    
+    def sharpe_ratio(self):
+        return np.sqrt(self.periods)*self.mean/self.volatility() if self.returns else np.nan
+    
+    def drawdown(self):
+        return (self.peaks[0][1] - self.values[-1])/self.first
+    
+    def summary(self):
+        
+        return {'Window Return': self.window_return()*100,
+                'Volatility': self.volatility(),
+                'Sharpe Ratio': self.sharpe_ratio(),
+                'Drawdown': self.drawdown()}
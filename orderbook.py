@@ -0,0 +1,201 @@
+#PYTHON MODULES
+
+from bisect import (bisect_left, bisect_right, insort)
+from math import inf
+
+#MY MODULES
+
+from Event_Driven_Backtester.events import Direction
+
+class PriceIndex():
+    
+    #A sorted list of (price, seq) keys. Orders at the same price keep their arrival order through seq.
+    #Triggered orders always form a prefix or a suffix of the list, so finding them is a bisection.
+    
+    def __init__(self):
+        self.keys = []
+        
+    def __len__(self):
+        return len(self.keys)
+        
+    def add(self, price, seq):
+        insort(self.keys, (price, seq))
+        
+    def remove(self, price, seq):
+        
+        i = bisect_left(self.keys, (price, seq))
+        if i < len(self.keys) and self.keys[i] == (price, seq):
+            del self.keys[i]
+            
+    def pop_at_or_below(self, price):
+        
+        k = bisect_right(self.keys, (price, inf))
+        popped = self.keys[:k]
+        del self.keys[:k]
+        return popped
+    
+    def pop_at_or_above(self, price):
+        
+        k = bisect_left(self.keys, (price, -inf))
+        popped = self.keys[k:]
+        del self.keys[k:]
+        return popped
+
+class ConditionalOrder():
+    
+    #A resting LIMIT, STOP or STOPLIMIT order
+    __slots__ = ('order_id', 'seq', 'symbol', 'order_type', 'direction', 'quantity', 'limit_price', 'stop_price', 'eligible_bar')
+    
+    def __init__(self, order_id, seq, symbol, order_type, direction, quantity, limit_price, stop_price, eligible_bar = 0):
+        self.order_id = order_id
+        self.seq = seq
+        self.symbol = symbol
+        self.order_type = order_type
+        self.direction = direction
+        self.quantity = quantity
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.eligible_bar = eligible_bar    #the first bar the order can trigger on
+
+class ConditionalOrderBook():
+    
+    #Resting conditional orders indexed per symbol by trigger price, so that a bar only touches
+    #the orders whose trigger lies inside its high/low range:
+    #- a buy limit fills when the low reaches it, at the limit or the open if the bar gaps below it
+    #- a sell limit fills when the high reaches it, at the limit or the open if the bar gaps above it
+    #- a buy stop triggers when the high reaches it, at the stop or the open if the bar gaps above it
+    #- a sell stop triggers when the low reaches it, at the stop or the open if the bar gaps below it
+    #A triggered STOPLIMIT becomes a LIMIT at its limit price, resting from the next bar.
+    #Orders are not triggered before their eligible_bar, which is how execution latency is modelled.
+    
+    def __init__(self):
+        
+        self.orders = {}     #order_id: ConditionalOrder
+        self.by_seq = {}     #seq: ConditionalOrder, to resolve index keys
+        self.indexes = {}    #(symbol, 'LIMIT' or 'STOP', direction): PriceIndex
+        self.seq = 0
+        
+    def __len__(self):
+        return len(self.orders)
+    
+    def __contains__(self, order_id):
+        return order_id in self.orders
+    
+    def index_key(self, order):
+        
+        #returns the index an order rests in and its price there
+        
+        if order.order_type == 'LIMIT':
+            return (order.symbol, 'LIMIT', order.direction), order.limit_price
+        return (order.symbol, 'STOP', order.direction), order.stop_price
+    
+    def insert(self, order):
+        
+        key, price = self.index_key(order)
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.indexes[key] = PriceIndex()
+        index.add(price, order.seq)
+        self.orders[order.order_id] = order
+        self.by_seq[order.seq] = order
+        
+    def active_symbols(self):
+        #the symbols with at least one resting order
+        return {key[0] for key, index in self.indexes.items() if index}
+        
+    def add(self, order_id, symbol, order_type, direction, quantity, limit_price = None, stop_price = None, eligible_bar = 0):
+        
+        if order_type not in ('LIMIT', 'STOP', 'STOPLIMIT'):
+            raise ValueError('{} is not a conditional order type'.format(order_type))
+        if order_type in ('LIMIT', 'STOPLIMIT') and limit_price is None:
+            raise ValueError('a {} order needs a limit_price'.format(order_type))
+        if order_type in ('STOP', 'STOPLIMIT') and stop_price is None:
+            raise ValueError('a {} order needs a stop_price'.format(order_type))
+        if order_id in self.orders:
+            raise ValueError('order {} is already resting'.format(order_id))
+        
+        order = ConditionalOrder(order_id, self.seq, symbol, order_type, direction, quantity, limit_price, stop_price, eligible_bar)
+        self.seq += 1
+        self.insert(order)
+        
+        return order
+    
+    def cancel(self, order_id):
+        
+        #Removes a resting order and returns it, or None if there is no such order
+        
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            del self.by_seq[order.seq]
+            key, price = self.index_key(order)
+            self.indexes[key].remove(price, order.seq)
+        return order
+    
+    def replace(self, order_id, quantity = None, limit_price = None, stop_price = None):
+        
+        #Changes a resting order; like an exchange, the replaced order loses its time priority.
+        #Returns the new order, or None if there is no such order
+        
+        order = self.cancel(order_id)
+        if order is None:
+            return None
+        
+        return self.add(order_id, order.symbol, order.order_type, order.direction,
+                        order.quantity if quantity is None else quantity,
+                        order.limit_price if limit_price is None else limit_price,
+                        order.stop_price if stop_price is None else stop_price,
+                        order.eligible_bar)
+        
+    def pop_triggered(self, symbol, kind, direction, high, low):
+        
+        index = self.indexes.get((symbol, kind, direction))
+        if not index:
+            return []
+        
+        #buy limits and sell stops trigger from above the low; sell limits and buy stops from below the high
+        if (kind == 'LIMIT') == (direction == Direction.BUY):
+            return index.pop_at_or_above(low)
+        
+        return index.pop_at_or_below(high)
+    
+    def trigger(self, symbol, bar, open_price, high, low):
+        
+        #Returns a list of (order, fill price) for the orders of symbol filled by a bar, in arrival order.
+        #Filled orders are removed; triggered STOPLIMIT orders are re-inserted as LIMIT orders.
+        
+        if high != high or low != low:    #no data for this symbol yet
+            return []
+        if open_price != open_price:
+            open_price = None
+        
+        triggered = []
+        for direction in (Direction.BUY, Direction.SELL):
+            for kind in ('LIMIT', 'STOP'):
+                triggered.extend(self.pop_triggered(symbol, kind, direction, high, low))
+        
+        fills = []
+        for price, seq in sorted(triggered, key = lambda key: key[1]):
+            order = self.by_seq[seq]
+            
+            if order.eligible_bar > bar:    #still in flight to the exchange
+                self.insert(order)
+                continue
+            
+            if order.order_type == 'STOPLIMIT':
+                order.order_type = 'LIMIT'
+                self.insert(order)
+                continue
+            
+            del self.orders[order.order_id]
+            del self.by_seq[seq]
+            
+            #the open is the first price traded in the bar, so a gap through the trigger fills there
+            if open_price is not None:
+                if (order.order_type == 'LIMIT') == (order.direction == Direction.BUY):
+                    price = min(open_price, price)
+                else:
+                    price = max(open_price, price)
+            
+            fills.append((order, price))
+            
+        return fills
@@ -16,10 +16,49 @@ def create_sharpe_ratio(returns, periods = 252):
 def create_drawdowns(equity_curve):
     
     #calculates the maximum drawdown: the largest peak to trough decline in equity curve
-    #calculates the drawdown duration: the time over which this occured
-    #equity_curve - a pandas series representing equity curve
+    #calculates the drawdown duration: the longest time, in periods, spent below a previous peak
+    #equity_curve - a pandas dataframe with an 'equity_curve' column
     
-    max_drawdown = equity_curve['equity_curve'].max() - equity_curve['equity_curve'].min()
-    duration = abs(equity_curve['equity_curve'].argmax() - equity_curve['equity_curve'].argmin())
+    curve = equity_curve['equity_curve'].values
+    high_water_mark = np.fmax.accumulate(curve)    #fmax skips the NaN in the first row
+    drawdown = high_water_mark - curve
+    
+    max_drawdown = np.nanmax(drawdown) if len(curve) > 0 else 0.0
+    
+    #periods since the last time the curve was at its high-water mark
+    index = np.arange(len(curve))
+    last_peak = np.maximum.accumulate(np.where(drawdown > 0, 0, index))
+    duration = (index - last_peak).max() if len(curve) > 0 else 0
     
     return max_drawdown, duration
+
+def create_summary_values(equity_curve):
+    
+    #Returns the summary statistics of a backtest as numbers, keyed by name:
+    #total_return (%), sharpe_ratio, max_drawdown and drawdown_duration (periods)
+    #equity_curve - a pandas dataframe with 'returns' and 'equity_curve' columns, as built by the portfolios
+    
+    total_return = equity_curve['equity_curve'].iloc[-1]
+    returns = equity_curve['returns']
+    
+    sharpe_ratio = create_sharpe_ratio(returns)
+    max_drawdown, duration = create_drawdowns(equity_curve)
+    
+    return {'total_return': float((total_return - 1)*100),
+            'sharpe_ratio': float(sharpe_ratio),
+            'max_drawdown': float(max_drawdown),
+            'drawdown_duration': int(duration)}
+
+def create_summary_stats(equity_curve):
+    
+    #Returns a list of (name, value) tuples summarising a backtest, with the values formatted as strings
+    #equity_curve - a pandas dataframe with 'returns' and 'equity_curve' columns, as built by the portfolios
+    
+    values = create_summary_values(equity_curve)
+    
+    stats = [('Total Return', '{}'.format(values['total_return'])), 
+            ('Sharpe Ratio', '{}'.format(values['sharpe_ratio'])),
+            ('Max Drawdown', '{}'.format(values['max_drawdown'])),
+            ('Drawdown Duration', '{}'.format(values['drawdown_duration']))]
+    
+    return stats
@@ -12,8 +12,14 @@ from math import floor
 
 #MY MODULES
 
-from Event_Driven_Backtester.events import FillEvent, OrderEvent, SignalEvent
-from Event_Driven_Backtester.performance import create_sharpe_ratio, create_drawdowns
+from Event_Driven_Backtester.events import FillEvent, MarketEvent, OrderEvent, SignalEvent, Direction, SignalType
+from Event_Driven_Backtester.performance import (create_summary_stats, create_summary_values)
+from Event_Driven_Backtester.metrics import StreamingMetrics, RollingMetrics
+from Event_Driven_Backtester.ledger import PositionLedger
+from Event_Driven_Backtester.data import FIELD_INDEX
+
+#Position of the adjusted close in the last axis of an array data handler's bars
+ADJ_CLOSE = FIELD_INDEX['adj_close']
 
 class PortfolioAbstractClass(metaclass = ABCMeta):
     #Abstract class providing an interface for all inherited strategy objects
@@ -30,23 +36,54 @@ class PortfolioAbstractClass(metaclass = ABCMeta):
 class NaivePortfolio(PortfolioAbstractClass):
     
     #Blindly sends orders to a brokerage without any risk management or position sizing
+    #The history holds one row per bar: the update_timeindex call that follows a fill
+    #refreshes the row for the current bar rather than appending a second one.
     
-    def __init__(self, event_queue, data, start_date, initial_capital = 100000):
+    def __init__(self, event_queue, data, start_date, initial_capital = 100000, order_pool = None, rolling_windows = ()):
         
         #start_date = the start date of the portfolio
+        #order_pool - an optional EventPool of OrderEvents to recycle orders from
+        #rolling_windows - window lengths, in bars, for which RollingMetrics are kept alongside the StreamingMetrics
         
         self.event_queue = event_queue
+        self.order_pool = order_pool
         self.data = data
         self.start_date = start_date
         self.initial_capital = initial_capital
         
         self.symbol_list = self.data.symbol_list
         
-        self.all_positions = self.construct_all_positions()
         self.current_positions = {s : 0 for s in self.symbol_list}
+        self.current_holdings = self.construct_current_holdings()
+        
+        self.snapshot = None    #the BarSnapshot of the latest MarketEvent, if the data handler builds them
+        
+        self.construct_history()
+        self.construct_metrics(rolling_windows)
+        
+    def construct_history(self):
+        
+        #The per-bar history, starting with a row that holds the initial capital.
+        #Subclasses that keep the history differently override this and the other *_history methods.
         
+        self.all_positions = self.construct_all_positions()
         self.all_holdings = self.construct_all_holdings()
-        self.current_holdings = self.construct_current_holdings()
+        self.last_prices = {s: 0.0 for s in self.symbol_list}   #the last valid adj. close of each symbol, 0 until its first bar
+        
+    def construct_metrics(self, rolling_windows):
+        
+        #Live risk metrics, updated with the total equity on every update_timeindex call.
+        #They start from the initial capital, like the first row of all_holdings.
+        
+        self.metrics = StreamingMetrics()
+        self.rolling_metrics = {w: RollingMetrics(w) for w in rolling_windows}
+        self.update_metrics(self.initial_capital)
+        
+    def update_metrics(self, total, new_period = True):
+        
+        self.metrics.update(total, new_period)
+        for rolling in self.rolling_metrics.values():
+            rolling.update(total, new_period)
         
     def construct_all_positions(self):
         
@@ -90,21 +127,32 @@ class NaivePortfolio(PortfolioAbstractClass):
         
     def update_timeindex(self, event):
         
-        #Updates all_positions & all_holdings when a MarketEvent occurs
-        
-        #get_latest_data(s) returns a list with a single element: the following tuple:
-        #(symbol, datetime, open, high, low, volume, adjusted close)
+        #Updates all_positions & all_holdings: a new row on a MarketEvent,
+        #otherwise (after a fill) the current bar's row is refreshed
         
-        data = {s: self.data.get_latest_data(s) for s in self.symbol_list}
+        self.update_snapshot(event)
+        new_row = isinstance(event, MarketEvent)
         
-        datestamp = data[self.symbol_list[0]][0][1]  #newest datestamp
+        if self.snapshot is not None:
+            datestamp = self.snapshot.timestamp
+            prices = dict(zip(self.symbol_list, self.snapshot.column('adj_close')))
+        else:
+            #get_latest_data(s) returns a list with a single element: the following tuple:
+            #(symbol, datetime, open, high, low, volume, adjusted close)
+            data = {s: self.data.get_latest_data(s) for s in self.symbol_list}
+            datestamp = data[self.symbol_list[0]][0][1]  #newest datestamp
+            prices = {s: data[s][0][6] for s in self.symbol_list}
+        
+        #a symbol has no price (NaN) before its first bar and on the bars it misses: it keeps its last valid price,
+        #or 0 before its first bar, when the position can only be flat
+        for s in self.symbol_list:
+            if prices[s] == prices[s]:
+                self.last_prices[s] = prices[s]
         
         #update all positions
         position = {s: self.current_positions[s] for s in self.symbol_list}
         position['datestamp'] = datestamp
         
-        self.all_positions.append(position)
-        
         #update all_holdings
         
         holding = {s: 0 for s in self.symbol_list}
@@ -115,43 +163,55 @@ class NaivePortfolio(PortfolioAbstractClass):
         
         for s in self.symbol_list:
             #estimate market_value by multiplying current position (quantity) by current adj. close price
-            market_value = self.current_positions[s]*data[s][0][6]
+            market_value = self.current_positions[s]*self.last_prices[s]
             holding[s] = market_value
             holding['total'] += market_value #increase the total account equity by the sum of the market_values for each symbol
         
-        self.all_holdings.append(holding)
+        #the first row holds the initial capital and is never overwritten
+        if new_row or len(self.all_holdings) == 1:
+            self.all_positions.append(position)
+            self.all_holdings.append(holding)
+        else:
+            self.all_positions[-1] = position
+            self.all_holdings[-1] = holding
+        self.update_metrics(holding['total'], new_period = new_row)
+        
+    def update_snapshot(self, event):
+        
+        #Keeps the BarSnapshot carried by a MarketEvent; other events leave the current one in place
+        
+        snapshot = getattr(event, 'snapshot', None)
+        if snapshot is not None:
+            self.snapshot = snapshot
+            
+    def latest_price(self, symbol):
+        
+        #The newest adj. close of a symbol, from the bar snapshot when there is one
+        
+        if self.snapshot is not None:
+            return self.snapshot.price(symbol)
+        
+        return self.data.get_latest_data(symbol)[0][6]
         
     def update_positions_from_fill(self, event):
         
         #Takes a FillEvent from the broker and updates current_positions dictionary by
         #adding/subtracting the correct quantity of shares
         
-        #Check whether the fill was a buy or sell
-        fill_dir = 0
-        
-        if event.direction == 'BUY':
-            fill_dir = 1
-        else:
-            fill_dir = -1
-            
-        self.current_positions[event.symbol] += fill_dir*event.quantity
+        #The direction is +1 for a buy and -1 for a sell
+        self.current_positions[event.symbol] += event.direction*event.quantity
     
     def update_holdings_from_fill(self, event):
         #Takes a FillEvent from the broker and updates current_holdings dictionary by
         #adding/subtracting the correct cost
-        #In reality a broker would give us the event.fill_cost - the price at which the trade was made
-        #We will assume that the fill cost is the current adj. close price
-        
-        #Check whether the fill was a buy or sell
-        fill_dir = 0
-        
-        if event.direction == 'BUY':
-            fill_dir = 1
-        else:
-            fill_dir = -1
-            
-        fill_cost = self.data.get_latest_data(event.symbol)[0][6]
-        cost = fill_dir*fill_cost*event.quantity
+        #event.fill_cost is the price per share at which the trade was made
+        #If the broker does not give one we assume that the fill cost is the current adj. close price
+        
+        #The direction is +1 for a buy and -1 for a sell
+        fill_cost = event.fill_cost
+        if fill_cost is None:
+            fill_cost = self.latest_price(event.symbol)
+        cost = event.direction*fill_cost*event.quantity
         self.current_holdings[event.symbol] += cost   
         self.current_holdings['commission'] += event.commission
         self.current_holdings['cash'] -= (cost + event.commission)
@@ -172,22 +232,28 @@ class NaivePortfolio(PortfolioAbstractClass):
         signal_type = event.signal_type
         
         mkt_quantity = 100
-        current_position = self.current_positions[symbol]
+        current_quantity = self.current_positions[symbol]
         order_type = 'MARKET'
         
-        if signal_type == 'LONG':
-            order = OrderEvent(symbol, order_type, mkt_quantity, 'BUY')
+        if signal_type == SignalType.LONG:
+            order = (symbol, order_type, mkt_quantity, Direction.BUY)
         
-        elif signal_type == 'SHORT':
-            order = OrderEvent(symbol, order_type, mkt_quantity, 'SELL')
+        elif signal_type == SignalType.SHORT:
+            order = (symbol, order_type, mkt_quantity, Direction.SELL)
         
-        elif signal_type == 'EXIT' and current_quantity > 0:
-            order = OrderEvent(symbol, order_type, abs(current_quantity), 'SELL')
+        elif signal_type == SignalType.EXIT and current_quantity > 0:
+            order = (symbol, order_type, abs(current_quantity), Direction.SELL)
             
-        elif signal_type == 'EXIT' and current_quantity < 0:
-            order = OrderEvent(symbol, order_type, abs(current_quantity), 'BUY')
+        elif signal_type == SignalType.EXIT and current_quantity < 0:
+            order = (symbol, order_type, abs(current_quantity), Direction.BUY)
         
-        return(order)
+        else:
+            return None    #an EXIT with no open position
+        
+        if self.order_pool is not None:
+            return(self.order_pool.acquire(*order))
+        
+        return(OrderEvent(*order))
 
     def update_signal(self, event):   
             #Receives a SignalEvent and creates an OrderEvent based on portfolio logic
@@ -195,7 +261,8 @@ class NaivePortfolio(PortfolioAbstractClass):
             
             if isinstance(event, SignalEvent):
                 order = self.generate_naive_order(event)
-                self.event_queue.put(order)
+                if order is not None:
+                    self.event_queue.put(order)
     
     def create_equity_curve(self):
             #creates a dataframe from the all_holdings list of dictionaries
@@ -213,20 +280,194 @@ class NaivePortfolio(PortfolioAbstractClass):
             
     def output_summary_stats(self):
         
-        
         #Returns a list of tuples
         
         self.equity_curve = self.create_equity_curve()
-        total_return = self.equity_curve['equity_curve'][-1]
-        returns = self.equity_curve['returns']
-        equity_curve = self.equity_curve['equity_curve']
         
-        sharpe_ratio = create_sharpe_ratio(returns)
-        max_drawdown, duration = create_drawdowns(self.equity_curve)
+        return create_summary_stats(self.equity_curve)
+    
+    def output_summary_values(self):
+        
+        #Returns the summary stats as a dictionary of numbers rather than formatted strings
+        
+        self.equity_curve = self.create_equity_curve()
+        
+        return create_summary_values(self.equity_curve)
+    
+    def latest_state(self):
+        
+        #(datestamp, positions in symbol_list order, cash, commission, total) of the latest row, for results.py
+        
+        holding = self.all_holdings[-1]
+        return (holding['datestamp'], [self.current_positions[s] for s in self.symbol_list],
+                holding['cash'], holding['commission'], holding['total'])
+    
+    def get_state(self):
+        
+        #Everything a checkpoint needs to carry on from the current bar (see checkpoint.py).
+        #The metrics are plain objects and are stored whole.
+        
+        return {'symbol_list': list(self.symbol_list),
+                'current_positions': dict(self.current_positions),
+                'current_holdings': dict(self.current_holdings),
+                'history': self.get_history_state(),
+                'metrics': self.metrics,
+                'rolling_metrics': self.rolling_metrics}
+    
+    def get_history_state(self):
+        return {'all_positions': self.all_positions, 'all_holdings': self.all_holdings, 'last_prices': dict(self.last_prices)}
+    
+    def set_state(self, state):
+        
+        if list(self.symbol_list) != state['symbol_list']:
+            raise ValueError('the checkpoint is for symbols {}, not {}'.format(state['symbol_list'], list(self.symbol_list)))
+        
+        self.current_positions = dict(state['current_positions'])
+        self.current_holdings = dict(state['current_holdings'])
+        self.set_history_state(state['history'])
+        self.metrics = state['metrics']
+        self.rolling_metrics = state['rolling_metrics']
+        self.snapshot = None    #set again by the next MarketEvent
+        
+    def set_history_state(self, history):
+        self.all_positions = history['all_positions']
+        self.all_holdings = history['all_holdings']
+        self.last_prices = dict(history['last_prices'])
+        
+    def get_book(self):
+        
+        #The positions and cash at the latest bar, with the last valid prices they are valued at,
+        #to carry over into a new portfolio with set_book, e.g. from one walk-forward window to the next
+        
+        return {'symbol_list': list(self.symbol_list),
+                'positions': dict(self.current_positions),
+                'cash': self.current_holdings['cash'],
+                'prices': self.valid_prices()}
+    
+    def valid_prices(self):
+        #the last valid adj. close of every symbol, 0 before its first bar
+        return dict(self.last_prices)
+    
+    def set_book(self, book):
+        
+        #Starts the portfolio from the positions and cash of a book instead of all cash, before its first bar.
+        #The book's value at its prices becomes the initial capital, so returns are measured from it.
+        
+        if list(self.symbol_list) != book['symbol_list']:
+            raise ValueError('the book is for symbols {}, not {}'.format(book['symbol_list'], list(self.symbol_list)))
+        
+        values = {s: book['positions'][s]*book['prices'][s] for s in self.symbol_list}
+        self.initial_capital = book['cash'] + sum(values.values())
+        
+        self.current_positions = dict(book['positions'])
+        self.current_holdings = self.construct_current_holdings()
+        self.current_holdings.update(values)
+        self.current_holdings['cash'] = book['cash']
+        self.current_holdings['total'] = book['cash']
+        
+        self.open_history(book, values)
+        self.construct_metrics(tuple(self.rolling_metrics))
+        
+    def open_history(self, book, values):
+        
+        #Replaces the first row of the history with the book's positions and holdings
+        
+        self.all_positions[0].update(book['positions'])
+        self.all_holdings[0].update(values)
+        self.all_holdings[0]['cash'] = book['cash']
+        self.all_holdings[0]['total'] = self.initial_capital
+        self.last_prices = dict(book['prices'])
+
+class LedgerPortfolio(NaivePortfolio):
+    
+    #A NaivePortfolio whose per-bar history is kept in a PositionLedger of preallocated arrays
+    #instead of the all_positions and all_holdings lists of dictionaries.
+    #Marking to market is a single vectorised dot product per bar and the equity curve
+    #is built directly on the ledger's arrays.
+    
+    def __init__(self, event_queue, data, start_date, initial_capital = 100000, order_pool = None, rolling_windows = (), chunk_size = 4096):
+        
+        #start_date = the start date of the portfolio
+        #order_pool - an optional EventPool of OrderEvents to recycle orders from
+        #rolling_windows - window lengths, in bars, for which RollingMetrics are kept alongside the StreamingMetrics
+        #chunk_size - the initial number of bars the ledger holds; it at least doubles when it is full
+        
+        self.chunk_size = chunk_size
+        super().__init__(event_queue, data, start_date, initial_capital, order_pool, rolling_windows)
+        
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+        self.position_vector = np.zeros(len(self.symbol_list))   #current_positions in symbol_list order
+        
+    def construct_history(self):
+        self.ledger = PositionLedger(self.symbol_list, self.start_date, self.initial_capital, self.chunk_size)
+        
+    def latest_prices(self):
+        
+        #Returns the newest adj. close of every symbol as an array in symbol_list order.
+        #The bar snapshot and array-backed data handlers give a view; others are asked symbol by symbol.
+        
+        if self.snapshot is not None:
+            return self.snapshot.column('adj_close')
+        
+        if hasattr(self.data, 'get_latest_bars'):
+            return self.data.get_latest_bars()[:, ADJ_CLOSE]
+        
+        return np.array([self.data.get_latest_data(s)[0][6] for s in self.symbol_list], dtype = float)
+    
+    def latest_datestamp(self):
+        
+        if self.snapshot is not None:
+            return self.snapshot.timestamp
+        
+        return self.data.get_latest_data(self.symbol_list[0])[0][1]
+        
+    def update_timeindex(self, event):
+        
+        #Writes a ledger row for the current bar: a new one on a MarketEvent,
+        #otherwise the current bar's row is refreshed
+        
+        self.update_snapshot(event)
+        
+        new_row = isinstance(event, MarketEvent)
+        self.ledger.record(self.latest_datestamp(), self.position_vector, self.latest_prices(),
+                           self.current_holdings['cash'], self.current_holdings['commission'],
+                           new_row = new_row)
+        self.update_metrics(self.ledger.latest_total(), new_period = new_row)
+        
+    def update_positions_from_fill(self, event):
+        
+        NaivePortfolio.update_positions_from_fill(self, event)
+        self.position_vector[self.symbol_index[event.symbol]] += event.direction*event.quantity
+        
+    def latest_state(self):
+        
+        ledger = self.ledger
+        i = ledger.length - 1
+        return (ledger.datestamps[i], ledger.positions[i], ledger.holdings[i, ledger.cash_col],
+                ledger.holdings[i, ledger.commission_col], ledger.holdings[i, ledger.total_col])
+    
+    def get_history_state(self):
+        return self.ledger.get_state()
+    
+    def set_history_state(self, history):
+        self.ledger.set_state(history)
+        self.position_vector = np.array([self.current_positions[s] for s in self.symbol_list], dtype = float)
+        
+    def valid_prices(self):
+        return dict(zip(self.symbol_list, self.ledger.last_prices.tolist()))
+    
+    def open_history(self, book, values):
+        
+        self.position_vector = np.array([book['positions'][s] for s in self.symbol_list], dtype = float)
+        self.ledger.open(self.position_vector, np.array([book['prices'][s] for s in self.symbol_list], dtype = float),
+                         book['cash'])
+        
+    def create_equity_curve(self):
+        #creates a dataframe on top of the ledger's holdings array
+
+        curve = self.ledger.holdings_frame()
         
-        stats = [('Total Return', '{}'.format((total_return - 1)*100)), 
-                ('Sharpe Ratio', '{}'.format(sharpe_ratio)),
-                ('Max Drawdown', '{}'.format(max_drawdown)),
-                ('Drawdown Duration', '{}'.format(duration))]
+        curve['returns'] = curve['total'].pct_change()
+        curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
         
-        return stats
+        return curve
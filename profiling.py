@@ -0,0 +1,149 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+import cProfile
+import csv
+import io
+import json
+import pstats
+import time
+from array import array
+
+COMPONENTS = ('data', 'strategy', 'portfolio', 'broker')
+
+class Profiler():
+    
+    #Opt-in instrumentation for Backtest: pass Backtest(..., profiler = Profiler()).
+    #Each subscribed handler (and data.update_data) is wrapped in a timer that records its call durations,
+    #and the queue depth after every call; Backtest.run records the number of events dispatched per bar.
+    #Without a profiler Backtest subscribes the bare handlers, so there is no overhead when disabled.
+    
+    def __init__(self, profile = None):
+        
+        #profile - one of COMPONENTS to run under cProfile as well, e.g. 'strategy'
+        
+        if profile is not None and profile not in COMPONENTS:
+            raise ValueError('profile must be one of {}, not {}'.format(COMPONENTS, profile))
+        
+        self.profile = profile
+        self.profiler = cProfile.Profile() if profile is not None else None
+        
+        self.timings = {}                # handler name: array of call durations in seconds
+        self.bar_events = array('q')    #events dispatched per bar
+        self.queue_depth = array('q')    #events left on the queue after each handler call
+        self.event_queue = ()
+    
+    def attach(self, event_queue):
+        self.event_queue = event_queue
+    
+    def wrap(self, component, handler):
+        
+        #Returns handler wrapped in a timer. Handlers of the same name share one set of timings,
+        #e.g. portfolio.update_timeindex is subscribed to both MarketEvent and FillEvent.
+        
+        name = '{}.{}'.format(component, handler.__name__)
+        record = self.timings.setdefault(name, array('d')).append
+        depth = self.queue_depth.append
+        event_queue = self.event_queue
+        clock = time.perf_counter
+        
+        if component == self.profile:
+            profiler = self.profiler
+            
+            def timed(*args):
+                start = clock()
+                profiler.enable()
+                try:
+                    return handler(*args)
+                finally:
+                    profiler.disable()
+                    record(clock() - start)
+                    depth(len(event_queue))
+        else:
+            def timed(*args):
+                start = clock()
+                try:
+                    return handler(*args)
+                finally:
+                    record(clock() - start)
+                    depth(len(event_queue))
+        
+        timed.__name__ = handler.__name__
+        return timed
+    
+    def end_bar(self, events):
+        self.bar_events.append(events)
+    
+    def handler_stats(self):
+        
+        #One row per handler: calls, cumulative, mean, p50 and p99 latency in seconds
+        
+        rows = []
+        for name, timings in self.timings.items():
+            durations = np.frombuffer(timings, dtype = float) if len(timings) else np.zeros(1)
+            p50, p99 = np.percentile(durations, [50, 99])
+            rows.append({'handler': name,
+                         'calls': len(timings),
+                         'total': float(durations.sum()),
+                         'mean': float(durations.mean()),
+                         'p50': float(p50),
+                         'p99': float(p99)})
+        
+        rows.sort(key = lambda row: row['total'], reverse = True)
+        return rows
+    
+    def histogram(self, values):
+        
+        #{value: count} of a counter array
+        
+        counts = np.bincount(np.frombuffer(values, dtype = np.int64)) if len(values) else np.zeros(0, dtype = int)
+        return {int(value): int(count) for value, count in enumerate(counts) if count}
+    
+    def report(self):
+        
+        depth = np.frombuffer(self.queue_depth, dtype = np.int64)
+        
+        return {'bars': len(self.bar_events),
+                'events': int(sum(self.bar_events)),
+                'handlers': self.handler_stats(),
+                'events_per_bar': self.histogram(self.bar_events),
+                'queue_depth': {'max': int(depth.max()) if len(depth) else 0,
+                                'mean': float(depth.mean()) if len(depth) else 0.0,
+                                'histogram': self.histogram(self.queue_depth)}}
+    
+    def to_json(self, path):
+        
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent = 2)
+    
+    def to_csv(self, path):
+        
+        #the per-handler table only; the histograms are in the JSON report
+        
+        with open(path, 'w', newline = '') as f:
+            writer = csv.DictWriter(f, fieldnames = ['handler', 'calls', 'total', 'mean', 'p50', 'p99'])
+            writer.writeheader()
+            writer.writerows(self.handler_stats())
+    
+    def profile_stats(self, sort = 'cumulative', limit = 20):
+        
+        #The pstats listing of the profiled component as a string
+        
+        if self.profiler is None:
+            raise ValueError('no component was selected for profiling')
+        
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream = stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+    
+    def dump_profile(self, path):
+        
+        #Writes the raw cProfile data for `python -m pstats path` or snakeviz
+        
+        if self.profiler is None:
+            raise ValueError('no component was selected for profiling')
+        
+        self.profiler.dump_stats(path)
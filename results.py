@@ -0,0 +1,252 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+#PYTHON MODULES
+
+import glob
+import json
+import zipfile
+
+#The columns of each table in a results file. positions also has one column per symbol.
+EQUITY_COLUMNS = ('datestamp', 'cash', 'commission', 'total')
+FILL_COLUMNS = ('datestamp', 'symbol', 'quantity', 'direction', 'fill_cost', 'commission')
+
+def to_datetime64(datestamp):
+    #microseconds, so that dates outside the datetime64[ns] range (such as a start_date of year 14) still fit
+    return np.datetime64(pd.Timestamp(datestamp).to_pydatetime(), 'us') if datestamp is not None else np.datetime64('NaT', 'us')
+
+class ResultsWriter():
+    
+    #Streams the results of a run to a compressed .npz file while it runs: pass Backtest(..., results = ResultsWriter(path, symbol_list)).
+    #Each bar's equity (cash, commission, total) and positions and every fill are buffered in arrays of
+    #chunk_size rows and written out as a column chunk whenever a buffer fills, so memory does not grow with the run.
+    #Every column chunk is a .npy member of the zip, named table.column.chunk, and meta.json holds the symbols,
+    #the number of chunks and the numeric summary stats, so np.load and ResultsFile can both read it.
+    #The file is created on the first write, so constructing a writer never overwrites an existing file by itself.
+    
+    def __init__(self, path, symbol_list, chunk_size = 4096, metadata = None):
+        
+        #path - the .npz file to write
+        #chunk_size - rows buffered per table before a chunk is written
+        #metadata - an optional JSON-serialisable dictionary stored with the stats, e.g. strategy parameters
+        
+        self.path = path
+        self.symbol_list = list(symbol_list)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbol_list)}
+        self.chunk_size = chunk_size
+        self.metadata = metadata or {}
+        
+        self.archive = None    #opened by the first write
+        self.closed = False
+        self.chunks = {'equity': 0, 'positions': 0, 'fills': 0}
+        
+        n = chunk_size
+        self.datestamps = np.empty(n, dtype = 'datetime64[us]')
+        self.equity = np.empty((n, 3))      #cash, commission, total
+        self.positions = np.empty((n, len(self.symbol_list)))
+        self.rows = 0
+        self.fills = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def open_archive(self):
+        
+        if self.archive is None:
+            if self.closed:
+                raise ValueError('{} is already closed'.format(self.path))
+            self.archive = zipfile.ZipFile(self.path, 'w', compression = zipfile.ZIP_DEFLATED)
+        return self.archive
+    
+    def write_array(self, name, values):
+        
+        with self.open_archive().open('{}.npy'.format(name), 'w', force_zip64 = True) as f:
+            np.lib.format.write_array(f, np.ascontiguousarray(values), allow_pickle = False)
+    
+    def record_bar(self, datestamp, positions, cash, commission, total):
+        
+        i = self.rows
+        self.datestamps[i] = to_datetime64(datestamp)
+        self.equity[i] = (cash, commission, total)
+        self.positions[i] = positions
+        self.rows += 1
+        
+        if self.rows == self.chunk_size:
+            self.flush_bars()
+    
+    def record_fill(self, event):
+        
+        self.fills.append((to_datetime64(event.datestamp), self.symbol_index[event.symbol], event.quantity,
+                           int(event.direction), np.nan if event.fill_cost is None else event.fill_cost, event.commission))
+        
+        if len(self.fills) == self.chunk_size:
+            self.flush_fills()
+    
+    def flush_bars(self):
+        
+        n = self.rows
+        if n == 0:
+            return
+        
+        chunk = self.chunks['equity']
+        self.write_array('equity.datestamp.{:05d}'.format(chunk), self.datestamps[:n])
+        for j, column in enumerate(EQUITY_COLUMNS[1:]):
+            self.write_array('equity.{}.{:05d}'.format(column, chunk), self.equity[:n, j])
+        self.write_array('positions.values.{:05d}'.format(chunk), self.positions[:n])
+        
+        self.chunks['equity'] += 1
+        self.chunks['positions'] += 1
+        self.rows = 0
+    
+    def flush_fills(self):
+        
+        if not self.fills:
+            return
+        
+        chunk = self.chunks['fills']
+        datestamp, symbol, quantity, direction, fill_cost, commission = zip(*self.fills)
+        self.write_array('fills.datestamp.{:05d}'.format(chunk), np.array(datestamp, dtype = 'datetime64[us]'))
+        self.write_array('fills.symbol.{:05d}'.format(chunk), np.array(symbol, dtype = np.int32))
+        self.write_array('fills.quantity.{:05d}'.format(chunk), np.array(quantity, dtype = float))
+        self.write_array('fills.direction.{:05d}'.format(chunk), np.array(direction, dtype = np.int8))
+        self.write_array('fills.fill_cost.{:05d}'.format(chunk), np.array(fill_cost, dtype = float))
+        self.write_array('fills.commission.{:05d}'.format(chunk), np.array(commission, dtype = float))
+        
+        self.chunks['fills'] += 1
+        self.fills = []
+    
+    def close(self, stats = None):
+        
+        #Writes any buffered rows and the metadata; stats - the numeric summary stats of the run
+        
+        if self.closed:
+            return
+        
+        self.flush_bars()
+        self.flush_fills()
+        
+        meta = {'symbols': self.symbol_list, 'chunks': self.chunks, 'stats': stats or {}, 'metadata': self.metadata}
+        self.open_archive().writestr('meta.json', json.dumps(meta))
+        self.archive.close()
+        self.archive = None
+        self.closed = True
+
+class ResultsFile():
+    
+    #Lazy access to one results file: meta.json is read on first use and a table's chunks only when it is asked for
+    
+    def __init__(self, path):
+        
+        self.path = path
+        self.meta_data = None
+    
+    def meta(self):
+        
+        if self.meta_data is None:
+            with zipfile.ZipFile(self.path) as archive:
+                self.meta_data = json.loads(archive.read('meta.json'))
+        return self.meta_data
+    
+    def stats(self):
+        return self.meta()['stats']
+    
+    def read_column(self, archive, table, column):
+        
+        chunks = []
+        for chunk in range(self.meta()['chunks'][table]):
+            with archive.open('{}.{}.{:05d}.npy'.format(table, column, chunk)) as f:
+                chunks.append(np.lib.format.read_array(f, allow_pickle = False))
+        
+        return np.concatenate(chunks) if chunks else np.empty(0)
+    
+    def equity(self):
+        
+        #A DataFrame of cash, commission and total per bar, indexed by datestamp
+        
+        with zipfile.ZipFile(self.path) as archive:
+            data = {column: self.read_column(archive, 'equity', column) for column in EQUITY_COLUMNS}
+        return pd.DataFrame(data).set_index('datestamp')
+    
+    def positions(self):
+        
+        #A DataFrame of the position in every symbol per bar, indexed by datestamp
+        
+        with zipfile.ZipFile(self.path) as archive:
+            dates = self.read_column(archive, 'equity', 'datestamp')
+            values = self.read_column(archive, 'positions', 'values')
+        
+        symbols = self.meta()['symbols']
+        return pd.DataFrame(values.reshape(len(dates), len(symbols)), columns = symbols,
+                            index = pd.Index(dates, name = 'datestamp'))
+    
+    def fills(self):
+        
+        #The fill blotter, one row per FillEvent
+        
+        with zipfile.ZipFile(self.path) as archive:
+            data = {column: self.read_column(archive, 'fills', column) for column in FILL_COLUMNS}
+        
+        symbols = np.array(self.meta()['symbols'], dtype = object)
+        data['symbol'] = symbols[data['symbol'].astype(int)] if len(data['symbol']) else data['symbol']
+        return pd.DataFrame(data)
+
+class ResultsSet():
+    
+    #Many results files, e.g. one per parameter set of a sweep, matched by glob patterns.
+    #stats() reads only the small meta.json of each file; the tables are read one file at a time on demand.
+    
+    def __init__(self, *patterns):
+        
+        paths = []
+        for pattern in patterns:
+            paths.extend(sorted(glob.glob(pattern)))
+        self.files = [ResultsFile(path) for path in paths]
+    
+    def __len__(self):
+        return len(self.files)
+    
+    def __iter__(self):
+        return iter(self.files)
+    
+    def stats(self):
+        
+        #One row of numeric stats and metadata per file, indexed by path
+        
+        rows = []
+        for results in self.files:
+            meta = results.meta()
+            row = dict(meta['metadata'])
+            row.update(meta['stats'])
+            rows.append(row)
+        
+        return pd.DataFrame(rows, index = pd.Index([results.path for results in self.files], name = 'path'))
+    
+    def query(self, expr):
+        
+        #The files whose stats match a DataFrame.query expression, e.g. 'sharpe_ratio > 1 and max_drawdown < 0.2'
+        
+        paths = set(self.stats().query(expr).index)
+        subset = ResultsSet()
+        subset.files = [results for results in self.files if results.path in paths]
+        return subset
+    
+    def tables(self, table):
+        
+        #Yields (path, DataFrame) for 'equity', 'positions' or 'fills', reading one file at a time
+        
+        for results in self.files:
+            yield results.path, getattr(results, table)()
+    
+    def concat(self, table):
+        
+        #One DataFrame of a table across all of the files, keyed by path
+        
+        frames = dict(self.tables(table))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, names = ['path'])
@@ -11,7 +11,8 @@ from datetime import datetime
 
 #MY MODULES
 
-from Event_Driven_Backtester.events import (MarketEvent, SignalEvent)
+from Event_Driven_Backtester.events import (MarketEvent, SignalEvent, SignalType)
+from Event_Driven_Backtester.data import FIELD_INDEX
 
 class StrategyAbstractClass(metaclass = ABCMeta):
     #Abstract class providing an interface for all inherited strategy objects
@@ -19,6 +20,13 @@ class StrategyAbstractClass(metaclass = ABCMeta):
     @abstractmethod
     def calculate_signals(self):
         pass
+    
+    #Checkpoints (see checkpoint.py) store what get_state returns; strategies that keep state override both
+    def get_state(self):
+        return {}
+    
+    def set_state(self, state):
+        pass
 
 class BuyAndHoldStrategy(StrategyAbstractClass):
     
@@ -35,12 +43,42 @@ class BuyAndHoldStrategy(StrategyAbstractClass):
         #Generate a single LONG signal per symbol when the first marketevent occurs
         
         if isinstance(event, MarketEvent):
+            if event.snapshot is not None:
+                self.calculate_snapshot_signals(event.snapshot)
+                return
+            
             for s in self.symbol_list:
                 data = self.data.get_latest_data(s)
-                if data is not None and len(data)>0:
+                if data is not None and len(data)>0 and data[0][6] == data[0][6]:   #the adj. close is NaN before the symbol's first bar
                     if self.bought[s] == False:
                         signal = SignalEvent(s, data[0][1],   #datetime
-                                       'LONG')
+                                       SignalType.LONG)
                     
                         self.event_queue.put(signal)
                         self.bought[s] = True
+
+    def get_state(self):
+        return {'bought': dict(self.bought)}
+    
+    def set_state(self, state):
+        self.bought = dict(state['bought'])
+        
+    def calculate_snapshot_signals(self, snapshot):
+        #As calculate_signals, reading the bar snapshot carried by the MarketEvent
+        #A symbol has data once its adj. close is no longer NaN
+        
+        prices = snapshot.column('adj_close')
+        for i, s in enumerate(snapshot.symbols):
+            if self.bought[s] == False and prices[i] == prices[i]:
+                self.event_queue.put(SignalEvent(s, snapshot.timestamp, SignalType.LONG))
+                self.bought[s] = True
+                
+    def target_positions(self):
+        
+        #The target position matrix (bars x symbols) for VectorizedBacktest:
+        #100 shares of every symbol from its first bar (the first non-NaN adj. close) onwards, as NaivePortfolio would order
+        
+        prices = self.data.bars[:, :, FIELD_INDEX['adj_close']]
+        started = np.logical_or.accumulate(prices == prices, axis = 0)
+        
+        return np.where(started, 100.0, 0.0)
@@ -0,0 +1,156 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+#PYTHON MODULES
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import (HistoricArrayDataHandler, load_symbol_arrays)
+from Event_Driven_Backtester.cache import SymbolDataCache
+from Event_Driven_Backtester.event_bus import EventBus
+
+def parameter_grid(grid):
+    
+    #Expands a dictionary of name: list of values into a list of dictionaries, one per combination
+    #e.g. {'window': [10, 20], 'size': [100]} -> [{'window': 10, 'size': 100}, {'window': 20, 'size': 100}]
+    
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def stats_to_dict(stats):
+    
+    #Converts output_summary_stats' list of (name, string) tuples into name: float
+    
+    return {name: float(value) for name, value in stats}
+
+class SharedMarketData():
+    
+    #Holds the aligned (dates, bars) arrays of a data handler in shared memory blocks so that
+    #worker processes can map them read-only instead of receiving a pickled copy per task.
+    #The creating process owns the blocks and must call close() (or use it as a context manager) to free them.
+    
+    def __init__(self, symbol_list, dates, bars):
+        
+        self.symbol_list = list(symbol_list)
+        self.blocks = []
+        self.spec = {'symbol_list': self.symbol_list}
+        
+        #dates are stored as int64 nanoseconds; datetime64 does not round trip through a raw buffer by name
+        for name, array in (('dates', np.asarray(dates).astype('datetime64[ns]').view(np.int64)), ('bars', np.asarray(bars))):
+            block = SharedMemory(create = True, size = max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype = array.dtype, buffer = block.buf)[...] = array
+            self.blocks.append(block)
+            self.spec[name] = (block.name, array.shape, array.dtype.str)
+            
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+            
+    @staticmethod
+    def attach(spec):
+        
+        #Maps the blocks described by spec in another process.
+        #Returns (symbol_list, dates, bars, blocks); the blocks must stay referenced while the arrays are used.
+        
+        arrays = {}
+        blocks = []
+        for name in ('dates', 'bars'):
+            block_name, shape, dtype = spec[name]
+            #workers share the creator's resource tracker, so attaching does not schedule a second unlink
+            block = SharedMemory(name = block_name)
+            array = np.ndarray(shape, dtype = dtype, buffer = block.buf)
+            array.flags.writeable = False
+            arrays[name] = array
+            blocks.append(block)
+        
+        return spec['symbol_list'], arrays['dates'].view('datetime64[ns]'), arrays['bars'], blocks
+            
+    def close(self):
+        
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+#The shared market data mapped by each worker process, set once by init_worker
+worker_state = {}
+
+def init_worker(spec, build):
+    
+    symbol_list, dates, bars, blocks = SharedMarketData.attach(spec)
+    worker_state.update(symbol_list = symbol_list, dates = dates, bars = bars, blocks = blocks, build = build)
+
+def run_parameters(params):
+    
+    #Runs a single backtest in a worker over the shared data and returns the params merged with the numeric stats
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, worker_state['symbol_list'],
+                                    arrays = (worker_state['dates'], worker_state['bars']))
+    strategy, portfolio, broker = worker_state['build'](event_queue, data, params)
+    
+    stats = Backtest(event_queue, data, strategy, portfolio, broker).run()
+    
+    result = dict(params)
+    result.update(stats_to_dict(stats))
+    return result
+
+class ParameterSweep():
+    
+    #Runs one backtest per parameter set over the same symbols, fanned out over a pool of processes.
+    #The market data is loaded and aligned once, placed in shared memory and mapped by every worker,
+    #so each task only pickles its parameters and its stats.
+    
+    def __init__(self, csv_dir, symbol_list, build, max_workers = None, cache_dir = None):
+        
+        #build - a module-level function build(event_queue, data, params) -> (strategy, portfolio, execution handler),
+        #        called in the worker for every parameter set; it must be picklable
+        #max_workers - number of worker processes, defaults to the number of CPUs; 1 runs in this process
+        #cache_dir - optional SymbolDataCache directory used to load the data
+        
+        self.csv_dir = csv_dir
+        self.symbol_list = symbol_list
+        self.build = build
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache_dir = cache_dir
+        
+    def load(self):
+        
+        if self.cache_dir is None:
+            return load_symbol_arrays(self.csv_dir, self.symbol_list)
+        
+        return SymbolDataCache(self.cache_dir).load(self.csv_dir, self.symbol_list, load_symbol_arrays)
+        
+    def run(self, param_sets):
+        
+        #param_sets - a list of dictionaries, e.g. from parameter_grid
+        #Returns a DataFrame with one row per parameter set: the parameters followed by the stats
+        
+        param_sets = list(param_sets)
+        dates, bars = self.load()
+        
+        with SharedMarketData(self.symbol_list, dates, bars) as shared:
+            if self.max_workers == 1:
+                init_worker(shared.spec, self.build)
+                try:
+                    results = [run_parameters(p) for p in param_sets]
+                finally:
+                    worker_state.clear()
+            else:
+                #several parameter sets per task keep the per-task overhead small relative to a backtest
+                chunksize = max(1, len(param_sets)//(self.max_workers*4))
+                with ProcessPoolExecutor(max_workers = self.max_workers, initializer = init_worker,
+                                         initargs = (shared.spec, self.build)) as pool:
+                    results = list(pool.map(run_parameters, param_sets, chunksize = chunksize))
+                    
+        return pd.DataFrame(results)
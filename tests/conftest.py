@@ -0,0 +1,57 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#PYTHON MODULES
+
+import os
+import sys
+import types
+
+#The modules import each other as Event_Driven_Backtester.<module>. Register the repository under that
+#name so the tests run from any checkout directory, without installing anything.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'Event_Driven_Backtester' not in sys.modules:
+    package = types.ModuleType('Event_Driven_Backtester')
+    package.__path__ = [ROOT]
+    sys.modules['Event_Driven_Backtester'] = package
+
+from Event_Driven_Backtester.data import FIELDS
+
+@pytest.fixture
+def unaligned_arrays():
+    
+    #(dates, bars) for HistoricArrayDataHandler(..., arrays = ...): 10 bars of 3 symbols, where A trades
+    #every bar, B every other bar and C only from bar 6. Every field of a bar holds the same price;
+    #the bars a symbol misses are NaN.
+    
+    dates = np.arange('2020-01-01', '2020-01-11', dtype = 'datetime64[D]').astype('datetime64[ns]')
+    prices = np.full((10, 3), np.nan)
+    prices[:, 0] = 10.0 + np.arange(10)
+    prices[::2, 1] = 20.0 + np.arange(0, 10, 2)
+    prices[6:, 2] = 30.0 + np.arange(4)
+    
+    bars = np.repeat(prices[:, :, None], len(FIELDS), axis = 2)
+    return dates, bars
+
+def write_csv(csv_dir, symbol, days, prices):
+    
+    #one bar per day of January 2020; every price field is the same
+    
+    frame = pd.DataFrame({f: prices for f in FIELDS}, index = pd.Index(['2020-01-{:02d}'.format(d) for d in days], name = 'date'))
+    frame['volume'] = 1000
+    frame.to_csv(os.path.join(csv_dir, '{}.csv'.format(symbol)))
+
+@pytest.fixture
+def csv_dir(tmp_path):
+    
+    #A trades every day from the 1st to the 6th, C misses the 3rd and 5th and D starts on the 3rd
+    
+    write_csv(tmp_path, 'A', range(1, 7), [11.0, 12.0, 13.0, 14.0, 15.0, 16.0])
+    write_csv(tmp_path, 'C', [1, 2, 4, 6], [16.0, 17.0, 19.0, 21.0])
+    write_csv(tmp_path, 'D', [3, 4, 5, 6], [30.0, 31.0, 32.0, 33.0])
+    return str(tmp_path)
@@ -0,0 +1,128 @@
+#PYTHON PACKAGES
+
+import pandas as pd
+import pytest
+
+#PYTHON MODULES
+
+import datetime
+import logging
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import (Backtest, MultiBacktest)
+from Event_Driven_Backtester.data import (HistoricArrayDataHandler, HistoricCSVDataHandler, StreamingCSVDataHandler)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.events import (Event, FillEvent)
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import (LedgerPortfolio, NaivePortfolio)
+from Event_Driven_Backtester.results import (ResultsFile, ResultsWriter)
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+@pytest.mark.parametrize('handler_class', [HistoricCSVDataHandler, HistoricArrayDataHandler, StreamingCSVDataHandler])
+def test_only_bars_with_a_market_event_are_counted(csv_dir, tmp_path, handler_class):
+    
+    #the files have 6 distinct dates; the CSV handler needs a final update_data call to find that out
+    
+    event_queue = EventBus()
+    data = handler_class(event_queue, csv_dir, ['A', 'C'])
+    portfolio = LedgerPortfolio(event_queue, data, datetime.date(2019, 12, 31))
+    path = str(tmp_path/'results.npz')
+    backtest = Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio,
+                        SimulatedExecutionHandler(event_queue), results = ResultsWriter(path, ['A', 'C']))
+    backtest.run()
+    
+    assert backtest.bars == 6
+    assert len(portfolio.ledger) == 7
+    assert len(ResultsFile(path).equity()) == 6
+
+def test_multi_backtest_counts_bars_once(csv_dir):
+    
+    feed = EventBus()
+    data = HistoricCSVDataHandler(feed, csv_dir, ['A', 'C'])
+    pipelines = []
+    for _ in range(2):
+        bus = EventBus()
+        pipelines.append((BuyAndHoldStrategy(data, bus), LedgerPortfolio(bus, data, datetime.date(2019, 12, 31)),
+                          SimulatedExecutionHandler(bus)))
+    
+    multi = MultiBacktest(feed, data, pipelines)
+    multi.run()
+    
+    assert multi.bars == 6
+    assert [backtest.bars for backtest in multi.backtests] == [6, 6]
+
+def pipeline(bus, data, portfolio_class, capital):
+    
+    portfolio = portfolio_class(bus, data, datetime.date(2019, 12, 31), initial_capital = capital)
+    return BuyAndHoldStrategy(data, bus), portfolio, SimulatedExecutionHandler(bus)
+
+LAYOUTS = [(NaivePortfolio, 100000), (LedgerPortfolio, 10000)]
+
+@pytest.mark.parametrize('handler_class', [HistoricArrayDataHandler, StreamingCSVDataHandler])
+def test_multi_backtest_pipelines_match_separate_backtests(csv_dir, handler_class):
+    
+    feed = EventBus()
+    data = handler_class(feed, csv_dir, ['A', 'C', 'D'])
+    pipelines = [pipeline(EventBus(), data, *layout) for layout in LAYOUTS]
+    multi = MultiBacktest(feed, data, pipelines)
+    stats = multi.run()
+    
+    for i, layout in enumerate(LAYOUTS):
+        event_queue = EventBus()
+        single_data = handler_class(event_queue, csv_dir, ['A', 'C', 'D'])
+        single = Backtest(event_queue, single_data, *pipeline(event_queue, single_data, *layout))
+        
+        assert stats[i] == single.run()
+        assert multi.backtests[i].events == single.events
+        pd.testing.assert_frame_equal(multi.backtests[i].portfolio.equity_curve, single.portfolio.equity_curve)
+    
+    #every MarketEvent is counted once per pipeline and never on the feed
+    assert multi.events == sum(backtest.events for backtest in multi.backtests)
+
+def test_multi_backtest_pipelines_keep_their_own_queues(csv_dir):
+    
+    feed = EventBus()
+    data = HistoricArrayDataHandler(feed, csv_dir, ['A', 'C', 'D'])
+    pipelines = [pipeline(EventBus(), data, *layout) for layout in LAYOUTS]
+    multi = MultiBacktest(feed, data, pipelines)
+    
+    seen = [[], []]
+    for i, (strategy, portfolio, broker) in enumerate(pipelines):
+        portfolio.event_queue.subscribe(FillEvent, seen[i].append)
+    multi.run()
+    
+    #each pipeline fills its own three buys only, and nothing is left on any queue
+    assert [sorted(fill.symbol for fill in fills) for fills in seen] == [['A', 'C', 'D'], ['A', 'C', 'D']]
+    assert [p.current_positions for _, p, _ in pipelines] == [{'A': 100, 'C': 100, 'D': 100}]*2
+    assert feed.empty() and all(backtest.event_queue.empty() for backtest in multi.backtests)
+
+def test_multi_backtest_rejects_shared_queues(csv_dir):
+    
+    feed = EventBus()
+    data = HistoricArrayDataHandler(feed, csv_dir, ['A', 'C'])
+    bus = EventBus()
+    
+    with pytest.raises(ValueError):
+        MultiBacktest(feed, data, [pipeline(bus, data, NaivePortfolio, 100000), pipeline(bus, data, NaivePortfolio, 100000)])
+    with pytest.raises(ValueError):
+        MultiBacktest(feed, data, [pipeline(feed, data, NaivePortfolio, 100000)])
+
+def test_the_log_level_is_read_when_a_run_starts(csv_dir, caplog):
+    
+    name = 'Event_Driven_Backtester.backtest'
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, csv_dir, ['A', 'C'])
+    
+    #DEBUG is enabled after the backtest is built but before it runs
+    caplog.set_level(logging.WARNING, logger = name)
+    backtest = Backtest(event_queue, data, *pipeline(event_queue, data, NaivePortfolio, 100000))
+    caplog.set_level(logging.DEBUG, logger = name)
+    backtest.run()
+    
+    assert [record.getMessage() for record in caplog.records].count('MarketEvent') == 6
+    
+    #disabling it again removes the per-event logger at the start of the next run
+    caplog.set_level(logging.INFO, logger = name)
+    backtest.update_event_log()
+    assert backtest.event_queue.subscribers[Event] == []
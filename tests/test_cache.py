@@ -0,0 +1,80 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+#PYTHON MODULES
+
+import json
+import os
+from os.path import join
+
+#MY MODULES
+
+from Event_Driven_Backtester.cache import SymbolDataCache
+from Event_Driven_Backtester.data import load_symbol_arrays
+
+class CountingBuild():
+    
+    #load_symbol_arrays, counting the cache misses
+    
+    def __init__(self):
+        self.calls = 0
+        
+    def __call__(self, csv_dir, symbol_list):
+        self.calls += 1
+        return load_symbol_arrays(csv_dir, symbol_list)
+
+def test_a_second_load_is_a_memory_mapped_hit(csv_dir, tmp_path):
+    
+    cache = SymbolDataCache(str(tmp_path/'cache'))
+    build = CountingBuild()
+    
+    first = cache.load(csv_dir, ['A', 'C', 'D'], build)
+    dates, bars = cache.load(csv_dir, ['A', 'C', 'D'], build)
+    
+    assert build.calls == 1
+    assert isinstance(bars, np.memmap)
+    expected_dates, expected_bars = load_symbol_arrays(csv_dir, ['A', 'C', 'D'])
+    np.testing.assert_array_equal(dates, expected_dates)
+    np.testing.assert_array_equal(bars, expected_bars)
+    np.testing.assert_array_equal(first[1], expected_bars)
+    
+    #another symbol list is another entry
+    cache.load(csv_dir, ['A', 'C'], build)
+    assert build.calls == 2
+
+def test_a_changed_source_rebuilds_the_entry(csv_dir, tmp_path):
+    
+    cache = SymbolDataCache(str(tmp_path/'cache'))
+    build = CountingBuild()
+    _, old_bars = cache.load(csv_dir, ['A', 'C'], build)
+    
+    path = join(csv_dir, 'A.csv')
+    frame = pd.read_csv(path, index_col = 'date')
+    frame.iloc[-1, :] = 99.0
+    frame.to_csv(path)
+    _, bars = cache.load(csv_dir, ['A', 'C'], build)
+    
+    assert build.calls == 2
+    assert bars[-1, 0, 0] == 99.0
+    #the entry was replaced rather than rewritten, so the old mapping still reads the old data
+    assert old_bars[-1, 0, 0] == 16.0
+    #and no temporary or stale directories are left behind
+    assert os.listdir(cache.cache_dir) == [os.path.basename(cache.entry_dir(csv_dir, ['A', 'C']))]
+
+def test_touching_a_source_keeps_the_entry(csv_dir, tmp_path):
+    
+    cache = SymbolDataCache(str(tmp_path/'cache'))
+    build = CountingBuild()
+    cache.load(csv_dir, ['A', 'C'], build)
+    
+    path = join(csv_dir, 'A.csv')
+    stat = os.stat(path)
+    os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.load(csv_dir, ['A', 'C'], build)
+    
+    assert build.calls == 1
+    #the new mtime is recorded, so the next load does not hash the file again
+    with open(join(cache.entry_dir(csv_dir, ['A', 'C']), 'manifest.json')) as f:
+        assert json.load(f)['sources']['A']['mtime_ns'] == stat.st_mtime_ns + 10**9
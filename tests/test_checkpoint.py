@@ -0,0 +1,60 @@
+#PYTHON PACKAGES
+
+import pandas as pd
+import pytest
+
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.checkpoint import Checkpointer
+from Event_Driven_Backtester.data import (HistoricArrayDataHandler, HistoricCSVDataHandler, StreamingCSVDataHandler)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import (OrderBookExecutionHandler, SimulatedExecutionHandler)
+from Event_Driven_Backtester.portfolio import (LedgerPortfolio, NaivePortfolio)
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+def make_backtest(csv_dir, handler_class, portfolio_class, broker_class, checkpoint = None):
+    
+    event_queue = EventBus()
+    data = handler_class(event_queue, csv_dir, ['A', 'C', 'D'])
+    portfolio = portfolio_class(event_queue, data, datetime.date(2019, 12, 31), rolling_windows = (3,))
+    if broker_class is OrderBookExecutionHandler:
+        #D is first bought on the 3rd, so its order is still resting at the checkpoint after the 4th
+        broker = OrderBookExecutionHandler(event_queue, data, latency = 2, participation = None)
+    else:
+        broker = SimulatedExecutionHandler(event_queue)
+    
+    return Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio, broker, checkpoint = checkpoint)
+
+@pytest.mark.parametrize('handler_class', [HistoricCSVDataHandler, HistoricArrayDataHandler, StreamingCSVDataHandler])
+@pytest.mark.parametrize('portfolio_class', [NaivePortfolio, LedgerPortfolio])
+@pytest.mark.parametrize('broker_class', [SimulatedExecutionHandler, OrderBookExecutionHandler])
+def test_resume_matches_an_uninterrupted_run(csv_dir, tmp_path, handler_class, portfolio_class, broker_class):
+    
+    uninterrupted = make_backtest(csv_dir, handler_class, portfolio_class, broker_class)
+    expected = uninterrupted.run()
+    
+    #the first run leaves its last checkpoint after bar 4 of 6; the second resumes from it in fresh components
+    path = str(tmp_path/'backtest.ckpt')
+    make_backtest(csv_dir, handler_class, portfolio_class, broker_class, Checkpointer(path, every = 4)).run()
+    resumed = make_backtest(csv_dir, handler_class, portfolio_class, broker_class, Checkpointer(path, every = 4))
+    stats = resumed.run(resume = True)
+    
+    assert stats == expected
+    assert resumed.bars == uninterrupted.bars == 6
+    pd.testing.assert_frame_equal(resumed.portfolio.equity_curve, uninterrupted.portfolio.equity_curve)
+    assert resumed.portfolio.current_positions == uninterrupted.portfolio.current_positions == {'A': 100, 'C': 100, 'D': 100}
+    assert resumed.portfolio.metrics.summary() == uninterrupted.portfolio.metrics.summary()
+    assert resumed.portfolio.rolling_metrics[3].summary() == uninterrupted.portfolio.rolling_metrics[3].summary()
+
+def test_resume_without_a_checkpoint_starts_from_the_first_bar(csv_dir, tmp_path):
+    
+    backtest = make_backtest(csv_dir, HistoricArrayDataHandler, LedgerPortfolio, SimulatedExecutionHandler,
+                             Checkpointer(str(tmp_path/'missing.ckpt'), every = 100))
+    backtest.run(resume = True)
+    
+    assert backtest.bars == 6
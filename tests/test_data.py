@@ -0,0 +1,116 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pytest
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import (BarWindow, HistoricArrayDataHandler, HistoricCSVDataHandler, StreamingCSVDataHandler,
+                                          TimestampMerge)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.events import MarketEvent
+from Event_Driven_Backtester.indicators import IndicatorService
+
+def test_timestamp_merge_groups_equal_timestamps_in_stream_order():
+    
+    merge = TimestampMerge([iter([(1, 'a1'), (3, 'a3')]), iter([]), iter([(1, 'c1'), (2, 'c2'), (3, 'c3')])])
+    
+    groups = []
+    while merge:
+        groups.append(merge.next_group())
+    
+    assert groups == [(1, [(0, 'a1'), (2, 'c1')]), (2, [(2, 'c2')]), (3, [(0, 'a3'), (2, 'c3')])]
+
+def test_timestamp_merge_rejects_descending_streams():
+    
+    merge = TimestampMerge([iter([(2, 'a2'), (1, 'a1')])])
+    
+    with pytest.raises(ValueError):
+        merge.next_group()
+
+def run(data):
+    
+    snapshots = []
+    while data.continue_backtest:
+        data.update_data()
+        snapshots.append(data.event_queue.queue.pop().snapshot)
+    return snapshots
+
+def test_streaming_without_ffill_keeps_the_last_bar(csv_dir):
+    
+    data = StreamingCSVDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'])
+    snapshots = run(data)
+    
+    assert len(snapshots) == 6
+    assert [row[1].day for row in data.get_latest_data('C', 10)] == [1, 2, 4, 6]
+    assert snapshots[2].price('C') == 17.0    #the 3rd: C has no bar and keeps the 2nd's
+    assert np.isnan(snapshots[1].price('D'))  #before D's first bar
+
+def test_streaming_with_ffill_matches_the_aligned_arrays(csv_dir):
+    
+    data = StreamingCSVDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'], ffill = True)
+    snapshots = run(data)
+    aligned = HistoricArrayDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'])
+    
+    assert [row[1].day for row in data.get_latest_data('C', 10)] == [1, 2, 3, 4, 5, 6]
+    assert [row[1].day for row in data.get_latest_data('D', 10)] == [3, 4, 5, 6]
+    assert list(aligned.dates) == [np.datetime64(s.timestamp) for s in snapshots]
+    np.testing.assert_array_equal(np.array([s.values for s in snapshots]), aligned.bars)
+
+@pytest.mark.parametrize('ffill, expected', [(False, (17.0 + 19.0 + 21.0)/3), (True, (19.0 + 19.0 + 21.0)/3)])
+def test_indicators_only_see_the_bars_a_symbol_has(csv_dir, ffill, expected):
+    
+    #without ffill the missing days are not bars of C, with it they are copies of the previous bar
+    
+    data = StreamingCSVDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'], ffill = ffill)
+    sma = IndicatorService.for_data(data).register('sma', 'C', 3)
+    run(data)
+    
+    assert sma.value == pytest.approx(expected)
+
+def test_array_handler_releases_one_bar_per_update(csv_dir):
+    
+    data = HistoricArrayDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'])
+    
+    for bar in range(1, 7):
+        assert data.continue_backtest
+        data.update_data()
+        
+        assert data.bar_index == bar
+        assert len(data.event_queue) == 1 and isinstance(data.event_queue.queue.pop(), MarketEvent)
+        assert len(data.get_latest_data('A', 100)) == bar
+        assert data.get_latest_data('A')[0][1].day == bar
+    
+    assert not data.continue_backtest
+    data.update_data()
+    assert data.event_queue.empty() and data.bar_index == 6
+
+def same_row(a, b):
+    
+    #equal tuples, where NaN (before a symbol's first bar) equals NaN
+    
+    return len(a) == len(b) and all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+def test_array_handler_returns_the_rows_of_the_csv_handler(csv_dir):
+    
+    symbols = ['A', 'C', 'D']
+    arrays = HistoricArrayDataHandler(EventBus(), csv_dir, symbols)
+    rows = HistoricCSVDataHandler(EventBus(), csv_dir, symbols)
+    
+    for _ in range(6):
+        arrays.update_data()
+        rows.update_data()
+        
+        for s in symbols:
+            for N in (1, 3, 10):
+                window = arrays.get_latest_data(s, N)
+                expected = rows.get_latest_data(s, N)
+                
+                assert isinstance(window, BarWindow)
+                assert len(window) == len(expected)
+                assert all(same_row(a, b) for a, b in zip(window, expected))
+                assert same_row(window[-1], expected[-1])
+    
+    #a column is a view of the handler's array, not a copy
+    assert np.shares_memory(arrays.get_latest_data('C', 3).column('adj_close'), arrays.bars)
+    assert arrays.get_latest_data('Z') is None
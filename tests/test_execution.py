@@ -0,0 +1,49 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import (FIELDS, FIELD_INDEX, HistoricArrayDataHandler)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.events import (Direction, FillEvent, MarketEvent, OrderEvent)
+from Event_Driven_Backtester.execution import (OrderBookExecutionHandler, PendingOrders)
+
+def test_pending_orders_grow_and_compact():
+    
+    book = PendingOrders(capacity = 2)
+    for seq in range(5):
+        book.append(seq = seq, symbol = seq % 2, direction = 1, remaining = 10.0*seq, eligible_bar = 1)
+    
+    assert len(book) == 5
+    book.compact(book['remaining'] > 15.0)
+    
+    assert list(book['seq']) == [2, 3, 4]
+    assert list(book['remaining']) == [20.0, 30.0, 40.0]
+    assert list(book['symbol']) == [0, 1, 0]
+
+def test_participation_is_shared_in_arrival_order_after_the_latency():
+    
+    #one symbol at 10 with a volume of 100 per bar: participation 0.1 fills at most 10 shares a bar
+    
+    dates = np.arange('2020-01-01', '2020-01-06', dtype = 'datetime64[D]').astype('datetime64[ns]')
+    bars = np.full((5, 1, len(FIELDS)), 10.0)
+    bars[:, :, FIELD_INDEX['volume']] = 100.0
+    
+    fills = []
+    event_queue = EventBus()
+    event_queue.subscribe(FillEvent, lambda event: fills.append((event.datestamp.day, event.quantity)))
+    data = HistoricArrayDataHandler(EventBus(), None, ['A'], arrays = (dates, bars))
+    broker = OrderBookExecutionHandler(event_queue, data, latency = 2, participation = 0.1)
+    
+    broker.execute_order(OrderEvent('A', 'MARKET', 15, Direction.BUY))
+    broker.execute_order(OrderEvent('A', 'MARKET', 10, Direction.BUY))
+    
+    while data.continue_backtest:
+        data.update_data()
+        broker.on_market(MarketEvent(data.latest_snapshot()))
+        event_queue.dispatch()
+    
+    #nothing on the first bar, then the first order takes the volume before the second
+    assert fills == [(2, 10), (3, 5), (3, 5), (4, 5)]
+    assert len(broker.book) == 0 and broker.market_ids == {}
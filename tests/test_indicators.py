@@ -0,0 +1,98 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import (HistoricArrayDataHandler, HistoricCSVDataHandler)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.indicators import (KINDS, Indicator, IndicatorService)
+
+WINDOW = 5
+
+def prices():
+    return pd.Series(100.0 + np.random.default_rng(0).normal(0.0, 1.0, 60).cumsum())
+
+def expected(kind, series):
+    
+    #the pandas rolling result each indicator must reproduce, NaN until the window is full
+    
+    rolling = series.rolling(WINDOW)
+    if kind == 'ema':
+        #seeded with the SMA of the first window values, then alpha = 2/(window + 1)
+        seeded = pd.concat([rolling.mean().iloc[WINDOW - 1:WINDOW], series.iloc[WINDOW:]])
+        return seeded.ewm(span = WINDOW, adjust = False).mean().reindex(series.index)
+    return {'sma': rolling.mean(), 'std': rolling.std(), 'max': rolling.max(), 'min': rolling.min()}[kind]
+
+@pytest.mark.parametrize('kind', sorted(KINDS))
+def test_indicators_match_pandas_rolling(kind):
+    
+    series = prices()
+    indicator = KINDS[kind](WINDOW)
+    
+    values = []
+    for x in series:
+        indicator.update(x)
+        values.append(indicator.value)
+    
+    np.testing.assert_allclose(values, expected(kind, series).values, rtol = 1e-9)
+
+def test_indicator_is_abstract():
+    
+    with pytest.raises(TypeError):
+        Indicator(WINDOW)
+
+def test_identical_registrations_share_one_indicator(csv_dir):
+    
+    service = IndicatorService.for_data(HistoricArrayDataHandler(EventBus(), csv_dir, ['A', 'C', 'D']))
+    
+    assert service.register('sma', 'A', 3) is service.register('sma', 'A', 3)
+    assert service.register('sma', 'A', 3) is not service.register('sma', 'A', 3, 'open')
+    assert IndicatorService.for_data(service.data) is service
+
+def test_every_field_of_the_arrays_can_be_followed(csv_dir):
+    
+    data = HistoricArrayDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'])
+    data.update_data()
+    data.update_data()
+    
+    #close is warmed up from the bars already released and then updated with the next one
+    service = IndicatorService.for_data(data)
+    sma = service.register('sma', 'A', 3, 'close')
+    data.update_data()
+    
+    assert sma.value == pytest.approx(12.0)
+    with pytest.raises(ValueError):
+        service.register('sma', 'A', 3, 'vwap')
+
+def test_rows_without_close_are_rejected(csv_dir):
+    
+    service = IndicatorService.for_data(HistoricCSVDataHandler(EventBus(), csv_dir, ['A', 'C', 'D']))
+    
+    with pytest.raises(ValueError):
+        service.register('sma', 'A', 3, 'close')
+
+def test_saved_state_does_not_follow_the_indicators(csv_dir):
+    
+    data = HistoricArrayDataHandler(EventBus(), csv_dir, ['A', 'C', 'D'])
+    service = IndicatorService.for_data(data)
+    sma = service.register('sma', 'A', 3)
+    high = service.register('max', 'A', 3)
+    for _ in range(3):
+        data.update_data()
+    
+    state = service.get_state()
+    for _ in range(3):
+        data.update_data()
+    assert sma.value == pytest.approx(15.0)
+    
+    service.set_state(state)
+    assert (sma.value, list(sma.buffer)) == (pytest.approx(12.0), [11.0, 12.0, 13.0])
+    assert (high.value, list(high.candidates)) == (13.0, [(2, 13.0)])
+    
+    #restoring copies the state again, so it can be restored twice
+    data.update_data()
+    service.set_state(state)
+    assert list(sma.buffer) == [11.0, 12.0, 13.0]
@@ -0,0 +1,21 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#MY MODULES
+
+from Event_Driven_Backtester.ledger import PositionLedger
+
+def test_ledger_grows_geometrically_and_keeps_its_rows():
+    
+    ledger = PositionLedger(['A', 'B'], 0, 1000.0, chunk_size = 4)
+    capacities = set()
+    
+    for i in range(1, 100):
+        ledger.record(i, np.array([i, 0.0]), np.array([1.0, 2.0]), 1000.0 - i, 0.0)
+        capacities.add(len(ledger.datestamps))
+    
+    assert sorted(capacities) == [4, 8, 16, 32, 64, 128]
+    assert len(ledger) == 100
+    assert list(ledger.datestamps[:len(ledger)]) == list(range(100))
+    assert (ledger.holdings[1:len(ledger), ledger.total_col] == 1000.0).all()
@@ -0,0 +1,166 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+import asyncio
+import datetime
+import gc
+import logging
+
+#MY MODULES
+
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.events import (BarSnapshot, FillEvent, MarketEvent)
+from Event_Driven_Backtester.data import (FIELDS, FIELD_INDEX)
+from Event_Driven_Backtester.live import (AsyncDataAbstractClass, AsyncExecutionAbstractClass, LiveRuntime, MockBrokerServer,
+                                          MockFeedServer, SocketDataHandler, SocketExecutionHandler)
+from Event_Driven_Backtester.portfolio import NaivePortfolio
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+async def run_live(dates, bars, symbol_list, delay, order_timeout, late_fill_timeout = 60.0):
+    
+    feed = MockFeedServer(dates, bars, symbol_list)
+    exchange = MockBrokerServer(delay = delay)
+    await feed.start()
+    await exchange.start()
+    
+    event_queue = EventBus()
+    data = SocketDataHandler(feed.host, feed.port, symbol_list)
+    portfolio = NaivePortfolio(event_queue, data, datetime.date(2019, 12, 31))
+    runtime = LiveRuntime(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio,
+                          SocketExecutionHandler(exchange.host, exchange.port), order_timeout = order_timeout,
+                          late_fill_timeout = late_fill_timeout)
+    try:
+        await runtime.run_async()
+    finally:
+        await feed.close()
+        await exchange.close()
+    
+    return runtime, portfolio
+
+def test_late_fills_are_applied(unaligned_arrays):
+    
+    #every fill arrives well after its order has timed out
+    
+    dates, bars = unaligned_arrays
+    runtime, portfolio = asyncio.run(run_live(dates[:3], bars[:3, :2], ['A', 'B'], delay = 0.2, order_timeout = 0.05))
+    
+    assert runtime.timeouts['order'] == 2
+    assert runtime.late_fills == 2
+    assert runtime.abandoned == 0
+    assert portfolio.current_positions == {'A': 100, 'B': 100}
+
+def test_orders_without_a_fill_are_abandoned_at_the_end(unaligned_arrays):
+    
+    dates, bars = unaligned_arrays
+    runtime, portfolio = asyncio.run(run_live(dates[:3], bars[:3, :2], ['A', 'B'], delay = 10.0, order_timeout = 0.05,
+                                              late_fill_timeout = 0.1))
+    
+    assert runtime.timeouts['order'] == 2
+    assert runtime.late_fills == 0
+    assert runtime.abandoned == 2
+    assert portfolio.current_positions == {'A': 0, 'B': 0}
+
+class ListFeed(AsyncDataAbstractClass):
+    
+    #A minimal custom feed: it only implements the abstract methods and sets no send times
+    
+    def __init__(self, dates, bars, symbol_list):
+        
+        self.dates = dates
+        self.bars = bars
+        self.symbol_list = symbol_list
+        self.symbol_index = {s: i for i, s in enumerate(symbol_list)}
+        self.bar_index = 0
+        self.continue_backtest = True
+    
+    def get_latest_data(self, symbol, N=1):
+        return []
+    
+    async def next_bar(self):
+        
+        if self.bar_index == len(self.dates):
+            self.continue_backtest = False
+            return None
+        
+        i = self.bar_index
+        self.bar_index += 1
+        return MarketEvent(BarSnapshot(self.dates[i], self.symbol_list, FIELDS, self.bars[i], self.symbol_index, FIELD_INDEX))
+
+def test_custom_feed_without_send_times(unaligned_arrays):
+    
+    async def run():
+        
+        exchange = MockBrokerServer()
+        await exchange.start()
+        
+        event_queue = EventBus()
+        data = ListFeed(*unaligned_arrays, ['A', 'B', 'C'])
+        portfolio = NaivePortfolio(event_queue, data, datetime.date(2019, 12, 31))
+        runtime = LiveRuntime(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio,
+                              SocketExecutionHandler(exchange.host, exchange.port))
+        try:
+            await runtime.run_async()
+        finally:
+            await exchange.close()
+        
+        return runtime, portfolio
+    
+    runtime, portfolio = asyncio.run(run())
+    
+    assert runtime.bars == 10
+    assert len(runtime.feed_latency) == 0
+    assert portfolio.current_positions == {'A': 100, 'B': 100, 'C': 100}
+
+class FailingBroker(AsyncExecutionAbstractClass):
+    
+    #A broker that rejects every order for B with an error other than a lost connection
+    
+    async def execute_order(self, event):
+        
+        if event.symbol == 'B':
+            raise ValueError('rejected')
+        return FillEvent(event.symbol, datetime.datetime.now(), 'MOCK', event.quantity, event.direction, None)
+
+def test_broker_errors_are_counted_and_logged(unaligned_arrays, caplog):
+    
+    async def run():
+        
+        event_queue = EventBus()
+        data = ListFeed(*unaligned_arrays, ['A', 'B'])
+        portfolio = NaivePortfolio(event_queue, data, datetime.date(2019, 12, 31))
+        runtime = LiveRuntime(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio, FailingBroker())
+        await runtime.run_async()
+        return runtime, portfolio
+    
+    #an exception left on a task is reported by the loop's exception handler when the task is collected
+    unretrieved = []
+    
+    def run_collecting():
+        
+        loop = asyncio.new_event_loop()
+        loop.set_exception_handler(lambda loop, context: unretrieved.append(context))
+        try:
+            result = loop.run_until_complete(run())
+            gc.collect()
+            return result
+        finally:
+            loop.close()
+    
+    with caplog.at_level(logging.ERROR, logger = 'Event_Driven_Backtester.live'):
+        runtime, portfolio = run_collecting()
+    
+    assert runtime.errors == 1
+    assert portfolio.current_positions == {'A': 100, 'B': 0}
+    assert [record.exc_info[0] for record in caplog.records] == [ValueError]
+    assert unretrieved == []
+
+def test_unknown_symbols_are_logged(caplog):
+    
+    data = SocketDataHandler('localhost', 0, ['A'])
+    
+    with caplog.at_level(logging.WARNING, logger = 'Event_Driven_Backtester.live'):
+        assert data.get_latest_data('Z') is None
+    assert 'Z is not a valid symbol' in caplog.text
@@ -0,0 +1,70 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#MY MODULES
+
+from Event_Driven_Backtester.metrics import (RollingMetrics, StreamingMetrics)
+from Event_Driven_Backtester.performance import create_drawdowns
+
+def equity_curve(totals):
+    
+    #laid out like the portfolios' equity curves: the first row has no return
+    
+    total = pd.Series(totals, dtype = float)
+    return pd.DataFrame({'equity_curve': (1.0 + total.pct_change()).cumprod()})
+
+def test_create_drawdowns_is_peak_to_trough():
+    
+    #two declines from a peak: 1.2 to 0.8 over two periods and 1.3 to 1.15 over one
+    max_drawdown, duration = create_drawdowns(equity_curve([100.0, 120.0, 80.0, 110.0, 130.0, 115.0]))
+    
+    assert max_drawdown == pytest.approx(0.4)
+    assert duration == 2
+
+def test_create_drawdowns_of_a_rising_curve_is_zero():
+    
+    #the old max - min formula reported the whole rise as a drawdown
+    assert create_drawdowns(equity_curve([100.0, 105.0, 110.0, 120.0])) == (0.0, 0)
+
+def test_streaming_drawdowns_match_create_drawdowns():
+    
+    totals = [100.0, 120.0, 80.0, 110.0, 130.0, 115.0, 90.0, 140.0]
+    metrics = StreamingMetrics()
+    for total in totals:
+        metrics.update(total)
+    
+    max_drawdown, duration = create_drawdowns(equity_curve(totals))
+    assert metrics.max_drawdown == pytest.approx(max_drawdown)
+    assert metrics.max_duration == duration
+    assert metrics.total_return() == pytest.approx(0.4)
+
+def test_replacing_the_first_value_resets_first():
+    
+    replaced = RollingMetrics(3)
+    replaced.update(100.0)
+    replaced.update(50.0, new_period = False)
+    replaced.update(60.0)
+    
+    direct = RollingMetrics(3)
+    direct.update(50.0)
+    direct.update(60.0)
+    
+    assert replaced.first == 50.0
+    assert replaced.summary() == direct.summary()
+
+def test_replacing_the_latest_value_matches_a_direct_update():
+    
+    replaced = RollingMetrics(2)
+    direct = RollingMetrics(2)
+    for value in (100.0, 90.0, 120.0, 110.0):
+        replaced.update(value)
+        direct.update(value)
+    replaced.update(80.0)
+    replaced.update(95.0, new_period = False)
+    direct.update(95.0)
+    
+    assert replaced.summary() == pytest.approx(direct.summary())
+    assert np.isclose(replaced.drawdown(), (120.0 - 95.0)/100.0)
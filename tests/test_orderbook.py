@@ -0,0 +1,93 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pytest
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import HistoricArrayDataHandler
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.events import (Direction, OrderEvent)
+from Event_Driven_Backtester.execution import OrderBookExecutionHandler
+from Event_Driven_Backtester.orderbook import ConditionalOrderBook
+
+BUY, SELL = Direction.BUY, Direction.SELL
+
+def fills(book, bar, open_price, high, low):
+    return [(order.order_id, price) for order, price in book.trigger(0, bar, open_price, high, low)]
+
+@pytest.mark.parametrize('direction, order_type, price, bar, expected', [
+    (BUY, 'LIMIT', 100.0, (101.0, 102.0, 99.0), 100.0),    #the low reaches the limit
+    (BUY, 'LIMIT', 100.0, (98.0, 99.0, 97.0), 98.0),       #gaps below the limit: fills at the open
+    (SELL, 'LIMIT', 100.0, (99.0, 101.0, 98.0), 100.0),
+    (SELL, 'LIMIT', 100.0, (102.0, 103.0, 101.0), 102.0),
+    (BUY, 'STOP', 105.0, (103.0, 106.0, 102.0), 105.0),    #the high reaches the stop
+    (BUY, 'STOP', 105.0, (107.0, 108.0, 106.0), 107.0),    #gaps above the stop: fills at the open
+    (SELL, 'STOP', 95.0, (96.0, 97.0, 94.0), 95.0),
+    (SELL, 'STOP', 95.0, (93.0, 94.0, 90.0), 93.0),
+])
+def test_trigger_prices_and_gaps(direction, order_type, price, bar, expected):
+    
+    book = ConditionalOrderBook()
+    if order_type == 'LIMIT':
+        book.add('a', 0, order_type, direction, 10, limit_price = price)
+    else:
+        book.add('a', 0, order_type, direction, 10, stop_price = price)
+    
+    assert fills(book, 0, *bar) == [('a', expected)]
+    assert len(book) == 0
+
+def test_untouched_orders_keep_resting():
+    
+    book = ConditionalOrderBook()
+    book.add('buy', 0, 'LIMIT', BUY, 10, limit_price = 100.0)
+    book.add('sell', 0, 'STOP', SELL, 10, stop_price = 90.0)
+    
+    assert fills(book, 0, 101.0, 102.0, 100.5) == []
+    assert fills(book, 0, np.nan, np.nan, np.nan) == []     #no data for the symbol
+    assert len(book) == 2 and book.active_symbols() == {0}
+
+def test_stop_limit_becomes_a_limit_on_the_next_bar():
+    
+    book = ConditionalOrderBook()
+    book.add('a', 0, 'STOPLIMIT', BUY, 10, limit_price = 106.0, stop_price = 105.0)
+    
+    #the stop triggers, but the converted limit only rests from the next bar
+    assert fills(book, 0, 104.0, 107.0, 103.0) == []
+    assert book.orders['a'].order_type == 'LIMIT'
+    
+    assert fills(book, 1, 108.0, 109.0, 107.0) == []     #above the limit
+    assert fills(book, 2, 107.0, 107.5, 105.5) == [('a', 106.0)]
+
+def test_orders_are_not_triggered_before_their_eligible_bar():
+    
+    book = ConditionalOrderBook()
+    book.add('a', 0, 'LIMIT', BUY, 10, limit_price = 100.0, eligible_bar = 2)
+    
+    assert fills(book, 1, 99.0, 99.0, 99.0) == []
+    assert fills(book, 2, 99.0, 99.0, 99.0) == [('a', 99.0)]
+
+def test_fills_keep_arrival_order_and_replace_loses_priority():
+    
+    book = ConditionalOrderBook()
+    book.add('a', 0, 'LIMIT', BUY, 10, limit_price = 99.0)
+    book.add('b', 0, 'LIMIT', BUY, 10, limit_price = 100.0)
+    book.add('c', 0, 'STOP', BUY, 10, stop_price = 101.0)
+    book.replace('a', quantity = 20)
+    assert book.cancel('missing') is None
+    
+    assert fills(book, 0, 100.0, 102.0, 98.0) == [('b', 100.0), ('c', 101.0), ('a', 99.0)]
+
+def test_auto_order_ids_do_not_collide_with_chosen_ids(unaligned_arrays):
+    
+    data = HistoricArrayDataHandler(EventBus(), None, ['A', 'B', 'C'], arrays = unaligned_arrays)
+    broker = OrderBookExecutionHandler(EventBus(), data)
+    
+    chosen = OrderEvent('A', 'MARKET', 10, BUY, order_id = 1)
+    auto = OrderEvent('A', 'MARKET', 10, BUY)
+    conditional = OrderEvent('B', 'LIMIT', 10, SELL, limit_price = 30.0)
+    for order in (chosen, auto, conditional):
+        broker.execute_order(order)
+    
+    assert auto.order_id == ('auto', 1) and conditional.order_id == ('auto', 2)
+    assert broker.cancel_order(1) and broker.cancel_order(('auto', 1)) and broker.cancel_order(('auto', 2))
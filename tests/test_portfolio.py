@@ -0,0 +1,58 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pytest
+
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import (HistoricArrayDataHandler, HistoricCSVDataHandler)
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import (LedgerPortfolio, NaivePortfolio)
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+@pytest.mark.parametrize('portfolio_class', [NaivePortfolio, LedgerPortfolio])
+def test_unaligned_symbols_are_valued_at_their_last_valid_price(portfolio_class, unaligned_arrays):
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, ['A', 'B', 'C'], arrays = unaligned_arrays)
+    strategy = BuyAndHoldStrategy(data, event_queue)
+    portfolio = portfolio_class(event_queue, data, datetime.date(2019, 12, 31))
+    broker = SimulatedExecutionHandler(event_queue)
+    
+    Backtest(event_queue, data, strategy, portfolio, broker).run()
+    
+    #100 shares each: A bought at 10 and last at 19, B at 20 and last valid at 28, C at 30 and last at 33
+    expected = 100000 + 100*(19 - 10) + 100*(28 - 20) + 100*(33 - 30)
+    
+    curve = portfolio.equity_curve
+    assert not curve['total'].isna().any()
+    assert curve['total'].iloc[-1] == pytest.approx(expected)
+    assert portfolio.output_summary_values()['total_return'] == pytest.approx(2.0)
+    assert portfolio.metrics.total_return() == pytest.approx(0.02)
+
+@pytest.mark.parametrize('handler_class', [HistoricCSVDataHandler, HistoricArrayDataHandler])
+def test_both_portfolios_keep_one_row_per_bar(csv_dir, handler_class):
+    
+    #the fills of the 1st and 3rd refresh those bars' rows, so both histories hold the initial row and 6 bars
+    
+    portfolios = []
+    for portfolio_class in (NaivePortfolio, LedgerPortfolio):
+        event_queue = EventBus()
+        data = handler_class(event_queue, csv_dir, ['A', 'C', 'D'])
+        portfolio = portfolio_class(event_queue, data, datetime.date(2019, 12, 31), rolling_windows = (3,))
+        Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio, SimulatedExecutionHandler(event_queue)).run()
+        portfolios.append(portfolio)
+    naive, ledger = portfolios
+    
+    assert len(naive.equity_curve) == len(ledger.equity_curve) == 7
+    columns = ['A', 'C', 'D', 'cash', 'commission', 'total']
+    np.testing.assert_allclose(naive.equity_curve[columns].values.astype(float), ledger.equity_curve[columns].values)
+    assert naive.metrics.summary() == ledger.metrics.summary()
+    assert naive.metrics.count == 6    #one return per bar
+    assert naive.rolling_metrics[3].summary() == ledger.rolling_metrics[3].summary()
@@ -0,0 +1,31 @@
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import HistoricArrayDataHandler
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import LedgerPortfolio
+from Event_Driven_Backtester.profiling import Profiler
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+def test_report_counts_events_per_bar(unaligned_arrays):
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, ['A', 'B', 'C'], arrays = unaligned_arrays)
+    profiler = Profiler()
+    backtest = Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue),
+                        LedgerPortfolio(event_queue, data, datetime.date(2019, 12, 31)),
+                        SimulatedExecutionHandler(event_queue), profiler = profiler)
+    backtest.run()
+    
+    report = profiler.report()
+    
+    #a bar is one MarketEvent, plus a signal, an order and a fill per symbol bought on it: A and B on bar 0, C on bar 6
+    assert report['bars'] == 10
+    assert report['events'] == backtest.events == 10 + 3*3
+    assert report['events_per_bar'] == {1: 8, 4: 1, 7: 1}
+    assert report['queue_depth']['max'] >= 1
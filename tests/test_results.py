@@ -0,0 +1,103 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.checkpoint import Checkpointer
+from Event_Driven_Backtester.data import HistoricArrayDataHandler
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import (LedgerPortfolio, NaivePortfolio)
+from Event_Driven_Backtester.results import (ResultsFile, ResultsSet, ResultsWriter)
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+def run(csv_dir, path, capital = 100000, portfolio_class = LedgerPortfolio, chunk_size = 4, checkpoint = None, resume = False):
+    
+    #a chunk_size below the 6 bars splits the equity and positions into two chunks
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, csv_dir, ['A', 'C', 'D'])
+    portfolio = portfolio_class(event_queue, data, datetime.date(2019, 12, 31), initial_capital = capital)
+    results = ResultsWriter(path, ['A', 'C', 'D'], chunk_size = chunk_size, metadata = {'capital': capital})
+    backtest = Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio,
+                        SimulatedExecutionHandler(event_queue), checkpoint = checkpoint, results = results)
+    backtest.run(resume = resume)
+    return portfolio
+
+@pytest.mark.parametrize('portfolio_class', [NaivePortfolio, LedgerPortfolio])
+def test_results_round_trip(csv_dir, tmp_path, portfolio_class):
+    
+    path = str(tmp_path/'run.npz')
+    portfolio = run(csv_dir, path, portfolio_class = portfolio_class)
+    results = ResultsFile(path)
+    
+    #the portfolio's curve starts with the initial capital row, which is not a bar
+    curve = portfolio.equity_curve.iloc[1:]
+    equity = results.equity()
+    assert list(equity.index) == list(pd.DatetimeIndex(curve.index))
+    np.testing.assert_array_equal(equity[['cash', 'commission', 'total']].values, curve[['cash', 'commission', 'total']].values)
+    
+    positions = results.positions()
+    assert list(positions.columns) == ['A', 'C', 'D']
+    assert positions.iloc[-1].tolist() == [100.0, 100.0, 100.0]
+    assert positions['D'].tolist() == [0.0, 0.0, 100.0, 100.0, 100.0, 100.0]
+    
+    fills = results.fills()
+    assert fills['symbol'].tolist() == ['A', 'C', 'D']
+    assert fills['fill_cost'].isna().all()    #SimulatedExecutionHandler leaves the price to the portfolio
+    assert (fills['direction'] == 1).all() and (fills['quantity'] == 100).all()
+    
+    assert results.stats() == portfolio.output_summary_values()
+    assert results.meta()['metadata'] == {'capital': 100000}
+
+def test_results_set_queries_the_stats(csv_dir, tmp_path):
+    
+    for capital in (10000, 100000):
+        run(csv_dir, str(tmp_path/'run_{}.npz'.format(capital)), capital = capital)
+    
+    runs = ResultsSet(str(tmp_path/'*.npz'))
+    stats = runs.stats()
+    
+    assert len(runs) == 2
+    assert stats['capital'].tolist() == [10000, 100000]
+    
+    #the same trades are a larger return on the smaller capital
+    best = runs.query('total_return > 5')
+    assert [results.path for results in best] == [str(tmp_path/'run_10000.npz')]
+    
+    equity = runs.concat('equity')
+    assert equity.index.names == ['path', 'datestamp']
+    assert len(equity) == 12
+    assert len(runs.query('total_return > 100')) == 0
+
+def test_a_writer_does_not_touch_the_file_until_it_writes(tmp_path):
+    
+    path = tmp_path/'run.npz'
+    path.write_bytes(b'previous run')
+    
+    ResultsWriter(str(path), ['A'])
+    assert path.read_bytes() == b'previous run'
+    
+    with ResultsWriter(str(path), ['A']) as results:
+        results.record_bar(datetime.date(2020, 1, 1), [0.0], 100.0, 0.0, 100.0)
+    assert len(ResultsFile(str(path)).equity()) == 1
+
+def test_resume_with_results_is_rejected(csv_dir, tmp_path):
+    
+    path = str(tmp_path/'run.npz')
+    checkpoint = str(tmp_path/'backtest.ckpt')
+    run(csv_dir, path, checkpoint = Checkpointer(checkpoint, every = 4))
+    
+    with pytest.raises(ValueError):
+        run(csv_dir, path, checkpoint = Checkpointer(checkpoint, every = 4), resume = True)
+    
+    #the completed results are still there
+    assert len(ResultsFile(path).equity()) == 6
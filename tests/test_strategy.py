@@ -0,0 +1,26 @@
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import HistoricCSVDataHandler
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import NaivePortfolio
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+
+def test_buy_and_hold_waits_for_a_price_without_snapshots(csv_dir):
+    
+    #HistoricCSVDataHandler has no bar snapshots and gives D rows of NaN before its first bar on the 3rd
+    
+    event_queue = EventBus()
+    data = HistoricCSVDataHandler(event_queue, csv_dir, ['A', 'D'])
+    portfolio = NaivePortfolio(event_queue, data, datetime.date(2019, 12, 31))
+    Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio, SimulatedExecutionHandler(event_queue)).run()
+    
+    curve = portfolio.equity_curve
+    assert not curve['total'].isna().any()
+    #A bought at 11 and last at 16, D at 30 and last at 33
+    assert curve['total'].iloc[-1] == 100000 + 100*(16 - 11) + 100*(33 - 30)
@@ -0,0 +1,68 @@
+#PYTHON PACKAGES
+
+import pandas as pd
+import pytest
+
+#PYTHON MODULES
+
+import datetime
+from multiprocessing.shared_memory import SharedMemory
+
+#MY MODULES
+
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import LedgerPortfolio
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+from Event_Driven_Backtester import sweep
+from Event_Driven_Backtester.sweep import (ParameterSweep, SharedMarketData, parameter_grid, worker_state)
+
+def build(event_queue, data, params):
+    
+    if params['capital'] < 0:
+        raise ValueError('negative capital')
+    
+    portfolio = LedgerPortfolio(event_queue, data, datetime.date(2019, 12, 31), initial_capital = params['capital'])
+    return BuyAndHoldStrategy(data, event_queue), portfolio, SimulatedExecutionHandler(event_queue)
+
+def test_serial_sweep(csv_dir):
+    
+    report = ParameterSweep(csv_dir, ['A', 'C'], build, max_workers = 1).run(parameter_grid({'capital': [10000, 100000]}))
+    
+    #A and C are bought at 11 and 16 on the 1st and end at 16 and 21
+    assert list(report['capital']) == [10000, 100000]
+    assert list(report['Total Return']) == pytest.approx([10.0, 1.0])
+    assert worker_state == {}
+
+def test_serial_sweep_clears_the_worker_state_on_error(csv_dir):
+    
+    with pytest.raises(ValueError):
+        ParameterSweep(csv_dir, ['A', 'C'], build, max_workers = 1).run([{'capital': 100000}, {'capital': -1}])
+    
+    assert worker_state == {}
+
+class RecordedMarketData(SharedMarketData):
+    
+    #SharedMarketData that keeps the names of the blocks it created
+    
+    names = []
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        RecordedMarketData.names.extend(block.name for block in self.blocks)
+
+def test_parallel_sweep_matches_the_serial_sweep(csv_dir, monkeypatch):
+    
+    monkeypatch.setattr(sweep, 'SharedMarketData', RecordedMarketData)
+    RecordedMarketData.names = []
+    param_sets = parameter_grid({'capital': [10000, 50000, 100000, 200000]})
+    
+    serial = ParameterSweep(csv_dir, ['A', 'C', 'D'], build, max_workers = 1).run(param_sets)
+    parallel = ParameterSweep(csv_dir, ['A', 'C', 'D'], build, max_workers = 2).run(param_sets)
+    
+    pd.testing.assert_frame_equal(parallel, serial)
+    
+    #both runs created their dates and bars blocks and unlinked them afterwards
+    assert len(RecordedMarketData.names) == 4
+    for name in RecordedMarketData.names:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name = name)
@@ -0,0 +1,43 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import HistoricArrayDataHandler
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import LedgerPortfolio
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+from Event_Driven_Backtester.vectorized import VectorizedBacktest
+
+def test_buy_and_hold_targets_start_at_each_symbols_first_bar(unaligned_arrays):
+    
+    data = HistoricArrayDataHandler(EventBus(), None, ['A', 'B', 'C'], arrays = unaligned_arrays)
+    targets = BuyAndHoldStrategy(data, EventBus()).target_positions()
+    
+    assert (targets[:, :2] == 100.0).all()
+    assert (targets[:6, 2] == 0.0).all() and (targets[6:, 2] == 100.0).all()
+
+def test_cross_check_on_unaligned_data(unaligned_arrays):
+    
+    symbol_list = ['A', 'B', 'C']
+    start_date = datetime.date(2019, 12, 31)
+    
+    vectorized_data = HistoricArrayDataHandler(EventBus(), None, symbol_list, arrays = unaligned_arrays)
+    vectorized = VectorizedBacktest.from_strategy(vectorized_data, BuyAndHoldStrategy(vectorized_data, EventBus()), start_date)
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, symbol_list, arrays = unaligned_arrays)
+    portfolio = LedgerPortfolio(event_queue, data, start_date)
+    backtest = Backtest(event_queue, data, BuyAndHoldStrategy(data, event_queue), portfolio, SimulatedExecutionHandler(event_queue))
+    
+    vectorized.cross_check(backtest)
+    
+    assert not np.isnan(vectorized.ledger.holdings[:vectorized.ledger.length]).any()
+    assert np.array_equal(vectorized.ledger.holdings[:len(vectorized.ledger)], portfolio.ledger.holdings[:len(portfolio.ledger)])
@@ -0,0 +1,83 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+import pytest
+
+#PYTHON MODULES
+
+import datetime
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import HistoricArrayDataHandler
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.execution import SimulatedExecutionHandler
+from Event_Driven_Backtester.portfolio import (LedgerPortfolio, NaivePortfolio)
+from Event_Driven_Backtester.strategy import BuyAndHoldStrategy
+from Event_Driven_Backtester.sweep import worker_state
+from Event_Driven_Backtester.walkforward import (WalkForward, summarise, walk_forward_windows)
+
+def test_windows_tile_the_data_by_default():
+    
+    assert walk_forward_windows(10, 4, 3) == [(0, 4, 7), (3, 7, 10)]
+    assert walk_forward_windows(10, 4, 3, anchored = True) == [(0, 4, 7), (0, 7, 10)]
+    assert walk_forward_windows(10, 4, 3, step = 2) == [(0, 4, 7), (2, 6, 9), (4, 8, 10)]
+
+def test_a_zero_step_is_rejected():
+    
+    with pytest.raises(ValueError):
+        walk_forward_windows(10, 4, 3, step = 0)
+
+def report(windows, total_returns):
+    
+    return pd.DataFrame({'total_return': total_returns, 'sharpe_ratio': 1.0, 'max_drawdown': 0.0, 'drawdown_duration': 0,
+                         'test_start_bar': [w[1] for w in windows], 'test_end_bar': [w[2] for w in windows]})
+
+def test_summarise_compounds_only_tiled_test_parts():
+    
+    tiled = summarise(report(walk_forward_windows(10, 4, 3), [10.0, -10.0]))
+    overlapping = summarise(report(walk_forward_windows(10, 4, 3, step = 2), [10.0, -10.0, 5.0]))
+    gapped = summarise(report(walk_forward_windows(15, 4, 3, step = 5), [10.0, -10.0, 5.0]))
+    
+    assert tiled.loc['total_return', 'compounded'] == pytest.approx(-1.0)
+    assert np.isnan(overlapping.loc['total_return', 'compounded'])
+    assert np.isnan(gapped.loc['total_return', 'compounded'])
+
+def build(event_queue, data, window):
+    
+    portfolio = NaivePortfolio(event_queue, data, datetime.date(2019, 12, 31))
+    return BuyAndHoldStrategy(data, event_queue), portfolio, SimulatedExecutionHandler(event_queue)
+
+def build_ledger(event_queue, data, window):
+    
+    portfolio = LedgerPortfolio(event_queue, data, datetime.date(2019, 12, 31))
+    return BuyAndHoldStrategy(data, event_queue), portfolio, SimulatedExecutionHandler(event_queue)
+
+def test_parallel_windows_match_serial_windows(csv_dir):
+    
+    serial = WalkForward(csv_dir, ['A', 'C', 'D'], build, train = 1, test = 3, max_workers = 1).run()
+    parallel = WalkForward(csv_dir, ['A', 'C', 'D'], build, train = 1, test = 3, max_workers = 2).run()
+    
+    #windows over bars 1-3 and 4-5, each buying afresh on its first bar
+    assert list(serial['test_start_bar']) == [1, 4]
+    assert (serial['total_return'] != 0.0).all()
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert worker_state == {}
+
+@pytest.mark.parametrize('build', [build, build_ledger])
+def test_warm_start_chains_like_one_continuous_run(csv_dir, build):
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, csv_dir, ['A', 'C', 'D'])
+    strategy, portfolio, broker = build(event_queue, data, None)
+    Backtest(event_queue, data, strategy, portfolio, broker).run()
+    continuous = portfolio.equity_curve['equity_curve'].iloc[-1]
+    
+    #the strategy remembers having bought A and C in the first window and D in the second; the later windows
+    #keep those positions and carry on from the cash the previous window ended with
+    report = WalkForward(csv_dir, ['A', 'C', 'D'], build, train = 0, test = 2, warm_start = True).run()
+    
+    assert (report['total_return'] != 0.0).all()
+    assert summarise(report).loc['total_return', 'compounded'] == pytest.approx((continuous - 1.0)*100)
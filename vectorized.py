@@ -0,0 +1,121 @@
+#PYTHON PACKAGES
+
+import numpy as np
+
+#MY MODULES
+
+from Event_Driven_Backtester.data import FIELD_INDEX
+from Event_Driven_Backtester.ledger import PositionLedger
+from Event_Driven_Backtester.performance import create_summary_stats
+
+def valuation_prices(prices):
+    
+    #The prices PositionLedger.record values positions at: a NaN (before a symbol's first bar or on a bar
+    #it misses) is replaced by the symbol's last valid price, or by 0 before its first bar
+    
+    index = np.where(prices == prices, np.arange(len(prices))[:, None], 0)
+    filled = prices[np.maximum.accumulate(index, axis = 0), np.arange(prices.shape[1])]
+    
+    return np.where(filled == filled, filled, 0.0)
+
+class VectorizedBacktest():
+    
+    #Computes positions, holdings, commissions and the equity curve in one vectorised pass
+    #for strategies that can be expressed as a matrix of target positions, without going through the event loop.
+    #Orders are assumed to fill at the adj. close of the bar on which the target changes,
+    #as with SimulatedExecutionHandler and NaivePortfolio.
+    #The result is laid out like LedgerPortfolio's equity curve so the two can be compared directly.
+    
+    def __init__(self, data, target_positions, start_date, initial_capital = 100000, commission_per_share = 0.0):
+        
+        #data - an array-backed data handler such as HistoricArrayDataHandler; its cursor is not used
+        #target_positions - array of shape (bars, symbols): the position to hold at the end of each bar
+        #start_date = the start date of the portfolio
+        #commission_per_share - commission charged on the absolute quantity traded
+        
+        target_positions = np.asarray(target_positions, dtype = float)
+        if target_positions.shape != data.bars.shape[:2]:
+            raise ValueError('target_positions has shape {}, the data has {} bars and {} symbols'.format(
+                target_positions.shape, *data.bars.shape[:2]))
+        
+        self.data = data
+        self.symbol_list = data.symbol_list
+        self.target_positions = target_positions
+        self.start_date = start_date
+        self.initial_capital = initial_capital
+        self.commission_per_share = commission_per_share
+        
+        self.ledger = None
+        
+    @classmethod
+    def from_strategy(cls, data, strategy, start_date, **kwargs):
+        #Uses strategy.target_positions() as the target position matrix
+        
+        return cls(data, strategy.target_positions(), start_date, **kwargs)
+        
+    def run(self):
+        
+        #Fills a PositionLedger with one row per bar and returns it.
+        #The order of floating point operations mirrors LedgerPortfolio (cash is reduced fill by fill in
+        #symbol order, totals use the same dot product) so that both give bit-identical results.
+        
+        positions = self.target_positions
+        prices = valuation_prices(self.data.bars[:, :, FIELD_INDEX['adj_close']])
+        n_bars, n_symbols = positions.shape
+        
+        trades = np.diff(positions, axis = 0, prepend = 0.0)
+        traded = trades != 0
+        
+        cost = np.where(traded, trades*prices, 0.0)
+        commission = np.abs(trades)*self.commission_per_share
+        
+        #a running sum over every fill in bar then symbol order, read off at the end of each bar
+        cash = np.cumsum(np.concatenate(([self.initial_capital], -(cost + commission).ravel())))[n_symbols::n_symbols]
+        total_commission = np.cumsum(np.concatenate(([0.0], commission.ravel())))[n_symbols::n_symbols]
+        
+        ledger = PositionLedger(self.symbol_list, self.start_date, self.initial_capital, chunk_size = n_bars + 1)
+        rows = slice(1, n_bars + 1)
+        
+        ledger.datestamps[rows] = list(self.data.dates)
+        ledger.positions[rows] = positions
+        ledger.holdings[rows, :n_symbols] = positions*prices
+        ledger.holdings[rows, ledger.cash_col] = cash
+        ledger.holdings[rows, ledger.commission_col] = total_commission
+        #a stacked matmul runs the same dot product per row as PositionLedger.record
+        ledger.holdings[rows, ledger.total_col] = cash + np.matmul(positions[:, None, :], prices[:, :, None])[:, 0, 0]
+        ledger.length = n_bars + 1
+        
+        self.ledger = ledger
+        return ledger
+    
+    def create_equity_curve(self):
+        
+        if self.ledger is None:
+            self.run()
+        
+        curve = self.ledger.holdings_frame()
+        
+        curve['returns'] = curve['total'].pct_change()
+        curve['equity_curve'] = (1.0 + curve['returns']).cumprod()
+        
+        return curve
+    
+    def output_summary_stats(self):
+        
+        self.equity_curve = self.create_equity_curve()
+        
+        return create_summary_stats(self.equity_curve)
+    
+    def cross_check(self, backtest):
+        
+        #Runs an event-driven Backtest over the same data and raises an AssertionError unless both
+        #produce identical output_summary_stats. The backtest should use a LedgerPortfolio, which keeps
+        #one row per bar, and an execution handler without commission unless commission_per_share matches it.
+        
+        vectorized_stats = self.output_summary_stats()
+        event_stats = backtest.run()
+        
+        if vectorized_stats != event_stats:
+            raise AssertionError('vectorized and event-driven backtests differ:\n{}\n{}'.format(vectorized_stats, event_stats))
+        
+        return vectorized_stats
@@ -0,0 +1,175 @@
+#PYTHON PACKAGES
+
+import numpy as np
+import pandas as pd
+
+#PYTHON MODULES
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+#MY MODULES
+
+from Event_Driven_Backtester.backtest import Backtest
+from Event_Driven_Backtester.data import (HistoricArrayDataHandler, load_symbol_arrays)
+from Event_Driven_Backtester.cache import SymbolDataCache
+from Event_Driven_Backtester.event_bus import EventBus
+from Event_Driven_Backtester.performance import create_summary_values
+from Event_Driven_Backtester.sweep import (SharedMarketData, init_worker, worker_state)
+
+def walk_forward_windows(n_bars, train, test, step = None, anchored = False):
+    
+    #Splits n_bars into successive train/test windows and returns a list of (train_start, test_start, test_end) bar indices.
+    #train, test - the number of bars in each part; step - bars between windows, defaults to test so the test parts tile the data
+    #anchored - every training part starts at bar 0 and grows, rather than rolling forward with a fixed length
+    #The last test part is shortened to fit the data.
+    
+    step = test if step is None else step
+    if train < 0 or test < 1 or step < 1:
+        raise ValueError('train must be at least 0, test and step at least 1')
+    
+    windows = []
+    test_start = train
+    while test_start < n_bars:
+        train_start = 0 if anchored else test_start - train
+        windows.append((train_start, test_start, min(test_start + test, n_bars)))
+        test_start += step
+    
+    return windows
+
+class Window():
+    
+    #One train/test split over the aligned arrays. train() and test() return (dates, bars) slices,
+    #which are views of the loaded (or shared) arrays, so no window copies any market data.
+    
+    def __init__(self, number, train_start, test_start, test_end, dates, bars):
+        
+        self.number = number
+        self.train_start = train_start
+        self.test_start = test_start
+        self.test_end = test_end
+        self.dates = dates
+        self.bars = bars
+    
+    def train(self):
+        return self.dates[self.train_start:self.test_start], self.bars[self.train_start:self.test_start]
+    
+    def test(self):
+        return self.dates[self.test_start:self.test_end], self.bars[self.test_start:self.test_end]
+
+def run_window(task):
+    
+    #Runs the test part of one window in a worker over the shared data.
+    #task - (number, train_start, test_start, test_end, state to warm start from or None, return the end state)
+    #The state is the strategy state with the portfolio's book (see NaivePortfolio.get_book): a warm started window
+    #holds the positions and cash its predecessor ended with, so a strategy that remembers having bought still has them.
+    #Returns the window's bounds and numeric stats, plus the end state if asked for
+    
+    number, train_start, test_start, test_end, state, keep_state = task
+    dates, bars = worker_state['dates'], worker_state['bars']
+    window = Window(number, train_start, test_start, test_end, dates, bars)
+    
+    event_queue = EventBus()
+    data = HistoricArrayDataHandler(event_queue, None, worker_state['symbol_list'], arrays = window.test())
+    strategy, portfolio, broker = worker_state['build'](event_queue, data, window)
+    if state is not None:
+        strategy.set_state(state['strategy'])
+        portfolio.set_book(state['book'])
+    
+    Backtest(event_queue, data, strategy, portfolio, broker).run()
+    
+    result = {'window': number,
+              'train_start': pd.Timestamp(dates[train_start]) if train_start < test_start else pd.NaT,
+              'test_start': pd.Timestamp(dates[test_start]),
+              'test_end': pd.Timestamp(dates[test_end - 1]),
+              'bars': test_end - test_start,
+              'test_start_bar': test_start,
+              'test_end_bar': test_end}
+    result.update(create_summary_values(portfolio.equity_curve))
+    
+    if not keep_state:
+        return result, None
+    return result, {'strategy': strategy.get_state(), 'book': portfolio.get_book()}
+
+def summarise(report):
+    
+    #Aggregates a walk-forward report into one row per statistic: mean, std, min and max across the windows,
+    #plus the total return compounded over the consecutive test parts. Compounding is only meaningful when
+    #the test parts tile the data, each starting at the bar the previous one ended, so it is NaN when they
+    #overlap (step < test) or leave gaps (step > test).
+    
+    stats = report[['total_return', 'sharpe_ratio', 'max_drawdown', 'drawdown_duration']]
+    summary = stats.agg(['mean', 'std', 'min', 'max']).T
+    
+    starts, ends = report['test_start_bar'].values, report['test_end_bar'].values
+    if np.array_equal(starts[1:], ends[:-1]):
+        compounded = (np.prod(1.0 + report['total_return'].values/100) - 1.0)*100
+    else:
+        compounded = np.nan
+    summary['compounded'] = [compounded, np.nan, np.nan, np.nan]
+    
+    return summary
+
+class WalkForward():
+    
+    #Runs a strategy/portfolio stack over many train/test windows of the same history.
+    #The data is loaded and aligned once and placed in shared memory; every window's data handler
+    #is built on zero-copy slices of it, so no window re-reads the CSV files.
+    #Windows run in parallel over a pool of processes, unless warm_start is set: each window then starts from
+    #the strategy state (get_state/set_state) and the portfolio positions and cash (get_book/set_book) its
+    #predecessor ended with, so the windows run in order and their returns chain like one continuous run.
+    
+    def __init__(self, csv_dir, symbol_list, build, train, test, step = None, anchored = False,
+                 warm_start = False, max_workers = None, cache_dir = None):
+        
+        #build - a module-level function build(event_queue, data, window) -> (strategy, portfolio, execution handler),
+        #        called in the worker for every window; window.train() gives the training data, e.g. to fit parameters
+        #train, test, step, anchored - the window layout in bars, see walk_forward_windows
+        #warm_start - carry the strategy state and the portfolio's positions and cash over from one window to the next
+        #max_workers - number of worker processes, defaults to the number of CPUs; 1 runs in this process
+        #cache_dir - optional SymbolDataCache directory used to load the data
+        
+        self.csv_dir = csv_dir
+        self.symbol_list = symbol_list
+        self.build = build
+        self.train = train
+        self.test = test
+        self.step = step
+        self.anchored = anchored
+        self.warm_start = warm_start
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache_dir = cache_dir
+    
+    def load(self):
+        
+        if self.cache_dir is None:
+            return load_symbol_arrays(self.csv_dir, self.symbol_list)
+        
+        return SymbolDataCache(self.cache_dir).load(self.csv_dir, self.symbol_list, load_symbol_arrays)
+    
+    def run(self):
+        
+        #Returns a DataFrame with one row per window: its bounds followed by its numeric stats.
+        #summarise(report) aggregates it.
+        
+        dates, bars = self.load()
+        windows = walk_forward_windows(len(dates), self.train, self.test, self.step, self.anchored)
+        tasks = [(number,) + window + (None, self.warm_start) for number, window in enumerate(windows)]
+        
+        with SharedMarketData(self.symbol_list, dates, bars) as shared:
+            if self.warm_start or self.max_workers == 1:
+                init_worker(shared.spec, self.build)
+                results = []
+                state = None
+                try:
+                    for task in tasks:
+                        result, state = run_window(task[:4] + (state, self.warm_start))
+                        results.append(result)
+                finally:
+                    worker_state.clear()
+            else:
+                with ProcessPoolExecutor(max_workers = self.max_workers, initializer = init_worker,
+                                         initargs = (shared.spec, self.build)) as pool:
+                    results = [result for result, _ in pool.map(run_window, tasks)]
+        
+        return pd.DataFrame(results).set_index('window')